@@ -0,0 +1,57 @@
+"""
+Content-addressed store for immutable per-result artifacts (preview bodies,
+PDF reports) on local disk.
+
+A key hashes everything an artifact depends on - result id, question-bank
+version and renderer version - so an artifact never needs invalidating: a
+change to any input simply produces a new key. The key doubles as a strong
+HTTP ETag.
+"""
+import hashlib
+import os
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "app/artifacts")
+
+
+def artifact_key(*parts):
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def etag_matches(request, etag):
+    """True if the request's If-None-Match covers `etag`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+class ArtifactStore:
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, kind, key):
+        return os.path.join(self.root, kind, key[:2], key)
+
+    def exists(self, kind, key):
+        return os.path.exists(self.path(kind, key))
+
+    def read(self, kind, key):
+        try:
+            with open(self.path(kind, key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, kind, key, data):
+        path = self.path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+
+artifact_store = ArtifactStore(ARTIFACT_DIR)
@@ -0,0 +1,453 @@
+"""
+Write-behind buffer for in-progress exam state.
+
+/mocktests/{test_id}/save only updates an in-memory entry per (user, test);
+each save carries the full answer map and replaces the saved one, so an
+answer left out is cleared. A background thread flushes dirty entries to
+exam_cache every AUTOSAVE_FLUSH_SECONDS in batched upserts, so a live mock
+costs the database one write per candidate per flush interval instead of one
+per keystroke.
+
+/mocktests/{test_id}/sync sends only the answers that changed, tagged with a
+per-attempt sequence number that increases with every delta. Each answer and
+the attempt-level fields remember the sequence that last wrote them, so a
+delta that arrives late or twice never overwrites a newer one; the result is
+the same as applying the deltas in order.
+
+Deltas of one attempt may land on different workers, so each buffer holds
+only part of the attempt. exam_cache stores the sequences too, and a flush
+merges its entries into the stored rows (locked for the merge) per question
+by sequence, instead of overwriting them; /save answers carry no sequence,
+so the later save wins and drops the older unsequenced answers it left out.
+The merged state is fed back into the flushing buffer. Resume and submit
+read this worker's entry merged with the stored row, so they see every delta
+any worker has flushed; a delta another worker accepted less than
+AUTOSAVE_FLUSH_SECONDS ago may not be in it yet, so clients should submit
+their answers rather than rely on the autosave.
+
+Submitting closes the attempt: its row is cleared and the attempt number
+moves on, rather than the row being deleted. Entries remember the attempt
+they belong to, so one left behind on another worker is dropped at that
+worker's next flush or read instead of bringing the submitted answers back.
+/save and /sync take the `sync_attempt` resume returns; writes to a submitted
+attempt are refused.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.database import SessionLocal
+
+AUTOSAVE_FLUSH_SECONDS = float(os.getenv("AUTOSAVE_FLUSH_SECONDS", "5"))
+AUTOSAVE_BATCH_SIZE = int(os.getenv("AUTOSAVE_BATCH_SIZE", "500"))
+AUTOSAVE_MAX_IDLE_SECONDS = int(os.getenv("AUTOSAVE_MAX_IDLE_SECONDS", "7200"))
+
+
+class AutosaveEntry:
+    def __init__(self, user_id, mocktest_id, attempt=0):
+        self.user_id = user_id
+        self.mocktest_id = mocktest_id
+        self.attempt = attempt  # exam_cache.attempt this state belongs to
+        self.answers = {}
+        self.time_left = None
+        self.current_question = 0
+        self.saved_at = datetime.utcnow()
+        self.dirty = False
+        self.seq = 0            # highest delta sequence applied
+        self.answer_seqs = {}   # question_id -> sequence that last wrote it
+        self.replaced_at = None  # last /save, which replaces the unsequenced answers
+
+    def snapshot(self):
+        return {
+            "answers": dict(self.answers),
+            "time_left": self.time_left,
+            "current_question": self.current_question,
+            "saved_at": self.saved_at,
+            "seq": self.seq,
+            "answer_seqs": dict(self.answer_seqs),
+            "attempt": self.attempt,
+            "replaced_at": self.replaced_at,
+        }
+
+
+def row_state(row):
+    """The snapshot form of an exam_cache row."""
+    return {
+        "answers": dict(row.answers_json or {}),
+        "time_left": row.time_left,
+        "current_question": row.current_question,
+        "saved_at": row.last_saved_at,
+        "seq": row.seq or 0,
+        "answer_seqs": dict(row.answer_seqs or {}),
+        "attempt": row.attempt or 0,
+    }
+
+
+def merge_states(stored, local):
+    """
+    Merges a buffer snapshot into a stored one. An answer written by a later
+    delta wins; answers without a sequence (/save) go by save time, and a
+    save newer than the stored state drops the stored ones it left out.
+    """
+    if stored is None:
+        return dict(local)
+    newer = stored["saved_at"] is None or local["saved_at"] > stored["saved_at"]
+    answers, answer_seqs = dict(stored["answers"]), dict(stored["answer_seqs"])
+    replaced_at = local.get("replaced_at")
+    if replaced_at is not None and (stored["saved_at"] is None or replaced_at > stored["saved_at"]):
+        for qid in [q for q in answers if q not in local["answers"] and not answer_seqs.get(q)]:
+            del answers[qid]
+    for qid in local["answers"].keys() | local["answer_seqs"].keys():
+        seq, stored_seq = local["answer_seqs"].get(qid, 0), answer_seqs.get(qid, 0)
+        if seq > stored_seq or (seq == stored_seq == 0 and newer):
+            if qid in local["answers"]:
+                answers[qid] = local["answers"][qid]
+            else:
+                answers.pop(qid, None)
+            if seq:
+                answer_seqs[qid] = seq
+    attempt = local if local["seq"] > stored["seq"] or (local["seq"] == stored["seq"] and newer) else stored
+    return {
+        "answers": answers,
+        "time_left": attempt["time_left"],
+        "current_question": attempt["current_question"],
+        "saved_at": local["saved_at"] if newer else stored["saved_at"],
+        "seq": max(local["seq"], stored["seq"]),
+        "answer_seqs": answer_seqs,
+        "attempt": local["attempt"],
+    }
+
+
+class AutosaveBuffer:
+    def __init__(self, flush_seconds, batch_size):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.flushed_rows = 0
+        self.flushes = 0
+        self._entries = {}  # (user_id, mocktest_id) -> AutosaveEntry
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------------- Request path ----------------
+    def _entry(self, user_id, mocktest_id, attempt, baseline):
+        """
+        The entry for `attempt` (None: the latest known), started afresh from
+        `baseline` if there is none yet. None if `attempt` has been submitted.
+        Called with the lock held.
+        """
+        key = (user_id, mocktest_id)
+        entry = self._entries.get(key)
+        if entry is not None and attempt in (None, entry.attempt):
+            return entry
+        current = max(baseline["attempt"] if baseline else 0, entry.attempt if entry else 0)
+        if attempt is None:
+            attempt = current
+        elif attempt < current:
+            return None
+        entry = self._entries[key] = AutosaveEntry(user_id, mocktest_id, attempt)
+        if baseline and baseline["attempt"] == attempt:
+            entry.answers = dict(baseline["answers"])
+            entry.time_left = baseline["time_left"]
+            entry.current_question = baseline["current_question"]
+            entry.seq = baseline["seq"]
+            entry.answer_seqs = dict(baseline["answer_seqs"])
+        return entry
+
+    def save(self, user_id, mocktest_id, answers, time_left, current_question, attempt=None, baseline=None):
+        """
+        Applies a full save: `answers` replaces the saved answers, so one left
+        out is cleared. Returns the snapshot, or None if `attempt` has been submitted.
+        """
+        with self._lock:
+            entry = self._entry(user_id, mocktest_id, attempt, baseline)
+            if entry is None:
+                return None
+            entry.answers = {str(k): v for k, v in answers.items() if v}
+            entry.time_left = time_left
+            entry.current_question = current_question
+            entry.saved_at = entry.replaced_at = datetime.utcnow()
+            entry.dirty = True
+            return entry.snapshot()
+
+    def apply_delta(
+        self, user_id, mocktest_id, seq, changes, time_left=None, current_question=None, baseline=None, attempt=None
+    ):
+        """
+        Applies one sync delta. `changes` maps question ids to the new answer,
+        or to None/"" to clear it. `baseline` seeds a new entry from exam_cache.
+        Returns (snapshot, question ids skipped because a newer delta wrote them),
+        or (None, None) if `attempt` has been submitted.
+        """
+        with self._lock:
+            entry = self._entry(user_id, mocktest_id, attempt, baseline)
+            if entry is None:
+                return None, None
+
+            stale, applied = [], False
+            for qid, answer in changes.items():
+                qid = str(qid)
+                if seq <= entry.answer_seqs.get(qid, 0):
+                    stale.append(qid)
+                    continue
+                entry.answer_seqs[qid] = seq
+                applied = True
+                if answer:
+                    entry.answers[qid] = answer
+                else:
+                    entry.answers.pop(qid, None)
+
+            if seq > entry.seq:
+                entry.seq = seq
+                applied = True
+                if time_left is not None:
+                    entry.time_left = time_left
+                if current_question is not None:
+                    entry.current_question = current_question
+
+            if applied:
+                entry.saved_at = datetime.utcnow()
+                entry.dirty = True
+            return entry.snapshot(), stale
+
+    def has(self, user_id, mocktest_id, attempt=None):
+        with self._lock:
+            entry = self._entries.get((user_id, mocktest_id))
+            return entry is not None and attempt in (None, entry.attempt)
+
+    def get(self, user_id, mocktest_id):
+        with self._lock:
+            entry = self._entries.get((user_id, mocktest_id))
+            return entry.snapshot() if entry else None
+
+    def merged_state(self, db, user_id, mocktest_id):
+        """This worker's entry merged with the stored row, which holds what the other workers flushed."""
+        local = self.get(user_id, mocktest_id)
+        row = db.scalars(
+            select(models.ExamCache).where(
+                models.ExamCache.user_id == user_id, models.ExamCache.mocktest_id == mocktest_id
+            )
+        ).first()
+        stored = row_state(row) if row else None
+        if local is not None and stored is not None and local["attempt"] < stored["attempt"]:
+            # Submitted on another worker since
+            self._drop_submitted([local | {"user_id": user_id, "mocktest_id": mocktest_id}])
+            return stored
+        if local is None or stored is None or stored["attempt"] < local["attempt"]:
+            return local or stored
+        return merge_states(stored, local)
+
+    def discard(self, db, user_id, mocktest_id):
+        """
+        Closes the attempt once it is submitted, in `db`'s transaction: the row
+        is cleared and its attempt number moves on. Entries of the attempt on
+        other workers then count as submitted, whether they flush later or not.
+        """
+        with self._lock:
+            self._entries.pop((user_id, mocktest_id), None)
+        table = models.ExamCache.__table__
+        where = (table.c.user_id == user_id, table.c.mocktest_id == mocktest_id)
+        cleared = {
+            "answers_json": {},
+            "answer_seqs": {},
+            "seq": 0,
+            "time_left": None,
+            "current_question": 0,
+            "last_saved_at": datetime.utcnow(),
+        }
+        if db.execute(update(table).where(*where).values(attempt=table.c.attempt + 1, **cleared)).rowcount:
+            return
+        # Nothing flushed yet; the row still has to record the submit for the other workers
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(user_id=user_id, mocktest_id=mocktest_id, attempt=1, **cleared))
+        except IntegrityError:
+            # A flush inserted the attempt's first row meanwhile
+            db.execute(update(table).where(*where).values(attempt=table.c.attempt + 1, **cleared))
+
+    # ---------------- Flushing ----------------
+    def _take_dirty(self):
+        with self._lock:
+            dirty = []
+            for entry in self._entries.values():
+                if entry.dirty:
+                    dirty.append(entry.snapshot() | {"user_id": entry.user_id, "mocktest_id": entry.mocktest_id})
+                    entry.dirty = False
+            # Forget clean entries nobody has touched for a while; the table has them
+            cutoff = datetime.utcnow().timestamp() - AUTOSAVE_MAX_IDLE_SECONDS
+            for key in [k for k, e in self._entries.items() if not e.dirty and e.saved_at.timestamp() < cutoff]:
+                del self._entries[key]
+            return dirty
+
+    def _mark_dirty(self, rows):
+        with self._lock:
+            for row in rows:
+                entry = self._entries.get((row["user_id"], row["mocktest_id"]))
+                if entry is not None and entry.saved_at <= row["saved_at"]:
+                    entry.dirty = True
+
+    def _drop_submitted(self, rows):
+        """Forgets entries whose attempt has been submitted on another worker."""
+        with self._lock:
+            for row in rows:
+                key = (row["user_id"], row["mocktest_id"])
+                entry = self._entries.get(key)
+                if entry is not None and entry.attempt <= row["attempt"]:
+                    del self._entries[key]
+
+    def _absorb(self, rows):
+        """Takes answers other workers flushed into the merged rows; entries may have moved on since."""
+        with self._lock:
+            for row in rows:
+                entry = self._entries.get((row["user_id"], row["mocktest_id"]))
+                if entry is None or entry.attempt != row["attempt"]:
+                    continue
+                for qid, answer in row["answers"].items():
+                    if qid not in entry.answers and qid not in entry.answer_seqs:
+                        entry.answers[qid] = answer
+                for qid, seq in row["answer_seqs"].items():
+                    if seq > entry.answer_seqs.get(qid, 0):
+                        entry.answer_seqs[qid] = seq
+                        if qid in row["answers"]:
+                            entry.answers[qid] = row["answers"][qid]
+                        else:
+                            entry.answers.pop(qid, None)
+                if row["seq"] > entry.seq:
+                    entry.seq = row["seq"]
+                    entry.time_left = row["time_left"]
+                    entry.current_question = row["current_question"]
+
+    def flush(self):
+        """Upserts every dirty entry into exam_cache; returns the number of rows written."""
+        rows = self._take_dirty()
+        written = 0
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            db = SessionLocal()
+            try:
+                merged, submitted = self._upsert(db, batch)
+                db.commit()
+                written += len(merged)
+                self._absorb(merged)
+                self._drop_submitted(submitted)
+            except Exception as e:
+                db.rollback()
+                self._mark_dirty(batch)  # retry on the next tick
+                print(f"❌ Autosave flush failed: {e}")
+            finally:
+                db.close()
+        with self._lock:
+            self.flushed_rows += written
+            self.flushes += 1
+        return written
+
+    def _upsert(self, db, batch):
+        """Merges `batch` into exam_cache; returns (merged rows, entries of submitted attempts)."""
+        valid_tests = set(
+            db.scalars(
+                select(models.MockTestFile.id).where(
+                    models.MockTestFile.id.in_({r["mocktest_id"] for r in batch})
+                )
+            )
+        )
+        batch = [r for r in batch if r["mocktest_id"] in valid_tests]
+        if not batch:
+            return [], []
+
+        # Locked in id order, so flushes of overlapping batches on other workers
+        # wait for this merge instead of deadlocking or overwriting it
+        existing = {
+            (row.user_id, row.mocktest_id): row
+            for row in db.scalars(
+                select(models.ExamCache)
+                .where(
+                    tuple_(models.ExamCache.user_id, models.ExamCache.mocktest_id).in_(
+                        [(r["user_id"], r["mocktest_id"]) for r in batch]
+                    )
+                )
+                .order_by(models.ExamCache.id)
+                .with_for_update()
+            )
+        }
+
+        updates, inserts, merged, submitted = [], [], [], []
+        for r in batch:
+            row = existing.get((r["user_id"], r["mocktest_id"]))
+            if row is not None and row.attempt > r["attempt"]:
+                submitted.append(r)
+                continue
+            state = merge_states(row_state(row) if row is not None and row.attempt == r["attempt"] else None, r)
+            merged.append(state | {"user_id": r["user_id"], "mocktest_id": r["mocktest_id"]})
+            values = {
+                "answers_json": state["answers"],
+                "answer_seqs": state["answer_seqs"],
+                "seq": state["seq"],
+                "time_left": state["time_left"],
+                "current_question": state["current_question"],
+                "last_saved_at": state["saved_at"],
+                "attempt": state["attempt"],
+            }
+            if row is None:
+                # A concurrent first flush of the same attempt fails the unique
+                # index; the batch is retried next tick and merges then
+                inserts.append({"user_id": r["user_id"], "mocktest_id": r["mocktest_id"], **values})
+            else:
+                # Bind names must not collide with the SET columns
+                updates.append({"b_id": row.id, **{f"b_{k}": v for k, v in values.items()}})
+
+        table = models.ExamCache.__table__
+        if updates:
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(
+                    answers_json=bindparam("b_answers_json"),
+                    answer_seqs=bindparam("b_answer_seqs"),
+                    seq=bindparam("b_seq"),
+                    time_left=bindparam("b_time_left"),
+                    current_question=bindparam("b_current_question"),
+                    last_saved_at=bindparam("b_last_saved_at"),
+                    attempt=bindparam("b_attempt"),
+                ),
+                updates,
+            )
+        if inserts:
+            db.execute(insert(table), inserts)
+        return merged, submitted
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            started = time.perf_counter()
+            written = self.flush()
+            if written:
+                print(f"💾 Autosave flushed {written} rows in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="autosave-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "dirty": sum(1 for e in self._entries.values() if e.dirty),
+                "flushes": self.flushes,
+                "flushed_rows": self.flushed_rows,
+            }
+
+
+autosave_buffer = AutosaveBuffer(AUTOSAVE_FLUSH_SECONDS, AUTOSAVE_BATCH_SIZE)
@@ -0,0 +1,211 @@
+"""
+Compiled question-bank bundles.
+
+A bundle is a read-only binary image of one QuestionBank that every worker
+on a node can mmap, so all workers share a single page-cache copy instead of
+each holding its own parsed lists and dicts.
+
+Layout (little-endian, every array 4-byte aligned):
+
+    header          HEADER struct (magic, format, counts, source version)
+    fields          uint32[n * len(STRING_FIELDS)]  string ids per question
+    options         uint32[n * 5]                   string ids per option slot
+    section_codes   uint16[n]                       index into section_names
+    answer_codes    uint8[n]                        0 = none, 1..5 = A..E
+    section_names   uint32[n_sections]              string ids
+    string_offsets  uint32[n_strings + 1]           byte offsets into the blob
+    string_blob     utf-8 bytes, each distinct string stored once
+"""
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+BUNDLE_MAGIC = b"QBNK"
+BUNDLE_FORMAT = 1
+BUNDLE_DIR = os.getenv("QUESTION_BANK_BUNDLE_DIR", "app/qbank_bundles")
+
+HEADER = struct.Struct("<4sHHIIII32s")
+STRING_FIELDS = [
+    "question_id", "question", "correct", "explanation", "passage_id",
+    "passage_text", "question_image", "explanation_image", "passage_image",
+]
+OPTION_LETTERS = "ABCDE"
+
+
+def bundle_path(test_id):
+    return os.path.join(BUNDLE_DIR, f"{test_id}.qbank")
+
+
+def answer_code(letter):
+    """Maps an answer letter to its uint8 code (0 when blank or unknown)."""
+    idx = OPTION_LETTERS.find(letter.strip().upper()) if letter else -1
+    return idx + 1 if idx >= 0 and len(letter.strip()) == 1 else 0
+
+
+def _pad4(n):
+    return (-n) % 4
+
+
+# ---------------- Writer ----------------
+def write_bundle(bank, path):
+    """Serializes a QuestionBank to `path` atomically."""
+    strings, ids = [], {}
+
+    def sid(value):
+        if value not in ids:
+            ids[value] = len(strings)
+            strings.append(value)
+        return ids[value]
+
+    sid("")
+    questions = bank.questions
+    n = len(questions)
+    section_names = []
+    for q in questions:
+        if q["section"] not in section_names:
+            section_names.append(q["section"])
+
+    fields = np.array([[sid(q[f]) for f in STRING_FIELDS] for q in questions], dtype="<u4").reshape(n, len(STRING_FIELDS))
+    options = np.array([[sid(o) for o in q["options"]] for q in questions], dtype="<u4").reshape(n, 5)
+    section_codes = np.array([section_names.index(q["section"]) for q in questions], dtype="<u2")
+    answer_codes = np.array([answer_code(q["correct"]) for q in questions], dtype="u1")
+    section_ids = np.array([sid(s) for s in section_names], dtype="<u4")
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = b"".join(encoded)
+
+    header = HEADER.pack(
+        BUNDLE_MAGIC, BUNDLE_FORMAT, len(STRING_FIELDS), n,
+        len(section_names), len(strings), len(blob), bank.version.encode("ascii"),
+    )
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for arr in (fields, options, section_codes, answer_codes, section_ids, offsets):
+            data = arr.tobytes()
+            f.write(data)
+            f.write(b"\0" * _pad4(len(data)))
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ---------------- Reader ----------------
+class _QuestionsById(Mapping):
+    """by_id for a bundle: looks the row up in the qid index and decodes only that question."""
+
+    def __init__(self, bank):
+        self._bank = bank
+
+    def __getitem__(self, qid):
+        return self._bank.question(self._bank._rows[qid])
+
+    def __iter__(self):
+        return iter(self._bank.qids)
+
+    def __len__(self):
+        return len(self._bank)
+
+
+class MappedQuestionBank:
+    """
+    QuestionBank backed by an mmap'd bundle. Holds numpy views into the
+    mapping plus a qid -> row index; questions are decoded from the shared
+    pages on access.
+    """
+
+    def __init__(self, test_id, version, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, nfields, n, nsections, nstrings, bloblen, src_version = HEADER.unpack_from(self._mm, 0)
+        if magic != BUNDLE_MAGIC or fmt != BUNDLE_FORMAT or nfields != len(STRING_FIELDS):
+            raise ValueError(f"Not a compatible question-bank bundle: {path}")
+        if src_version.rstrip(b"\0").decode("ascii") != version:
+            raise ValueError(f"Stale question-bank bundle: {path}")
+
+        self.test_id = test_id
+        self.version = version
+        self._n = n
+
+        offset = HEADER.size
+
+        def view(dtype, count):
+            nonlocal offset
+            arr = np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+            offset += arr.nbytes + _pad4(arr.nbytes)
+            return arr
+
+        self._fields = view("<u4", n * nfields).reshape(n, nfields)
+        self._options = view("<u4", n * 5).reshape(n, 5)
+        self.section_codes = view("<u2", n)
+        self.answer_codes = view("u1", n)
+        self._section_ids = view("<u4", nsections)
+        self._offsets = view("<u4", nstrings + 1)
+        self._blob_start = offset
+        col = STRING_FIELDS.index("question_id")
+        self.qids = [self._str(sid) for sid in self._fields[:, col]]
+        self._rows = {qid: i for i, qid in enumerate(self.qids)}
+        self.by_id = _QuestionsById(self)
+        # The string blob's pages are shared with every other worker; what this
+        # worker holds is the index arrays and the decoded qid index
+        self.nbytes = (
+            sum(arr.nbytes for arr in (self._fields, self._options, self.section_codes, self.answer_codes,
+                                       self._section_ids, self._offsets))
+            + sys.getsizeof(self.qids) + sum(sys.getsizeof(qid) for qid in self.qids)
+            + sys.getsizeof(self._rows)
+        )
+        self.derived = {}  # see question_bank.bank_derived
+        self.derived_nbytes = 0  # charged by QuestionBankCache.charge
+
+    def __len__(self):
+        return self._n
+
+    def _str(self, string_id):
+        start = self._blob_start + int(self._offsets[string_id])
+        end = self._blob_start + int(self._offsets[string_id + 1])
+        return self._mm[start:end].decode("utf-8")
+
+    @property
+    def section_names(self):
+        return [self._str(i) for i in self._section_ids]
+
+    def question(self, i):
+        q = {name: self._str(sid) for name, sid in zip(STRING_FIELDS, self._fields[i])}
+        q["options"] = [self._str(sid) for sid in self._options[i]]
+        q["section"] = self._str(self._section_ids[self.section_codes[i]])
+        return q
+
+    @property
+    def questions(self):
+        return [self.question(i) for i in range(self._n)]
+
+    @property
+    def answer_key(self):
+        col = STRING_FIELDS.index("correct")
+        return dict(zip(self.qids, (self._str(sid) for sid in self._fields[:, col])))
+
+    @property
+    def section_map(self):
+        names = self.section_names
+        return dict(zip(self.qids, (names[c] for c in self.section_codes)))
+
+
+def load_bundle(test_id, version):
+    """Maps the compiled bundle for a test, or returns None if missing or stale."""
+    path = bundle_path(test_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        return MappedQuestionBank(test_id, version, path)
+    except ValueError as e:
+        print(f"⚠️ Ignoring question-bank bundle: {e}")
+        return None
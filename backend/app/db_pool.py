@@ -0,0 +1,193 @@
+"""
+Connection-pool configuration and instrumentation for app.database.
+
+Sizing, timeout, recycle and the pre-ping strategy come from the environment:
+
+    DB_POOL_SIZE              connections kept open per engine (0 = NullPool)
+    DB_MAX_OVERFLOW           extra connections allowed under burst
+    DB_POOL_TIMEOUT           seconds a checkout waits before QueuePool gives up
+    DB_POOL_RECYCLE           seconds before a connection is replaced (-1 = never)
+    DB_POOL_USE_LIFO          reuse the most recent connection so idle ones can expire
+    DB_PRE_PING               always | idle | off
+    DB_PRE_PING_IDLE_SECONDS  with DB_PRE_PING=idle, only ping connections idle this long
+    DB_PGBOUNCER              true when connecting through PgBouncer in transaction mode
+
+"always" pings on every checkout (one extra round trip each); "idle" pings
+only connections that sat in the pool longer than DB_PRE_PING_IDLE_SECONDS,
+which is where stale connections come from. In PgBouncer mode PgBouncer owns
+pooling, so engines use NullPool, and asyncpg neither caches prepared
+statements nor reuses their names across transactions.
+
+Each engine's pool counts checkouts, time spent waiting for a connection,
+timeouts, overflow and connects; `pool_stats()` reports them.
+"""
+import os
+import threading
+import time
+from uuid import uuid4
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_USE_LIFO = os.getenv("DB_POOL_USE_LIFO", "true").lower() == "true"
+DB_PRE_PING = os.getenv("DB_PRE_PING", "idle").lower()
+DB_PRE_PING_IDLE_SECONDS = float(os.getenv("DB_PRE_PING_IDLE_SECONDS", "30"))
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+
+class PoolMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.overflow_checkouts = 0
+        self.connects = 0
+        self.pings = 0
+        self.ping_failures = 0
+        self._lock = threading.Lock()
+
+    def observe_wait(self, seconds, overflow):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if overflow > 0:
+                self.overflow_checkouts += 1
+
+    def count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_seconds_total": round(self.wait_seconds, 6),
+                "wait_seconds_max": round(self.max_wait_seconds, 6),
+                "timeouts": self.timeouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "connects": self.connects,
+                "pings": self.pings,
+                "ping_failures": self.ping_failures,
+            }
+
+
+class _TimedQueueMixin:
+    """Times how long each checkout waits on the pool's queue."""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.count("timeouts")
+            raise
+        self.metrics.observe_wait(time.perf_counter() - start, self.overflow())
+        return conn
+
+
+class TimedQueuePool(_TimedQueueMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedQueueMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_pools = {}  # name -> (pool, metrics)
+
+
+def _timed_pool_class(name, is_async):
+    # A per-engine subclass, so the metrics survive pool.recreate() on dispose
+    pool_class = TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool
+    return type(f"{pool_class.__name__}_{name}", (pool_class,), {"metrics": PoolMetrics(name)})
+
+
+def engine_options(url, name, is_async=False):
+    """create_engine / create_async_engine kwargs for `url` under the env settings."""
+    if url.startswith("sqlite"):
+        # No server connections to size or ping; keep the default sizing but time checkouts
+        return {} if ":memory:" in url else {"poolclass": _timed_pool_class(name, is_async)}
+
+    options = {"pool_pre_ping": DB_PRE_PING == "always" and not DB_PGBOUNCER}
+    if DB_PGBOUNCER or DB_POOL_SIZE <= 0:
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=_timed_pool_class(name, is_async),
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_use_lifo=DB_POOL_USE_LIFO,
+        )
+
+    if DB_PGBOUNCER and is_async and "asyncpg" in url:
+        # Transaction pooling hands each transaction a different server
+        # connection, so named prepared statements cannot be cached or reused
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return options
+
+
+def instrument(engine, name):
+    """Registers an engine's pool for pool_stats() and installs the idle pre-ping."""
+    pool = engine.pool
+    metrics = getattr(type(pool), "metrics", None) or PoolMetrics(name)
+    _pools[name] = (pool, metrics)
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, record):
+        metrics.count("connects")
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, record):
+        record.info["checked_in_at"] = time.monotonic()
+
+    if (
+        DB_PRE_PING == "idle" and not DB_PGBOUNCER
+        and isinstance(pool, QueuePool) and engine.dialect.name != "sqlite"
+    ):
+        @event.listens_for(pool, "checkout")
+        def ping_if_idle(dbapi_connection, record, proxy):
+            idle_since = record.info.get("checked_in_at")
+            if idle_since is None or time.monotonic() - idle_since < DB_PRE_PING_IDLE_SECONDS:
+                return
+            metrics.count("pings")
+            try:
+                cursor = dbapi_connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+            except Exception:
+                metrics.count("ping_failures")
+                # The pool discards this connection and retries with a fresh one
+                raise exc.DisconnectionError()
+    return engine
+
+
+def pool_stats():
+    stats = {}
+    for name, (pool, metrics) in _pools.items():
+        entry = {"pool": type(pool).__name__, **metrics.snapshot()}
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+            )
+        stats[name] = entry
+    return stats
@@ -0,0 +1,231 @@
+"""
+Candidate-facing views of a question bank.
+
+While an attempt is open the client only gets what it needs to render
+questions: the answer key and explanations stay on the server until the
+result preview. An exam can start from a small manifest (sections, question
+ids, passage ids) and pull question bodies one section or page at a time.
+
+Payloads are serialized once per bank version with orjson and kept as bytes
+next to gzip (and, if the brotli package is installed, brotli) variants
+compressed at build time. A request only negotiates an encoding and writes
+the stored bytes; the version-derived ETag lets clients revalidate with a 304.
+Page payloads depend on the requested page size, so only pages inside the
+test are built and at most PAGE_PAYLOAD_CACHE_SIZE of them are kept per bank,
+least recently used out first.
+
+Everything built here is charged to the bank's QuestionBankCache entry as
+it is built (and credited back when a page is dropped), so cached payloads
+count against QUESTION_BANK_CACHE_MB.
+"""
+import gzip
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import orjson
+from fastapi.responses import Response
+
+from app.artifacts import artifact_key, etag_matches
+from app.question_bank import bank_derived, question_bank_cache, questions_nbytes
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+# Fields withheld until the attempt has been submitted
+KEY_FIELDS = ("correct", "explanation", "explanation_image")
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+PAYLOAD_FORMAT_VERSION = 1  # bump when a payload layout changes
+PAYLOAD_GZIP_LEVEL = int(os.getenv("PAYLOAD_GZIP_LEVEL", "9"))
+PAYLOAD_MIN_COMPRESS_BYTES = int(os.getenv("PAYLOAD_MIN_COMPRESS_BYTES", "1024"))
+PAGE_PAYLOAD_CACHE_SIZE = int(os.getenv("PAGE_PAYLOAD_CACHE_SIZE", "64"))
+
+
+def candidate_question(q):
+    return {k: v for k, v in q.items() if k not in KEY_FIELDS}
+
+
+def accepted_encodings(header):
+    """Content codings from an Accept-Encoding header, minus any refused with q=0."""
+    accepted = set()
+    for part in (header or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    return accepted
+
+
+class EncodedPayload:
+    """A JSON body serialized once, with its precompressed variants."""
+
+    def __init__(self, data, key):
+        self.key = key
+        self.raw = orjson.dumps(data)
+        self.variants = {}
+        if len(self.raw) >= PAYLOAD_MIN_COMPRESS_BYTES:
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(self.raw)
+            self.variants["gzip"] = gzip.compress(self.raw, PAYLOAD_GZIP_LEVEL, mtime=0)
+        self.nbytes = len(self.raw) + sum(len(v) for v in self.variants.values())
+
+    def response(self, request, cache_control="public, no-cache"):
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        coding = next((c for c in ("br", "gzip") if c in self.variants and (c in accepted or "*" in accepted)), None)
+        etag = f'"{self.key}-{coding}"' if coding else f'"{self.key}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        if coding:
+            headers["Content-Encoding"] = coding
+        return Response(
+            content=self.variants[coding] if coding else self.raw,
+            media_type="application/json",
+            headers=headers,
+        )
+
+
+class QuestionDelivery:
+    """Manifest plus per-section candidate questions for one bank version."""
+
+    def __init__(self, bank):
+        self.test_id = bank.test_id
+        self.version = bank.version
+        self.questions = [candidate_question(q) for q in bank.questions]
+        self.by_section = {}
+        for q in self.questions:
+            self.by_section.setdefault(q["section"], []).append(q)
+        self.questions_json = orjson.dumps(self.questions)
+        self.manifest_json = orjson.dumps(self.manifest())
+        self._payloads = {}
+        self._pages = OrderedDict()  # (page, page_size) -> EncodedPayload, LRU
+        self._lock = threading.Lock()
+        self._bank = weakref.ref(bank)  # payloads are charged to it; it owns us, not the other way
+        # Errs high for parsed banks, whose question strings the candidate copies share
+        self.nbytes = (
+            len(self.questions_json) + len(self.manifest_json)
+            + questions_nbytes(self.questions) + sum(sys.getsizeof(q) for q in self.questions)
+        )
+
+    def __len__(self):
+        return len(self.questions)
+
+    def manifest(self):
+        return {
+            "test_id": self.test_id,
+            "version": self.version,
+            "total_questions": len(self.questions),
+            "sections": [
+                {
+                    "name": name,
+                    "question_ids": [q["question_id"] for q in questions],
+                    "passage_ids": list(dict.fromkeys(q["passage_id"] for q in questions if q["passage_id"])),
+                }
+                for name, questions in self.by_section.items()
+            ],
+        }
+
+    def section(self, name):
+        """Candidate questions of one section, or None if the test has no such section."""
+        return self.by_section.get(name)
+
+    def page_count(self, page_size=DEFAULT_PAGE_SIZE):
+        return max(1, -(-len(self.questions) // page_size))
+
+    def page(self, page, page_size=DEFAULT_PAGE_SIZE):
+        """1-based page over all questions in test order."""
+        start = (page - 1) * page_size
+        return self.questions[start:start + page_size]
+
+    def attempt_body(self, attempt, delivery="full"):
+        """
+        JSON bytes for resume_test: the per-candidate `attempt` fields with the
+        pre-serialized questions (or manifest) spliced in, so the large part
+        is never re-encoded.
+        """
+        head = orjson.dumps(attempt)
+        if delivery == "manifest":
+            return head[:-1] + b',"manifest":' + self.manifest_json + b"}"
+        return head[:-1] + b',"questions":' + self.questions_json + b"}"
+
+    def _charge(self, nbytes):
+        bank = self._bank()
+        if bank is not None and nbytes:
+            question_bank_cache.charge(bank, nbytes)
+
+    def _payload(self, variant, build):
+        with self._lock:
+            payload = self._payloads.get(variant)
+        if payload is None:
+            key = artifact_key("questions", self.test_id, self.version, PAYLOAD_FORMAT_VERSION, variant)
+            built = EncodedPayload(build(), key)
+            with self._lock:
+                payload = self._payloads.setdefault(variant, built)
+            if payload is built:
+                self._charge(payload.nbytes)
+        return payload
+
+    def test_payload(self):
+        return self._payload(
+            ("test",),
+            lambda: {"version": self.version, "total_questions": len(self.questions), "questions": self.questions},
+        )
+
+    def section_payload(self, name):
+        """EncodedPayload for one section, or None if the test has no such section."""
+        chunk = self.section(name)
+        if chunk is None:
+            return None
+        return self._payload(
+            ("section", name),
+            lambda: {"version": self.version, "section": name, "questions": chunk},
+        )
+
+    def page_payload(self, page, page_size=DEFAULT_PAGE_SIZE):
+        """EncodedPayload for one page, or None if the test has fewer pages."""
+        if page > self.page_count(page_size):
+            return None
+        variant = (page, page_size)
+        with self._lock:
+            payload = self._pages.get(variant)
+            if payload is not None:
+                self._pages.move_to_end(variant)
+                return payload
+        key = artifact_key("questions", self.test_id, self.version, PAYLOAD_FORMAT_VERSION, ("page",) + variant)
+        built = EncodedPayload(
+            {
+                "version": self.version,
+                "page": page,
+                "page_size": page_size,
+                "total_questions": len(self.questions),
+                "questions": self.page(page, page_size),
+            },
+            key,
+        )
+        freed = 0
+        with self._lock:
+            payload = self._pages.setdefault(variant, built)
+            self._pages.move_to_end(variant)
+            while len(self._pages) > PAGE_PAYLOAD_CACHE_SIZE:
+                freed += self._pages.popitem(last=False)[1].nbytes
+        self._charge((built.nbytes if payload is built else 0) - freed)
+        return payload
+
+
+def get_delivery(bank):
+    """QuestionDelivery for a question bank, built once per bank version and evicted with it."""
+    return bank_derived(bank, "delivery", QuestionDelivery)
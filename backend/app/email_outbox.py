@@ -0,0 +1,337 @@
+"""
+Transactional outbox for outgoing email.
+
+Requests only add an email_outbox row in their own transaction
+(enqueue_email) and return; they never talk to the mail relay. A background
+sender in each API worker claims due rows in batches, sends them over pooled
+SMTP connections and records the outcome in email_logs.
+
+Claiming stamps rows with a per-batch token and a lease (next_attempt_at),
+so several workers can run senders against one table without sending an
+email twice; rows left in "sending" by a crashed worker become claimable
+again once the lease runs out. Failures are retried with exponential
+backoff up to EMAIL_MAX_ATTEMPTS; a permanent rejection (5xx, refused
+recipient) fails the email at once.
+
+    SMTP_HOST / SMTP_PORT / SMTP_USER / SMTP_PASSWORD / SMTP_FROM
+    SMTP_STARTTLS              false for a local relay or smtp_debug_server.py
+    EMAIL_SENDER_ENABLED       false to leave sending to other workers
+
+There are no default relay or credentials: without SMTP_HOST the sender does
+not start and emails wait in the outbox. SMTP_USER and SMTP_PASSWORD go
+together (neither for a relay without auth), and a From address is required.
+Sent and failed rows still hold the message body (one-time codes, for
+instance); app/retention.py deletes them after EMAIL_OUTBOX_RETENTION_HOURS.
+"""
+import os
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+from uuid import uuid4
+
+from sqlalchemy import and_, or_, select, update
+
+from app.database import SessionLocal
+from app.models import EmailLog, EmailOutbox
+
+SMTP_HOST = os.getenv("SMTP_HOST", "")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))  # close pooled connections idle this long
+
+EMAIL_SENDER_ENABLED = os.getenv("EMAIL_SENDER_ENABLED", "true").lower() == "true"
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "5"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+EMAIL_LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", "300"))
+
+if bool(SMTP_USER) != bool(SMTP_PASSWORD):
+    raise RuntimeError("Set both SMTP_USER and SMTP_PASSWORD, or neither for a relay without auth")
+if SMTP_HOST and not SMTP_FROM:
+    raise RuntimeError("SMTP_HOST is set but there is no sender address: set SMTP_FROM (or SMTP_USER)")
+
+
+# ---------------- Request path ----------------
+def enqueue_email(db, to_email, subject, body, user_id=None, mocktest_id=None):
+    """Adds an email to the outbox in `db`'s transaction; the caller commits, then calls email_sender.wake()."""
+    email = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        user_id=user_id,
+        mocktest_id=mocktest_id,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(email)
+    return email
+
+
+# ---------------- SMTP ----------------
+class PermanentEmailError(Exception):
+    """The relay rejected the message for good; retrying cannot help."""
+
+
+class SMTPPool:
+    """Keeps logged-in SMTP connections open between batches."""
+
+    def __init__(self, max_idle, idle_seconds):
+        self.max_idle = max_idle
+        self.idle_seconds = idle_seconds
+        self.connects = 0
+        self._idle = []  # (connection, last used, monotonic)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            if SMTP_STARTTLS:
+                conn.starttls()
+            if SMTP_USER and SMTP_PASSWORD:
+                conn.login(SMTP_USER, SMTP_PASSWORD)
+        except Exception:
+            self._close(conn)
+            raise
+        self.connects += 1
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            if time.monotonic() - last_used > self.idle_seconds:
+                self._close(conn)  # the relay has probably dropped it already
+                continue
+            return conn
+        return self._connect()
+
+    def release(self, conn, healthy=True):
+        with self._lock:
+            if healthy and len(self._idle) < self.max_idle:
+                self._idle.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+
+    def close_idle(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            stale = [c for c, used in self._idle if force or now - used > self.idle_seconds]
+            self._idle = [(c, used) for c, used in self._idle if c not in stale]
+        for conn in stale:
+            self._close(conn)
+
+
+def _message(email):
+    msg = MIMEText(email.body)
+    msg["Subject"] = email.subject
+    msg["From"] = SMTP_FROM
+    msg["To"] = email.to_email
+    return msg.as_string()
+
+
+def _send(conn, email):
+    try:
+        conn.sendmail(SMTP_FROM, [email.to_email], _message(email))
+    except smtplib.SMTPRecipientsRefused as e:
+        raise PermanentEmailError(f"Recipient refused: {e.recipients}")
+    except smtplib.SMTPResponseException as e:
+        if e.smtp_code >= 500:
+            raise PermanentEmailError(f"{e.smtp_code} {e.smtp_error!r}")
+        raise
+
+
+# ---------------- Sender ----------------
+def retry_delay(attempts):
+    """Backoff before attempt `attempts + 1`: doubling from EMAIL_RETRY_BASE_SECONDS, with jitter."""
+    delay = min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class EmailSender:
+    def __init__(self, poll_seconds, batch_size, pool):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.pool = pool
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _claim(self, db):
+        now = datetime.utcnow()
+        due = and_(
+            or_(EmailOutbox.status == "pending", EmailOutbox.status == "sending"),
+            EmailOutbox.next_attempt_at <= now,
+        )
+        ids = db.scalars(
+            select(EmailOutbox.id).where(due).order_by(EmailOutbox.next_attempt_at).limit(self.batch_size)
+        ).all()
+        if not ids:
+            return []
+        token = str(uuid4())
+        # Re-checks `due`, so rows another worker claimed in between are skipped
+        db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), due)
+            .values(
+                status="sending",
+                claimed_by=token,
+                next_attempt_at=now + timedelta(seconds=EMAIL_LEASE_SECONDS),
+            )
+        )
+        db.commit()
+        return db.scalars(select(EmailOutbox).where(EmailOutbox.claimed_by == token)).all()
+
+    def _record(self, db, email, error=None, permanent=False):
+        now = datetime.utcnow()
+        email.claimed_by = None
+        if error is None:
+            email.status = "sent"
+            email.sent_at = now
+            email.last_error = None
+            outcome = "SENT"
+        else:
+            email.attempts += 1
+            email.last_error = str(error)[:2000]
+            if permanent or email.attempts >= EMAIL_MAX_ATTEMPTS:
+                email.status = "failed"
+                outcome = "FAILED"
+            else:
+                email.status = "pending"
+                email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+                outcome = None
+        if outcome:
+            db.add(EmailLog(
+                user_id=email.user_id,
+                mocktest_id=email.mocktest_id,
+                email=email.to_email,
+                subject=email.subject,
+                status=outcome,
+                created_at=now,
+            ))
+        return outcome
+
+    def send_due(self):
+        """Sends one batch of due emails; returns (sent, retried, failed)."""
+        sent = retried = failed = 0
+        db = SessionLocal()
+        try:
+            batch = self._claim(db)
+            conn = None
+            for email in batch:
+                error, permanent = None, False
+                try:
+                    if conn is None:
+                        conn = self.pool.acquire()
+                    _send(conn, email)
+                except PermanentEmailError as e:
+                    error, permanent = e, True
+                except smtplib.SMTPResponseException as e:
+                    error = e  # a 4xx reply; the connection itself is fine
+                except (smtplib.SMTPException, OSError) as e:
+                    error = e
+                    # The connection may be broken; start the next email on a fresh one
+                    if conn is not None:
+                        self.pool.release(conn, healthy=False)
+                        conn = None
+                outcome = self._record(db, email, error, permanent)
+                if outcome == "SENT":
+                    sent += 1
+                elif outcome == "FAILED":
+                    failed += 1
+                    print(f"❌ Email {email.id} to {email.to_email} failed: {error}")
+                else:
+                    retried += 1
+                db.commit()
+            if conn is not None:
+                self.pool.release(conn)
+        finally:
+            db.close()
+        with self._lock:
+            self.sent += sent
+            self.retried += retried
+            self.failed += failed
+        return sent, retried, failed
+
+    def drain(self):
+        """Sends batches until a batch comes back short; returns (sent, retried, failed)."""
+        totals = [0, 0, 0]
+        while True:
+            batch = self.send_due()
+            totals = [t + n for t, n in zip(totals, batch)]
+            if sum(batch) < self.batch_size:
+                return tuple(totals)
+
+    def wake(self):
+        """Asks the sender to look at the outbox now instead of at the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                started = time.perf_counter()
+                sent, retried, failed = self.drain()
+                if sent or retried or failed:
+                    print(
+                        f"📧 Emails: {sent} sent, {retried} to retry, {failed} failed "
+                        f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+                    )
+                self.pool.close_idle()
+            except Exception as e:
+                print(f"❌ Email sender error: {e}")
+
+    def start(self):
+        if EMAIL_SENDER_ENABLED and not SMTP_HOST:
+            print("⚠️ SMTP_HOST is not set: emails stay in the outbox until a configured worker sends them.")
+            return
+        if EMAIL_SENDER_ENABLED and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="email-sender", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.pool.close_idle(force=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "smtp_connects": self.pool.connects,
+            }
+
+
+email_sender = EmailSender(EMAIL_POLL_SECONDS, EMAIL_BATCH_SIZE, SMTPPool(SMTP_POOL_SIZE, SMTP_IDLE_SECONDS))
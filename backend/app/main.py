@@ -1,20 +1,51 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import Base, engine
+from app.database import SessionLocal
+from app.db_pool import pool_stats
+from app.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, render_metrics
 from app.routers import auth
 from app.routers.mocktests_router import router as mocktests_router
+from app.rank_index import rank_indexes
+from app.reports import report_jobs
+from app.autosave import autosave_buffer
+from app.ttl_store import ttl_store
+from app.email_outbox import email_sender
+from app.session_tokens import revocations
+from app.retention import retention_sweeper
+from app.schema import DB_SCHEMA_ON_STARTUP, upgrade_schema
 from fastapi.staticfiles import StaticFiles
 
 
 app = FastAPI(title="SaaS App Backend")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-# ✅ Database creation on startup (safer than global call)
+# ✅ Schema is migrated per deploy (alembic upgrade head); workers do no DDL by default
 @app.on_event("startup")
 def on_startup():
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables checked/created successfully.")
+    if DB_SCHEMA_ON_STARTUP == "migrate":
+        upgrade_schema(configure_logger=False)
+        print("✅ Database schema migrated.")
+    db = SessionLocal()
+    try:
+        rank_indexes.rebuild(db)
+    finally:
+        db.close()
+    print("✅ Rank indexes rebuilt.")
+    autosave_buffer.start()
+    ttl_store.start()
+    email_sender.start()
+    revocations.start()
+    retention_sweeper.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    autosave_buffer.stop()
+    ttl_store.stop()
+    email_sender.stop()
+    revocations.stop()
+    retention_sweeper.stop()
+    report_jobs.shutdown()
 
 # ✅ CORS Middleware
 app.add_middleware(
@@ -28,7 +59,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# ✅ Per-route latency, SQL counts and spans (outermost, so it sees the whole request)
+app.add_middleware(MetricsMiddleware)
 
 # ✅ Routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
@@ -36,3 +70,13 @@ app.include_router(mocktests_router)
 @app.get("/")
 def root():
     return {"msg": "Welcome to SaaS App Backend"}
+
+@app.get("/internal/db-pool")
+def db_pool():
+    """Pool occupancy, checkout waits, timeouts and overflow per engine."""
+    return pool_stats()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition for this worker process."""
+    return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,366 @@
+"""
+Request timing, SQL query counts and named spans, exposed as Prometheus text.
+
+MetricsMiddleware times every HTTP request by route template. While a request
+runs, a RequestTrace in a context variable collects the SQL statements it
+executes (counted by the engine hooks from instrument_queries) and the time
+spent in named spans:
+
+    with span("read_excel"):
+        ...
+
+Spans also feed a process-wide histogram, so work done outside a request
+(the report render pool, background flushers) still shows up. Set
+METRICS_SLOW_REQUEST_MS to log every slower request with its breakdown:
+
+    🐢 GET /mocktests/result/{result_id}/preview 200 1840 ms | db 6 queries 21 ms | read_excel 1630 ms, ranking 4 ms
+
+Metrics are per process; with several uvicorn workers each one reports its
+own, so scrape them individually or aggregate by instance.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.db_pool import pool_stats
+
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", "0"))  # 0 = off
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+# ---------------- Metric types ----------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = _labels(self.label_names, labels, [f'le="{_number(bound)}"'])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+request_seconds = Histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route", "status")
+)
+request_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request.", ("method", "route")
+)
+span_seconds = Histogram("span_duration_seconds", "Time spent in named code spans.", ("span",))
+db_queries = Counter("db_queries_total", "SQL statements executed, per engine.", ("engine",))
+db_query_seconds = Counter("db_query_seconds_total", "Time spent executing SQL, per engine.", ("engine",))
+
+METRICS = [request_seconds, request_queries, request_db_seconds, span_seconds, db_queries, db_query_seconds]
+
+
+# ---------------- Traces and spans ----------------
+class RequestTrace:
+    """What one request (or one traced() block) spent its time on."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.spans = {}  # name -> seconds, summed over repeats
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+
+_trace = ContextVar("metrics_trace", default=None)
+
+
+def observe_span(name, seconds):
+    span_seconds.observe((name,), seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add_span(name, seconds)
+
+
+def add_to_trace(spans):
+    """Attributes spans timed elsewhere (e.g. in the report pool) to the current request."""
+    trace = _trace.get()
+    if trace is not None:
+        for name, seconds in spans.items():
+            trace.add_span(name, seconds)
+
+
+@contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_span(name, time.perf_counter() - start)
+
+
+@contextmanager
+def traced():
+    """Collects the spans and queries run inside the block into a fresh RequestTrace."""
+    trace = RequestTrace()
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+def instrument_queries(engine, name):
+    """Counts statements and their execution time on `engine` (a sync Engine)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        db_queries.inc((name,))
+        db_query_seconds.inc((name,), elapsed)
+        trace = _trace.get()
+        if trace is not None:
+            trace.queries += 1
+            trace.db_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute
+        starts = context.connection.info.get("metrics_query_start") if context.connection else None
+        if starts:
+            starts.pop()
+
+    return engine
+
+
+# ---------------- Middleware ----------------
+def _slow_request_line(method, route, status, seconds, trace):
+    spans = ", ".join(
+        f"{name} {spent * 1000:.0f} ms" for name, spent in sorted(trace.spans.items(), key=lambda s: -s[1])
+    )
+    line = (
+        f"🐢 {method} {route} {status} {seconds * 1000:.0f} ms"
+        f" | db {trace.queries} queries {trace.db_seconds * 1000:.0f} ms"
+    )
+    return f"{line} | {spans}" if spans else line
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, query counts and spans per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        trace = RequestTrace()
+        token = _trace.set(trace)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _trace.reset(token)
+            # The router stores the matched route in the scope; label by its
+            # template so ids do not explode the series count
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            request_seconds.observe((method, route, str(status)), elapsed)
+            request_queries.observe((method, route), trace.queries)
+            request_db_seconds.observe((method, route), trace.db_seconds)
+            if METRICS_SLOW_REQUEST_MS and elapsed * 1000 >= METRICS_SLOW_REQUEST_MS:
+                print(_slow_request_line(method, route, status, elapsed, trace))
+
+
+# ---------------- Exposition ----------------
+POOL_COUNTERS = {
+    "checkouts": ("db_pool_checkouts_total", "Connections checked out of the pool."),
+    "wait_seconds_total": ("db_pool_checkout_wait_seconds_total", "Time spent waiting for a pooled connection."),
+    "timeouts": ("db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT."),
+    "overflow_checkouts": ("db_pool_overflow_checkouts_total", "Checkouts served beyond pool_size."),
+    "connects": ("db_pool_connects_total", "New database connections opened."),
+    "pings": ("db_pool_pings_total", "Idle pre-pings sent."),
+    "ping_failures": ("db_pool_ping_failures_total", "Idle pre-pings that found a dead connection."),
+}
+POOL_GAUGES = {
+    "wait_seconds_max": ("db_pool_checkout_wait_seconds_max", "Longest wait for a pooled connection."),
+    "size": ("db_pool_size", "Configured pool size."),
+    "checked_out": ("db_pool_checked_out", "Connections currently checked out."),
+    "overflow": ("db_pool_overflow", "Overflow connections currently open."),
+}
+BANK_CACHE_METRICS = {
+    "entries": ("question_bank_cache_entries", "gauge", "Question banks held in memory."),
+    "bytes": ("question_bank_cache_bytes", "gauge", "Approximate size of the cached banks."),
+    "hits": ("question_bank_cache_hits_total", "counter", "Bank lookups served from memory."),
+    "misses": ("question_bank_cache_misses_total", "counter", "Bank lookups that loaded a bundle or parsed Excel."),
+    "evictions": ("question_bank_cache_evictions_total", "counter", "Banks evicted to stay under the size cap."),
+}
+
+
+def _pool_lines():
+    stats = pool_stats()
+    lines = []
+    for metrics, kind in ((POOL_COUNTERS, "counter"), (POOL_GAUGES, "gauge")):
+        for field, (name, help) in metrics.items():
+            samples = [(engine, s[field]) for engine, s in stats.items() if field in s]
+            if not samples:
+                continue
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{engine="{_escape(engine)}"}} {_number(value)}' for engine, value in samples]
+    return lines
+
+
+def _bank_cache_lines():
+    from app.question_bank import question_bank_cache
+
+    stats = question_bank_cache.stats()
+    lines = []
+    for field, (name, kind, help) in BANK_CACHE_METRICS.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {stats[field]}"]
+    return lines
+
+
+PASSWORD_HASH_METRICS = {
+    "in_flight": ("password_hash_in_flight", "gauge", "bcrypt calls running on the hashing pool."),
+    "queued": ("password_hash_queue_depth", "gauge", "bcrypt calls waiting for a hashing thread."),
+    "workers": ("password_hash_workers", "gauge", "Threads in the hashing pool."),
+    "completed": ("password_hash_completed_total", "counter", "bcrypt calls finished."),
+    "rejected": ("password_hash_rejected_total", "counter", "bcrypt calls refused with 503 because the queue was full."),
+    "rehashed": ("password_hash_rehashed_total", "counter", "Logins that upgraded a hash to the current cost."),
+    "busy_seconds": ("password_hash_busy_seconds_total", "counter", "Time the hashing threads spent in bcrypt."),
+}
+
+
+def _password_hash_lines():
+    from app.passwords import password_hasher
+
+    stats = password_hasher.stats()
+    lines = []
+    for field, (name, kind, help) in PASSWORD_HASH_METRICS.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_number(stats[field])}"]
+    return lines
+
+
+SESSION_REVOCATION_METRICS = {
+    "entries": ("session_revocations_entries", "gauge", "Revoked, unexpired session tokens held in memory."),
+    "syncs": ("session_revocation_syncs_total", "counter", "Revocation syncs from the session_revocations table."),
+    "rejected": ("session_revoked_tokens_rejected_total", "counter", "Requests refused because their token was revoked."),
+}
+
+
+def _session_revocation_lines():
+    from app.session_tokens import revocations
+
+    stats = revocations.stats()
+    lines = []
+    for field, (name, kind, help) in SESSION_REVOCATION_METRICS.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {stats[field]}"]
+    return lines
+
+
+def _retention_lines():
+    from app.retention import retention_sweeper
+
+    stats = retention_sweeper.stats()
+    lines = [
+        "# HELP retention_runs_total Retention sweeps completed.",
+        "# TYPE retention_runs_total counter",
+        f"retention_runs_total {stats['runs']}",
+        "# HELP retention_deleted_rows_total Expired or abandoned rows deleted, per table.",
+        "# TYPE retention_deleted_rows_total counter",
+    ]
+    lines += [f'retention_deleted_rows_total{{table="{t}"}} {n}' for t, n in stats["deleted"].items()]
+    lines += [
+        "# HELP retention_last_run_seconds Duration of the latest sweep, per table.",
+        "# TYPE retention_last_run_seconds gauge",
+    ]
+    lines += [f'retention_last_run_seconds{{table="{t}"}} {_number(s)}' for t, s in stats["last_run_seconds"].items()]
+    return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += _pool_lines()
+    lines += _bank_cache_lines()
+    lines += _password_hash_lines()
+    lines += _session_revocation_lines()
+    lines += _retention_lines()
+    return "\n".join(lines) + "\n"
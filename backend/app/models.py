@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Date, DateTime, ForeignKey, Boolean, JSON, Text
+    Column, Integer, Float, String, Date, DateTime, ForeignKey, Boolean, JSON, Text, Index
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -24,7 +24,7 @@ class User(Base):
 class UserProfile(Base):
     __tablename__ = "user_profiles"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("auth_users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("auth_users.id"), nullable=False, index=True)
     full_name = Column(String(100))
     dob = Column(Date)
     gender = Column(String(10))
@@ -68,7 +68,7 @@ class UserResult(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("auth_users.id"), nullable=False)
     mocktest_id = Column(Integer, ForeignKey("mock_test_files.id"), nullable=False)
-    score = Column(Integer)
+    score = Column(Float)  # fractional with negative marking
     total_questions = Column(Integer)
     percentage = Column(String(20))
     status = Column(String(50))  # e.g., in_progress, completed, auto_submitted
@@ -80,16 +80,31 @@ class UserResult(Base):
     mocktest = relationship("MockTestFile", back_populates="results")
     sections = relationship("UserSectionResult", back_populates="user_result", cascade="all, delete-orphan")
 
+    # Created by migrations/versions/0002_hot_path_indexes.py
+    __table_args__ = (
+        # Rank index catch-up (mocktest_id = ? AND id > watermark) and section reports
+        Index("ix_user_results_mocktest_id_id", "mocktest_id", "id"),
+        # /result/{test_id}: a user's latest result for one test
+        Index("ix_user_results_user_mocktest_id", "user_id", "mocktest_id", id.desc()),
+        # /results/summary: keyset pages of one user's results, newest first.
+        # On PostgreSQL the INCLUDE columns make it an index-only scan.
+        Index(
+            "ix_user_results_user_submitted",
+            "user_id", submitted_at.desc(), id.desc(),
+            postgresql_include=["mocktest_id", "score", "total_questions", "percentage", "status"],
+        ),
+    )
+
 
 class UserSectionResult(Base):
     __tablename__ = "user_section_results"
     id = Column(Integer, primary_key=True, index=True)
-    user_result_id = Column(Integer, ForeignKey("user_results.id"), nullable=False)
+    user_result_id = Column(Integer, ForeignKey("user_results.id"), nullable=False, index=True)
     section_name = Column(String(200))
     correct = Column(Integer, default=0)
     wrong = Column(Integer, default=0)
     unanswered = Column(Integer, default=0)
-    marks_obtained = Column(Integer, default=0)
+    marks_obtained = Column(Float, default=0)  # negative marking makes this fractional
 
     user_result = relationship("UserResult", back_populates="sections")
 
@@ -117,10 +132,16 @@ class ExamCache(Base):
     answers_json = Column(JSON, default={})  # {"1":"A", "2":"C"}
     time_left = Column(Integer, default=3600)  # seconds
     last_saved_at = Column(DateTime, default=datetime.utcnow)
+    answer_seqs = Column(JSON)  # {"1": 7}: sync sequence that last wrote each answer
+    seq = Column(Integer, nullable=False, default=0, server_default="0")  # highest sync sequence merged
+    attempt = Column(Integer, nullable=False, default=0, server_default="0")  # attempts submitted so far
 
     user = relationship("User", back_populates="caches")
     mocktest = relationship("MockTestFile", back_populates="caches")
 
+    # Resume and autosave flushes look attempts up by (user, test); flushes merge into the one row
+    __table_args__ = (Index("ix_exam_cache_user_mocktest", "user_id", "mocktest_id", unique=True),)
+
 
 class EmailLog(Base):
     __tablename__ = "email_logs"
@@ -131,3 +152,41 @@ class EmailLog(Base):
     subject = Column(String(255))
     status = Column(String(50))  # SENT, FAILED
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class EmailOutbox(Base):
+    """Emails waiting for the background sender (app/email_outbox.py)."""
+    __tablename__ = "email_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("auth_users.id"), nullable=True)
+    mocktest_id = Column(Integer, ForeignKey("mock_test_files.id"), nullable=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # or lease expiry while sending
+    claimed_by = Column(String(36))
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+    # The sender claims due rows by (status, next_attempt_at)
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),)
+
+
+class TTLEntry(Base):
+    """Short-lived shared entries (OTPs, reset grants); see app/ttl_store.py."""
+    __tablename__ = "ttl_entries"
+    key = Column(String(255), primary_key=True)
+    value = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # the sweeper deletes by expiry
+
+
+class SessionRevocation(Base):
+    """Logged-out signed session tokens, until they expire; see app/session_tokens.py."""
+    __tablename__ = "session_revocations"
+    id = Column(Integer, primary_key=True)  # workers sync new rows by id
+    token_id = Column(String(32), unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # the row can go once the token has expired
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # and re-read recent ones, for late commits
@@ -0,0 +1,146 @@
+"""
+Compact stored form of a submission in UserResult.details.
+
+Results used to store a JSON object per question, copying its explanation,
+image URLs, section and correct answer. Now a result stores the bank version
+it was graded against and two packed 4-bit vectors: the selected options and
+the answer key at grading time. Question ids are stored only when they are
+not the default "1".."n" sequence. Question text, explanations and images
+are rehydrated from the question bank when a result is read. Section numbers
+live in user_section_results.
+
+    {"format": 2, "bank_version": "...", "n": 100,
+     "selected": "<base64>", "key": "<base64>"}
+
+migrate_packed_details.py converts rows stored in the old per-question form.
+"""
+import base64
+
+import numpy as np
+
+from app.bank_bundle import answer_code
+from app.scoring import INVALID_ANSWER
+
+PACKED_FORMAT = 2
+_NIBBLE_INVALID = 15
+_LETTERS = "ABCDE"
+INVALID_SELECTION = "?"  # an answer that was not A-E; the original text is not kept
+
+
+def pack_codes(codes):
+    """uint8 answer codes (0 = none, 1..5 = A..E, 255 = invalid) -> base64, two per byte."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    codes = np.where(codes == INVALID_ANSWER, _NIBBLE_INVALID, codes).astype(np.uint8)
+    if len(codes) % 2:
+        codes = np.append(codes, np.uint8(0))
+    packed = (codes[0::2] << 4) | codes[1::2]
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def unpack_codes(text, n):
+    raw = np.frombuffer(base64.b64decode(text), dtype=np.uint8)
+    codes = np.empty(len(raw) * 2, dtype=np.uint8)
+    codes[0::2] = raw >> 4
+    codes[1::2] = raw & 0x0F
+    codes = codes[:n]
+    return np.where(codes == _NIBBLE_INVALID, INVALID_ANSWER, codes).astype(np.uint8)
+
+
+def _letter(code):
+    if code == 0:
+        return ""
+    if code == INVALID_ANSWER:
+        return INVALID_SELECTION
+    return _LETTERS[code - 1]
+
+
+def _default_qids(n):
+    return [str(i) for i in range(1, n + 1)]
+
+
+def pack_details(bank_version, qids, selected_codes, key_codes):
+    details = {
+        "format": PACKED_FORMAT,
+        "bank_version": bank_version,
+        "n": len(qids),
+        "selected": pack_codes(selected_codes),
+        "key": pack_codes(key_codes),
+    }
+    if list(qids) != _default_qids(len(qids)):
+        details["qids"] = list(qids)
+    return details
+
+
+def is_packed(details):
+    return isinstance(details, dict) and details.get("format") == PACKED_FORMAT
+
+
+def pack_legacy(details):
+    """Packed form of a legacy details value (per-question list or {"questions": [...]})."""
+    questions = details.get("questions", []) if isinstance(details, dict) else details or []
+    qids = [str(q.get("question_id", "")) for q in questions]
+    selected = [
+        answer_code(q.get("selected") or "") or (INVALID_ANSWER if (q.get("selected") or "").strip() else 0)
+        for q in questions
+    ]
+    key = [answer_code(q.get("correct") or "") for q in questions]
+    return pack_details(None, qids, selected, key)
+
+
+def stored_answers(details):
+    """
+    Per-question {question_id, selected, correct, is_correct} from a details
+    value in either the packed or the legacy form.
+    """
+    if not is_packed(details):
+        questions = details.get("questions", []) if isinstance(details, dict) else details or []
+        return [
+            {
+                "question_id": str(q.get("question_id", "")),
+                "selected": q.get("selected", ""),
+                "correct": q.get("correct", ""),
+                "is_correct": q.get("is_correct", False),
+            }
+            for q in questions
+        ]
+
+    n = details["n"]
+    qids = details.get("qids") or _default_qids(n)
+    selected = unpack_codes(details["selected"], n)
+    key = unpack_codes(details["key"], n)
+    is_correct = (selected == key) & (key != 0)
+    return [
+        {
+            "question_id": qid,
+            "selected": _letter(int(s)),
+            "correct": _letter(int(k)),
+            "is_correct": bool(c),
+        }
+        for qid, s, k, c in zip(qids, selected, key, is_correct)
+    ]
+
+
+def bank_changed(details, bank):
+    """True if the result was graded against another version of the bank (unknown for migrated rows)."""
+    version = details.get("bank_version") if is_packed(details) else None
+    return version is not None and version != bank.version
+
+
+def expand_details(details, bank):
+    """
+    Stored answers rehydrated with section, explanation and images from the
+    bank. If the bank has changed since grading, its questions may no longer
+    match the stored ids, so only the stored answers are returned.
+    """
+    by_id = {} if bank_changed(details, bank) else bank.by_id
+    expanded = []
+    for a in stored_answers(details):
+        q = by_id.get(a["question_id"], {})
+        expanded.append({
+            **a,
+            "explanation": q.get("explanation", ""),
+            "explanation_image": q.get("explanation_image", ""),
+            "question_image": q.get("question_image", ""),
+            "section": q.get("section", "General"),
+        })
+    return expanded
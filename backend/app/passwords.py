@@ -0,0 +1,123 @@
+"""
+Password hashing on a dedicated, bounded thread pool.
+
+bcrypt costs 100-300 ms of CPU per hash or verify. Running it on the
+request threadpool lets a login storm take every thread, so nothing else
+gets served. Here it runs on PASSWORD_HASH_WORKERS threads (bcrypt releases
+the GIL, so they use separate cores), and at most PASSWORD_HASH_MAX_QUEUE
+more calls may wait. Beyond that, callers get a 503 with Retry-After at once
+instead of queueing without limit.
+
+    BCRYPT_ROUNDS             work factor for new hashes (each +1 doubles the cost)
+    PASSWORD_HASH_WORKERS     hashing threads (default: half the cores, at least 1)
+    PASSWORD_HASH_MAX_QUEUE   calls allowed to wait for a hashing thread
+
+Hashes whose cost differs from BCRYPT_ROUNDS are rehashed on the next
+successful login, so changing the factor migrates users as they sign in.
+bench_password_hashing.py measures what a given factor costs in logins per
+second per core.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.metrics import span
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "256"))
+PASSWORD_HASH_RETRY_AFTER = "1"
+
+
+def make_context(rounds):
+    # min = max = default, so any other cost counts as outdated and is rehashed
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+pwd_context = make_context(BCRYPT_ROUNDS)
+
+
+class PasswordHasher:
+    def __init__(self, context, workers, max_queue):
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.busy_seconds = 0.0
+        self._pending = 0  # running + queued
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+                self.busy_seconds += elapsed
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many sign-ins in progress, please retry",
+                    headers={"Retry-After": PASSWORD_HASH_RETRY_AFTER},
+                )
+            self._pending += 1
+        return self._executor.submit(self._timed, fn, *args)
+
+    # ---------------- Async (event loop) callers ----------------
+    async def hash(self, password):
+        with span("password_hash"):
+            return await asyncio.wrap_future(self._submit(self.context.hash, password))
+
+    async def verify_and_update(self, password, hashed):
+        """(valid, new hash or None); a new hash means the stored one used an outdated cost."""
+        with span("password_hash"):
+            valid, new_hash = await asyncio.wrap_future(
+                self._submit(self.context.verify_and_update, password, hashed)
+            )
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    # ---------------- Sync (threadpool) callers ----------------
+    def hash_blocking(self, password):
+        with span("password_hash"):
+            return self._submit(self.context.hash, password).result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": min(self._pending, self.workers),
+                "queued": max(self._pending - self.workers, 0),
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "busy_seconds": round(self.busy_seconds, 6),
+                "rounds": BCRYPT_ROUNDS,
+            }
+
+
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
@@ -0,0 +1,277 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.bank_bundle import answer_code, load_bundle
+from app.metrics import span
+
+OPTION_COLUMNS = ["option_a", "option_b", "option_c", "option_d", "option_e"]
+QUESTION_BANK_CACHE_MB = int(os.getenv("QUESTION_BANK_CACHE_MB", "256"))
+
+
+# ---------------- Helpers ----------------
+def make_full_url(path):
+    if not path:
+        return ""
+    path = path.replace("\\", "/")
+    if path.startswith("http"):
+        return path
+    if path.startswith("static/"):
+        return f"http://localhost:8000/{path}"
+    filename = os.path.basename(path)
+    return f"http://localhost:8000/static/mocktest_images/{filename}"
+
+
+def _cell(value):
+    """Ensures consistent text for all Excel cells."""
+    if value is None:
+        return ""
+    val = str(value).strip()
+    if val.lower() in ["nan", "none"]:
+        return ""
+    return val
+
+
+def _first(row, names):
+    for n in names:
+        val = _cell(row.get(n))
+        if val:
+            return val
+    return ""
+
+
+def _question_id(raw, idx):
+    if not raw:
+        return str(idx)
+    try:
+        return str(int(float(raw)))
+    except ValueError:
+        return raw
+
+
+def read_question_rows(path: str):
+    """
+    Reads the active sheet of a question-bank Excel file with openpyxl.
+    Unmerges merged cells and returns one dict per row, keyed by the
+    lower-cased header (spaces replaced with underscores).
+    """
+    import openpyxl
+
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"File not found: {path}")
+
+    with span("read_excel"):
+        wb = openpyxl.load_workbook(path, data_only=True)
+        ws = wb.active
+
+        # Unmerge cells so each cell has its own value
+        for merged in list(ws.merged_cells.ranges):
+            ws.unmerge_cells(str(merged))
+
+        data = ws.values
+        cols = [str(c).strip().lower().replace(" ", "_") for c in next(data)]
+        rows = []
+        for values in data:
+            # Later duplicate headers win, same as DataFrame.to_dict()
+            rows.append(dict(zip(cols, values)))
+        wb.close()
+    return rows
+
+
+def normalize_question(row, idx):
+    """Builds the canonical question dict served to clients and used for grading."""
+    qtext = _first(row, ["question", "question_text"])
+    qid = _first(row, ["question_id"])
+    if not qid and not qtext:
+        return None  # blank trailing row
+
+    return {
+        "question_id": _question_id(qid, idx),
+        "question": qtext,
+        "options": [_cell(row.get(col)) for col in OPTION_COLUMNS],
+        "correct": _first(row, ["correct_option", "answer", "correct"]).upper(),
+        "explanation": _first(row, ["explanation"]),
+        "section": _first(row, ["section", "topic"]) or "General",
+        "passage_id": _first(row, ["passage_id", "passageid"]),
+        "passage_text": _first(row, ["passage_text", "passage"]),
+        "question_image": make_full_url(_first(row, ["question_image"])),
+        "explanation_image": make_full_url(_first(row, ["explanation_image"])),
+        "passage_image": make_full_url(_first(row, ["passage_image"])),
+    }
+
+
+def questions_nbytes(questions):
+    """Approximate size of normalized questions: the length of their strings."""
+    return sum(
+        sum(len(v) for v in q.values() if isinstance(v, str)) + sum(len(o) for o in q["options"])
+        for q in questions
+    )
+
+
+# ---------------- Question bank ----------------
+class QuestionBank:
+    """Parsed, normalized contents of one MockTestFile at one file version."""
+
+    def __init__(self, test_id, version, questions):
+        self.test_id = test_id
+        self.version = version
+        self.questions = questions
+        self.by_id = {q["question_id"]: q for q in questions}
+        self.answer_key = {q["question_id"]: q["correct"] for q in questions}
+        self.section_map = {q["question_id"]: q["section"] for q in questions}
+        self.qids = [q["question_id"] for q in questions]
+        self.section_names = list(dict.fromkeys(q["section"] for q in questions))
+        codes = {name: i for i, name in enumerate(self.section_names)}
+        self.section_codes = np.array([codes[q["section"]] for q in questions], dtype=np.uint16)
+        self.answer_codes = np.array([answer_code(q["correct"]) for q in questions], dtype=np.uint8)
+        self.nbytes = questions_nbytes(questions)
+        self.derived = {}  # see bank_derived
+        self.derived_nbytes = 0  # charged by QuestionBankCache.charge
+
+    def __len__(self):
+        return len(self.questions)
+
+    @classmethod
+    def from_excel(cls, test_id, path, version):
+        questions = []
+        for idx, row in enumerate(read_question_rows(path), start=1):
+            q = normalize_question(row, idx)
+            if q:
+                questions.append(q)
+        return cls(test_id, version, questions)
+
+
+def file_version(path: str):
+    """Version tag for a bank file, derived from its mtime and size."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"File not found: {path}")
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+_derived_lock = threading.Lock()
+
+
+def bank_derived(bank, key, build):
+    """
+    `build(bank)`, built once per bank and kept on it, so that views derived
+    from a bank (delivery payloads, scoring engines) leave memory when
+    QuestionBankCache evicts the bank instead of pinning it. The value's
+    `nbytes` is charged to the bank's cache entry.
+    """
+    with _derived_lock:
+        value = bank.derived.get(key)
+    if value is None:
+        built = build(bank)
+        with _derived_lock:
+            value = bank.derived.setdefault(key, built)
+        if value is built:
+            question_bank_cache.charge(bank, getattr(value, "nbytes", 0))
+    return value
+
+
+class QuestionBankCache:
+    """
+    LRU cache of question banks keyed by (MockTestFile.id, file version).
+    Entries are either parsed QuestionBank objects or MappedQuestionBank views
+    over a compiled bundle (see app/bank_bundle.py).
+    A changed file gets a new version, so stale entries simply stop being hit
+    and age out. Total size, counting what bank_derived built on each bank,
+    is bounded by `max_bytes`.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    def get(self, test):
+        version = file_version(test.file_path)
+        key = (test.id, version)
+
+        with self._lock:
+            bank = self._entries.get(key)
+            if bank is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return bank
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # One parse per key even when many requests miss at once
+        with build_lock:
+            with self._lock:
+                bank = self._entries.get(key)
+                if bank is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return bank
+                self.misses += 1
+
+            try:
+                # Prefer the compiled, mmap-shared bundle when it matches the file
+                bank = load_bundle(test.id, version) or QuestionBank.from_excel(test.id, test.file_path, version)
+                with self._lock:
+                    self._put(key, bank)
+            finally:
+                with self._lock:
+                    self._build_locks.pop(key, None)
+        return bank
+
+    @staticmethod
+    def _size(bank):
+        return bank.nbytes + bank.derived_nbytes
+
+    def _put(self, key, bank):
+        # Drop older versions of the same test
+        for old in [k for k in self._entries if k[0] == key[0]]:
+            self._bytes -= self._size(self._entries.pop(old))
+        self._entries[key] = bank
+        self._bytes += self._size(bank)
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._size(evicted)
+            self.evictions += 1
+
+    def charge(self, bank, nbytes):
+        """Adds `nbytes` (negative when freed) of derived data to a bank's size."""
+        with self._lock:
+            bank.derived_nbytes += nbytes
+            if self._entries.get((bank.test_id, bank.version)) is bank:
+                self._bytes += nbytes
+                self._evict()
+
+    def invalidate(self, test_id=None):
+        with self._lock:
+            for key in [k for k in self._entries if test_id is None or k[0] == test_id]:
+                self._bytes -= self._size(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+question_bank_cache = QuestionBankCache(QUESTION_BANK_CACHE_MB * 1024 * 1024)
+
+
+def get_question_bank(test):
+    """Returns the cached QuestionBank for a MockTestFile row."""
+    return question_bank_cache.get(test)
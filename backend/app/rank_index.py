@@ -0,0 +1,260 @@
+"""
+Per-mock-test rank and percentile index.
+
+Each mock test keeps a Fenwick tree over quantized score buckets for the
+overall score and one per section, so rank, percentile and topper score are
+O(log N) lookups instead of a full read of user_results. Indexes are rebuilt
+from the table on startup, updated in-process when submit_test commits, and
+caught up with rows committed by other workers through a cheap
+`id > highest id seen` query, joined to user_section_results, before being read.
+
+Ids are handed out before commit, so a lower id can become visible after a
+higher one. Every RANK_RESCAN_SECONDS the catch-up also lists the ids above
+the watermark (an index-only scan) and indexes any it has not seen. The
+watermark only moves past ids seen at least RANK_SETTLE_SECONDS before such
+a rescan, so a late commit is never skipped unless its transaction ran
+longer than that.
+"""
+import os
+import threading
+import time
+from itertools import groupby
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+
+SCORE_RESOLUTION = 100  # buckets per mark, i.e. scores are exact to 0.01
+RANK_RESCAN_SECONDS = float(os.getenv("RANK_RESCAN_SECONDS", "5"))
+RANK_SETTLE_SECONDS = float(os.getenv("RANK_SETTLE_SECONDS", "60"))
+
+
+class ScoreHistogram:
+    """Fenwick tree over integer score buckets that grows to fit new scores."""
+
+    def __init__(self, resolution=SCORE_RESOLUTION):
+        self.resolution = resolution
+        self.count = 0
+        self.max_bucket = None
+        self._counts = {}
+        self._lo = 0
+        self._tree = [0]
+
+    def _bucket(self, score):
+        return int(round(float(score or 0) * self.resolution))
+
+    def _rebuild(self, lo, hi):
+        size = hi - lo + 1
+        self._lo, self._tree = lo, [0] * (size + 1)
+        for bucket, n in self._counts.items():
+            self._update(bucket, n)
+
+    def _update(self, bucket, delta):
+        i = bucket - self._lo + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket):
+        """Number of scores in buckets <= bucket."""
+        i = min(bucket - self._lo + 1, len(self._tree) - 1)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, score):
+        bucket = self._bucket(score)
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self.count += 1
+        self.max_bucket = bucket if self.max_bucket is None else max(self.max_bucket, bucket)
+
+        size = len(self._tree) - 1
+        if self._lo <= bucket < self._lo + size:
+            self._update(bucket, 1)
+            return
+
+        # Out of range: rebuild with headroom on both sides so the size at
+        # least doubles and rebuilds stay amortized O(1) per insert
+        lo, hi = (min(self._lo, bucket), max(self._lo + size - 1, bucket)) if size else (bucket, bucket)
+        pad = max(hi - lo + 1, 64)
+        self._rebuild(lo - pad // 2, hi + pad // 2)
+
+    def count_above(self, score):
+        bucket = self._bucket(score)
+        if bucket < self._lo:
+            return self.count
+        return self.count - self._prefix(bucket)
+
+    def rank(self, score):
+        """Competition rank (1 = best) among everyone indexed."""
+        return self.count_above(score) + 1
+
+    def percentile(self, score):
+        if not self.count:
+            return 0
+        return round(((self.count - min(self.rank(score), self.count)) / self.count) * 100, 2)
+
+    @property
+    def max_score(self):
+        if self.max_bucket is None:
+            return 0
+        return self.max_bucket / self.resolution
+
+
+class RankIndex:
+    def __init__(self, mocktest_id):
+        self.mocktest_id = mocktest_id
+        self.overall = ScoreHistogram()
+        self.sections = {}
+        self.watermark = 0   # every row with id <= watermark is indexed
+        self.max_seen = 0    # highest id read by a catch-up
+        self._recent = {}    # indexed ids above the watermark -> monotonic time first indexed
+        self._rescanned_at = 0.0
+        self.lock = threading.Lock()
+
+    def _add(self, result_id, score, sections):
+        self.overall.add(score)
+        for name, marks in sections.items():
+            self.sections.setdefault(name, ScoreHistogram()).add(marks)
+
+    def add_local(self, result_id, score, sections):
+        with self.lock:
+            if result_id <= self.watermark or result_id in self._recent:
+                return
+            self._recent[result_id] = time.monotonic()
+            self._add(result_id, score, sections)
+
+    def _rows_query(self, condition):
+        s = models.UserSectionResult
+        return (
+            select(models.UserResult.id, models.UserResult.score, s.section_name, s.marks_obtained)
+            .outerjoin(s, s.user_result_id == models.UserResult.id)
+            .filter(models.UserResult.mocktest_id == self.mocktest_id, condition)
+            .order_by(models.UserResult.id)
+        )
+
+    def _pending(self):
+        return self._rows_query(models.UserResult.id > self.max_seen)
+
+    def _gap_query(self):
+        """Ids at or below the highest seen that the watermark has not settled yet."""
+        r = models.UserResult
+        return select(r.id).filter(
+            r.mocktest_id == self.mocktest_id, r.id > self.watermark, r.id <= self.max_seen
+        )
+
+    def _apply(self, rows):
+        with self.lock:
+            now = time.monotonic()
+            for result_id, group in groupby(rows, key=lambda row: row[0]):
+                self.max_seen = max(self.max_seen, result_id)
+                if result_id <= self.watermark or result_id in self._recent:
+                    continue  # added locally or by a concurrent catch-up
+                group = list(group)
+                sections = {name: marks or 0 for _, _, name, marks in group if name is not None}
+                self._add(result_id, group[0][1], sections)
+                self._recent[result_id] = now
+
+    def _rescan_due(self):
+        with self.lock:
+            return self.watermark < self.max_seen and time.monotonic() - self._rescanned_at >= RANK_RESCAN_SECONDS
+
+    def _unseen(self, ids):
+        with self.lock:
+            return [i for i in ids if i > self.watermark and i not in self._recent]
+
+    def _settle(self, started):
+        """Moves the watermark past ids seen RANK_SETTLE_SECONDS before a rescan that began at `started`."""
+        with self.lock:
+            self._rescanned_at = started
+            cutoff = started - RANK_SETTLE_SECONDS
+            settled = [i for i, seen in self._recent.items() if seen <= cutoff]
+            if settled:
+                self.watermark = max(self.watermark, max(settled))
+                self._recent = {i: seen for i, seen in self._recent.items() if i > self.watermark}
+
+    def catch_up(self, db: Session):
+        """Indexes rows committed (by any worker) since the last catch-up."""
+        self._apply(db.execute(self._pending()).all())
+        if self._rescan_due():
+            started = time.monotonic()
+            unseen = self._unseen(db.scalars(self._gap_query()).all())
+            if unseen:
+                self._apply(db.execute(self._rows_query(models.UserResult.id.in_(unseen))).all())
+            self._settle(started)
+
+    async def catch_up_async(self, db: AsyncSession):
+        self._apply((await db.execute(self._pending())).all())
+        if self._rescan_due():
+            started = time.monotonic()
+            unseen = self._unseen((await db.scalars(self._gap_query())).all())
+            if unseen:
+                self._apply((await db.execute(self._rows_query(models.UserResult.id.in_(unseen)))).all())
+            self._settle(started)
+
+    def standing(self, score, sections=None):
+        """Rank/percentile/topper for a score, plus per-section percentiles."""
+        with self.lock:
+            total_users = self.overall.count
+            rank = min(self.overall.rank(score), total_users) if total_users else 0
+            return {
+                "rank": rank,
+                "total_users": total_users,
+                "percentile": self.overall.percentile(score),
+                "topper_score": self.overall.max_score,
+                "section_percentiles": {
+                    name: self.sections[name].percentile(marks)
+                    for name, marks in (sections or {}).items()
+                    if name in self.sections
+                },
+            }
+
+
+class RankIndexRegistry:
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _index(self, mocktest_id):
+        with self._lock:
+            if mocktest_id not in self._indexes:
+                self._indexes[mocktest_id] = RankIndex(mocktest_id)
+            return self._indexes[mocktest_id]
+
+    def rebuild(self, db: Session):
+        """Rebuilds every index from user_results (called on startup)."""
+        with self._lock:
+            self._indexes = {}
+        test_ids = [tid for (tid,) in db.query(models.UserResult.mocktest_id).distinct()]
+        for tid in test_ids:
+            self._index(tid).catch_up(db)
+
+    def record(self, result, sections):
+        """Adds a freshly committed UserResult to its test's index."""
+        self._index(result.mocktest_id).add_local(result.id, result.score, sections)
+
+    def get(self, db: Session, mocktest_id):
+        index = self._index(mocktest_id)
+        index.catch_up(db)
+        return index
+
+    async def get_async(self, db: AsyncSession, mocktest_id):
+        index = self._index(mocktest_id)
+        await index.catch_up_async(db)
+        return index
+
+
+rank_indexes = RankIndexRegistry()
+
+
+def performance_band(percentile):
+    return (
+        "Top 10%" if percentile >= 90
+        else "Top 25%" if percentile >= 75
+        else "Top 50%" if percentile >= 50
+        else "Needs Improvement"
+    )
@@ -0,0 +1,373 @@
+"""
+Result PDF reports rendered out of band.
+
+Rendering (three matplotlib charts plus an FPDF document) is CPU-heavy, so it
+runs on a dedicated process pool instead of the API workers. A job is keyed
+by the report's artifact key; the finished PDF is written to the artifact
+store, where every API worker on the node can serve it. Charts use the
+object-oriented Agg Figure API, which keeps no global pyplot state.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from app.artifacts import artifact_key, artifact_store
+from app.metrics import observe_span, span, traced
+
+REPORT_RENDERER_VERSION = 1  # bump when the PDF layout changes
+REPORT_POOL_SIZE = int(os.getenv("REPORT_POOL_SIZE", "2"))
+REPORT_WAIT_SECONDS = float(os.getenv("REPORT_WAIT_SECONDS", "30"))
+REPORT_RENDER_ON_SUBMIT = os.getenv("REPORT_RENDER_ON_SUBMIT", "true").lower() == "true"
+
+
+# ---------------- Report data ----------------
+def section_stats_from_details(details):
+    """Section-wise attempted/correct/wrong/unattempted/marks from UserResult.details."""
+    parsed = json.loads(details) if isinstance(details, str) else details
+    if isinstance(parsed, list):
+        questions, sections = parsed, {}
+    elif isinstance(parsed, dict):
+        questions = parsed.get("questions", [])
+        # Stored stats are only used for results without per-question details
+        sections = {} if questions else {
+            name: dict(stats) for name, stats in parsed.get("sections", {}).items()
+        }
+    else:
+        questions, sections = [], {}
+
+    for q in questions:
+        sec = q.get("section", "General")
+        if sec not in sections:
+            sections[sec] = {"attempted": 0, "correct": 0, "wrong": 0, "unattempted": 0}
+        sel = q.get("selected", "")
+        correct = q.get("correct", "")
+        if not sel:
+            sections[sec]["unattempted"] += 1
+        elif sel.upper() == correct:
+            sections[sec]["attempted"] += 1
+            sections[sec]["correct"] += 1
+        else:
+            sections[sec]["attempted"] += 1
+            sections[sec]["wrong"] += 1
+
+    if not sections:
+        sections = {"General": {"attempted": 0, "correct": 0, "wrong": 0, "unattempted": 0}}
+
+    for stats in sections.values():
+        stats["marks"] = round(stats["correct"] * 1 - stats["wrong"] * 0.25, 2)
+        stats["total_marks"] = stats["attempted"] + stats["unattempted"]
+    return sections
+
+
+def report_key(result_id, bank_version):
+    return artifact_key("report", result_id, bank_version, REPORT_RENDERER_VERSION)
+
+
+def build_report_data(result, mocktest_name, candidate, bank_version, sections=None):
+    """
+    Plain, picklable inputs for render_result_pdf. `sections` are the
+    result's user_section_results stats; results without them fall back to
+    the details blob.
+    """
+    if sections:
+        sections = {name: dict(stats, total_marks=stats["attempted"] + stats["unattempted"])
+                    for name, stats in sections.items()}
+    else:
+        sections = section_stats_from_details(result.details)
+    return {
+        "key": report_key(result.id, bank_version),
+        "result_id": result.id,
+        "mocktest_id": result.mocktest_id,
+        "mocktest_name": mocktest_name,
+        "score": result.score,
+        "total_questions": result.total_questions,
+        "percentage": result.percentage,
+        "submitted_at": result.submitted_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "candidate_name": getattr(candidate, "name", getattr(candidate, "username", "Unknown Candidate")),
+        "candidate_email": getattr(candidate, "email", "N/A"),
+        "sections": sections,
+    }
+
+
+# ---------------- Rendering (runs in the pool) ----------------
+def _png(fig):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(fig)
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    buf.seek(0)
+    return buf
+
+
+def render_charts(sections):
+    from matplotlib.figure import Figure
+
+    section_names = list(sections.keys())
+    correct = [s["correct"] for s in sections.values()]
+    wrong = [s["wrong"] for s in sections.values()]
+    unattempted = [s["unattempted"] for s in sections.values()]
+    marks = [s["marks"] for s in sections.values()]
+
+    # --- Chart 1: Section Performance ---
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.bar(section_names, correct, label="Correct", color="#28a745")
+    ax.bar(section_names, wrong, bottom=correct, label="Wrong", color="#dc3545")
+    ax.bar(section_names, unattempted, bottom=[c + w for c, w in zip(correct, wrong)],
+           label="Unattempted", color="#ffc107")
+    ax.set_title("Section-wise Performance (Questions Distribution)")
+    ax.set_xlabel("Sections")
+    ax.set_ylabel("Number of Questions")
+    ax.legend()
+    fig.tight_layout()
+    bar_chart = _png(fig)
+
+    # --- Chart 2: Pie Chart ---
+    fig = Figure(figsize=(4, 4))
+    ax = fig.subplots()
+    ax.pie(
+        [sum(correct), sum(wrong), sum(unattempted)],
+        labels=["Correct", "Wrong", "Unattempted"],
+        autopct="%1.1f%%",
+        colors=["#28a745", "#dc3545", "#ffc107"],
+        startangle=90,
+    )
+    ax.set_title("Overall Performance Distribution")
+    pie_chart = _png(fig)
+
+    # --- Chart 3: Marks per Section (Horizontal) ---
+    fig = Figure(figsize=(6, 3))
+    ax = fig.subplots()
+    ax.barh(section_names, marks, color="#007bff")
+    ax.set_title("Marks Scored per Section")
+    ax.set_xlabel("Marks")
+    ax.set_ylabel("Sections")
+    fig.tight_layout()
+    marks_chart = _png(fig)
+
+    return bar_chart, pie_chart, marks_chart
+
+
+def render_result_pdf(data):
+    """Builds the result report PDF and returns its bytes."""
+    from fpdf import FPDF
+
+    sections = data["sections"]
+    with span("charts"):
+        bar_chart, pie_chart, marks_chart = render_charts(sections)
+    pdf_start = time.perf_counter()
+
+    # ✅ Performance Rating
+    percentage = float(data["percentage"])
+    if percentage >= 80:
+        performance = "Excellent"
+    elif percentage >= 60:
+        performance = "Good"
+    else:
+        performance = "Needs Improvement"
+
+    # --- PDF Generation ---
+    pdf = FPDF()
+    pdf.add_page()
+
+    # Header banner + logo
+    pdf.set_fill_color(255, 140, 0)
+    pdf.rect(0, 0, 210, 25, "F")
+
+    logo_path = "app/static/LCS_logo.jpg"
+    if os.path.exists(logo_path):
+        try:
+            pdf.image(logo_path, x=10, y=3, w=25)
+        except Exception as e:
+            print(f"⚠️ Logo load issue: {e}")
+    else:
+        print("⚠️ Logo not found, skipping logo.")
+
+    pdf.set_xy(40, 5)
+    pdf.set_font("Arial", "B", 16)
+    pdf.set_text_color(255, 255, 255)
+    pdf.cell(0, 10, "LARE CLOUD SOLUTIONS", ln=True, align="L")
+
+    pdf.set_font("Arial", "I", 10)
+    pdf.cell(0, 10, "Elevating Ideas. Empowering Futures.", ln=True, align="L")
+
+    # Candidate Info
+    pdf.set_text_color(0, 0, 0)
+    pdf.ln(20)
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 10, f"Candidate: {data['candidate_name']}", ln=True)
+    pdf.cell(0, 10, f"Email: {data['candidate_email']}", ln=True)
+    pdf.cell(0, 10, f"Mock Test Name: {data['mocktest_name']}", ln=True)
+    pdf.cell(0, 10, f"Mock Test ID: {data['mocktest_id']}", ln=True)
+    pdf.cell(0, 10, f"Date: {data['submitted_at']}", ln=True)
+    pdf.ln(5)
+
+    # --- Section Table ---
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(40, 10, "Section", border=1, align="C")
+    pdf.cell(25, 10, "Attempted", border=1, align="C")
+    pdf.cell(25, 10, "Correct", border=1, align="C")
+    pdf.cell(25, 10, "Wrong", border=1, align="C")
+    pdf.cell(30, 10, "Unattempted", border=1, align="C")
+    pdf.cell(25, 10, "Marks", border=1, align="C")
+    pdf.cell(25, 10, "Total Qs", border=1, ln=True, align="C")
+
+    pdf.set_font("Arial", "", 12)
+    for section, stats in sections.items():
+        pdf.cell(40, 10, section, border=1)
+        pdf.cell(25, 10, str(stats["attempted"]), border=1, align="C")
+        pdf.cell(25, 10, str(stats["correct"]), border=1, align="C")
+        pdf.cell(25, 10, str(stats["wrong"]), border=1, align="C")
+        pdf.cell(30, 10, str(stats["unattempted"]), border=1, align="C")
+        pdf.cell(25, 10, str(stats["marks"]), border=1, align="C")
+        pdf.cell(25, 10, str(stats["total_marks"]), border=1, ln=True, align="C")
+
+    # ✅ Section-wise Total Marks Summary
+    pdf.ln(8)
+    pdf.set_font("Arial", "B", 13)
+    pdf.cell(0, 10, "Section-wise Total Marks Summary", ln=True)
+    pdf.set_font("Arial", "", 12)
+    for sec, stats in sections.items():
+        pdf.cell(0, 8, f"Section: {sec} - {stats['total_marks']} Questions | Marks Secured: {stats['marks']}", ln=True)
+
+    # ✅ Final Overall Summary
+    total_possible_marks = sum([s["total_marks"] for s in sections.values()])
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, f"Total Score: {data['score']} / {data['total_questions']}", ln=True)
+    pdf.cell(0, 10, f"Percentage: {data['percentage']}%", ln=True)
+    pdf.cell(0, 10, f"Performance: {performance}", ln=True)
+    pdf.cell(0, 10, f"Overall Marks Secured: {data['score']} / {total_possible_marks}", ln=True)
+    pdf.ln(10)
+
+    # Charts
+    pdf.image(bar_chart, x=15, w=180)
+    pdf.ln(10)
+    pdf.image(marks_chart, x=15, w=180)
+    pdf.ln(10)
+    pdf.image(pie_chart, x=60, w=80)
+    pdf.ln(10)
+
+    # Footer
+    pdf.set_font("Arial", "I", 10)
+    pdf.set_text_color(100, 100, 100)
+    pdf.cell(0, 10, "Generated by Smart MockTest System © 2025 | Powered by Lare Cloud Solutions", ln=True, align="C")
+
+    pdf_buffer = BytesIO()
+    pdf.output(pdf_buffer)
+    observe_span("pdf", time.perf_counter() - pdf_start)
+    return pdf_buffer.getvalue()
+
+
+def report_path(key):
+    return artifact_store.path("reports", key)
+
+
+def _error_path(key):
+    return f"{report_path(key)}.error"
+
+
+def _render_to_file(data):
+    """
+    Pool entry point: renders and atomically stores the PDF. Returns the
+    span timings, since the pool process's own metrics are never scraped.
+    """
+    with traced() as trace:
+        artifact_store.write("reports", data["key"], render_result_pdf(data))
+    return trace.spans
+
+
+# ---------------- Job manager ----------------
+class ReportJobs:
+    """Tracks report jobs submitted from this API worker to the render pool."""
+
+    def __init__(self, pool_size):
+        self.pool_size = pool_size
+        self._pool = None
+        self._jobs = {}  # report key -> Future
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn: never fork a process that is running event-loop and DB threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.pool_size, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _discard_pool(self, pool):
+        """Drops `pool` if it is still current; the next job starts a fresh one. Call with the lock held."""
+        if self._pool is pool and pool is not None:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def status(self, key):
+        if os.path.exists(report_path(key)):
+            return "done"
+        with self._lock:
+            future = self._jobs.get(key)
+        if future is not None:
+            return "running" if future.running() else "queued"
+        if os.path.exists(_error_path(key)):
+            return "failed"
+        return "missing"
+
+    def enqueue(self, data):
+        """Queues a render unless the PDF exists or a job is already in flight."""
+        key = data["key"]
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None or os.path.exists(report_path(key)):
+                return future
+            pool = self._executor()
+            try:
+                future = pool.submit(_render_to_file, data)
+            except BrokenProcessPool:
+                # A render process died; replace the pool rather than fail every later job
+                self._discard_pool(pool)
+                pool = self._executor()
+                future = pool.submit(_render_to_file, data)
+            self._jobs[key] = future
+        future.add_done_callback(lambda f: self._finished(key, f, pool))
+        return future
+
+    def _finished(self, key, future, pool):
+        # Cancelled at shutdown: exception() would raise, and there is no outcome to record
+        if future.cancelled():
+            with self._lock:
+                self._jobs.pop(key, None)
+            return
+        error = future.exception()
+        with self._lock:
+            self._jobs.pop(key, None)
+            if isinstance(error, BrokenProcessPool):
+                self._discard_pool(pool)
+        if error is not None:
+            print(f"❌ Report {key} failed: {error}")
+            # The first render of a key may fail before anything created its directory
+            os.makedirs(os.path.dirname(_error_path(key)), exist_ok=True)
+            with open(_error_path(key), "w") as f:
+                f.write(str(error))
+        else:
+            for name, seconds in future.result().items():
+                observe_span(name, seconds)
+            if os.path.exists(_error_path(key)):
+                os.remove(_error_path(key))
+
+    def job(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+report_jobs = ReportJobs(REPORT_POOL_SIZE)
@@ -0,0 +1,190 @@
+"""
+Scheduled deletion of expired and abandoned rows.
+
+Nothing else removes them: sessions stay behind after they expire or log
+out, attempt_logs keeps attempts that were never finished, exam_cache keeps
+autosaves nobody resumed, and email_outbox keeps the bodies of sent and
+failed emails, one-time codes included. Every RETENTION_INTERVAL_SECONDS the sweeper
+walks each table in primary-key order and deletes matching rows
+RETENTION_BATCH_SIZE at a time. Each batch commits on its own and the
+sweeper pauses between batches, so no lock is held for long and request
+traffic can interleave.
+
+    SESSION_RETENTION_HOURS      keep expired sessions this long (logged-out ones go at once)
+    ATTEMPT_RETENTION_DAYS       in-progress attempt_logs older than this count as abandoned
+    EXAM_CACHE_RETENTION_DAYS    autosaves not written for this long count as abandoned
+    EMAIL_OUTBOX_RETENTION_HOURS keep sent and failed emails this long after they were queued
+    RETENTION_SWEEPER_ENABLED    false to leave sweeping to another worker or to cron
+
+A negative retention disables that table. Each run prints per-table counts
+and timings; /metrics reports the totals. sweep_retention.py runs one sweep
+from the command line.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, or_, select
+
+from app import models
+from app.database import SessionLocal
+
+RETENTION_SWEEPER_ENABLED = os.getenv("RETENTION_SWEEPER_ENABLED", "true").lower() == "true"
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", "0.05"))
+SESSION_RETENTION_HOURS = float(os.getenv("SESSION_RETENTION_HOURS", "24"))
+ATTEMPT_RETENTION_DAYS = float(os.getenv("ATTEMPT_RETENTION_DAYS", "30"))
+EXAM_CACHE_RETENTION_DAYS = float(os.getenv("EXAM_CACHE_RETENTION_DAYS", "14"))
+EMAIL_OUTBOX_RETENTION_HOURS = float(os.getenv("EMAIL_OUTBOX_RETENTION_HOURS", "1"))
+
+# `stale(now)` is the condition for rows to delete; None when the table's retention is disabled
+RetentionRule = namedtuple("RetentionRule", "table model stale")
+
+
+def _cutoff(now, retention):
+    return None if retention < timedelta(0) else now - retention
+
+
+def _stale_sessions(now):
+    cutoff = _cutoff(now, timedelta(hours=SESSION_RETENTION_HOURS))
+    if cutoff is None:
+        return None
+    return or_(models.Session.active == False, models.Session.expires_at < cutoff)
+
+
+def _stale_attempts(now):
+    cutoff = _cutoff(now, timedelta(days=ATTEMPT_RETENTION_DAYS))
+    if cutoff is None:
+        return None
+    return and_(models.AttemptLog.status == "in_progress", models.AttemptLog.start_time < cutoff)
+
+
+def _stale_exam_cache(now):
+    cutoff = _cutoff(now, timedelta(days=EXAM_CACHE_RETENTION_DAYS))
+    if cutoff is None:
+        return None
+    return models.ExamCache.last_saved_at < cutoff
+
+
+def _stale_email_outbox(now):
+    cutoff = _cutoff(now, timedelta(hours=EMAIL_OUTBOX_RETENTION_HOURS))
+    if cutoff is None:
+        return None
+    # Pending and in-flight emails are never deleted, however old
+    return and_(models.EmailOutbox.status.in_(("sent", "failed")), models.EmailOutbox.created_at < cutoff)
+
+
+RETENTION_RULES = (
+    RetentionRule("sessions", models.Session, _stale_sessions),
+    RetentionRule("attempt_logs", models.AttemptLog, _stale_attempts),
+    RetentionRule("exam_cache", models.ExamCache, _stale_exam_cache),
+    RetentionRule("email_outbox", models.EmailOutbox, _stale_email_outbox),
+)
+
+
+class RetentionSweeper:
+    def __init__(self, rules, interval_seconds, batch_size, batch_pause_seconds):
+        self.rules = rules
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.batch_pause_seconds = batch_pause_seconds
+        self.runs = 0
+        self.deleted = {rule.table: 0 for rule in rules}
+        self.last_run = {}  # table -> {"deleted", "batches", "seconds"}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep_table(self, db, rule, now):
+        """Deletes `rule`'s stale rows in keyset-ordered batches; returns (deleted, batches)."""
+        stale = rule.stale(now)
+        if stale is None:
+            return 0, 0
+        pk = rule.model.id
+        deleted = batches = 0
+        last_id = 0
+        while not self._stop.is_set():
+            ids = db.scalars(
+                select(pk).where(pk > last_id, stale).order_by(pk).limit(self.batch_size)
+            ).all()
+            if not ids:
+                break
+            # Re-checks `stale`, so a row written to since the select survives
+            deleted += db.execute(
+                delete(rule.model).where(pk.in_(ids), stale).execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            batches += 1
+            last_id = ids[-1]
+            if len(ids) < self.batch_size:
+                break
+            time.sleep(self.batch_pause_seconds)
+        return deleted, batches
+
+    def run_once(self):
+        """Sweeps every table once; returns {table: {"deleted", "batches", "seconds"}}."""
+        now = datetime.utcnow()
+        report = {}
+        db = SessionLocal()
+        try:
+            for rule in self.rules:
+                started = time.perf_counter()
+                try:
+                    deleted, batches = self.sweep_table(db, rule, now)
+                except Exception as e:
+                    db.rollback()
+                    print(f"❌ Retention sweep of {rule.table} failed: {e}")
+                    continue
+                report[rule.table] = {
+                    "deleted": deleted,
+                    "batches": batches,
+                    "seconds": round(time.perf_counter() - started, 6),
+                }
+        finally:
+            db.close()
+        with self._lock:
+            self.runs += 1
+            for table, result in report.items():
+                self.deleted[table] += result["deleted"]
+            self.last_run = report
+        return report
+
+    def _run(self):
+        # First sweep soon after startup, so frequent deploys don't postpone it forever
+        delay = min(self.interval_seconds, 60)
+        while not self._stop.wait(delay):
+            delay = self.interval_seconds
+            report = self.run_once()
+            if any(result["deleted"] for result in report.values()):
+                print("🧹 Retention: " + ", ".join(
+                    f"{table} {r['deleted']} rows in {r['batches']} batches {r['seconds'] * 1000:.0f} ms"
+                    for table, r in report.items()
+                ))
+
+    def start(self):
+        if RETENTION_SWEEPER_ENABLED and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "deleted": dict(self.deleted),
+                "last_run_seconds": {table: r["seconds"] for table, r in self.last_run.items()},
+            }
+
+
+retention_sweeper = RetentionSweeper(
+    RETENTION_RULES, RETENTION_INTERVAL_SECONDS, RETENTION_BATCH_SIZE, RETENTION_BATCH_PAUSE_SECONDS
+)
@@ -1,47 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, UploadFile, File, Header, Query
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import User, UserProfile, Session as DBSession
 from app.schemas import UserCreate, UserResponse
+from app.session_cache import SESSION_CACHE_TTL_SECONDS, UserSnapshot, session_cache
+from app.ttl_store import ttl_store
+from app.email_outbox import email_sender, enqueue_email
+from app.passwords import password_hasher
+from app.session_tokens import (
+    SESSION_MODE, database_token_id, is_signed_token, issue_token, read_token, revocations,
+)
+from app.user_import import (
+    IMPORT_API_HASH_PROCESSES, IMPORT_API_MAX_ROWS, USER_IMPORT_TOKEN, api_import_lock, detect_format, import_users,
+    parse_rows,
+)
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
-import secrets, random, smtplib
-from email.mime.text import MIMEText
+import hmac, os, secrets, time
 
 router = APIRouter(tags=["auth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SESSION_EXPIRY_HOURS = 24
-otp_store = {}  # temporary OTP storage
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "600"))
+RESET_GRANT_TTL_SECONDS = int(os.getenv("RESET_GRANT_TTL_SECONDS", "900"))
 
 # --------- UTILS ---------
+# bcrypt runs on the bounded pool in app/passwords.py; sync callers wait for it
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
-
-# ✅ Production version: send email using Gmail SMTP
-def send_email(to_email: str, subject: str, body: str):
-    sender = "abhishekkollipara157@gmail.com"
-    password = "cqft sddu qkvl xaec"
-    smtp_server = "smtp.gmail.com"
-    port = 587
-
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = sender
-    msg["To"] = to_email
-
-    try:
-        with smtplib.SMTP(smtp_server, port) as server:
-            server.starttls()
-            server.login(sender, password)
-            server.sendmail(sender, [to_email], msg.as_string())
-    except Exception as e:
-        print("Email error:", e)
-        raise HTTPException(status_code=500, detail="Failed to send email")
+    return password_hasher.hash_blocking(password)
 
 # --------- SIGNUP ---------
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -79,23 +67,65 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         gender=profile.gender,
     )
 
+# --------- BULK IMPORT ---------
+@router.post("/import-users")
+def import_users_file(
+    file: UploadFile = File(...),
+    fmt: str = Query(None, alias="format"),
+    x_import_token: str = Header(""),
+    db: Session = Depends(get_db),
+):
+    """
+    Creates users from a small CSV or NDJSON upload; see app/user_import.py.
+    Returns the per-row report. Files over IMPORT_API_MAX_ROWS go through
+    import_users.py instead.
+    """
+    if not USER_IMPORT_TOKEN or not hmac.compare_digest(x_import_token, USER_IMPORT_TOKEN):
+        raise HTTPException(status_code=403, detail="Not allowed to import users")
+    try:
+        fmt = detect_format(file.filename, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    text = file.file.read().decode("utf-8-sig")
+    records = list(parse_rows(text, fmt))
+    if len(records) > IMPORT_API_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{len(records)} rows; the API imports at most {IMPORT_API_MAX_ROWS}. "
+                   f"Run import_users.py for larger files.",
+        )
+    if not api_import_lock.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail="Another import is running", headers={"Retry-After": "30"})
+    try:
+        return import_users(db, records, processes=IMPORT_API_HASH_PROCESSES)
+    finally:
+        api_import_lock.release()
+
 # --------- LOGIN ---------
 class LoginRequest(BaseModel):
     email: str
     password: str
 
 @router.post("/login")
-def login(request: LoginRequest, response: Response, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
-    if not user or not verify_password(request.password, user.password):
+async def login(request: LoginRequest, response: Response, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).filter(User.email == request.email))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=400, detail="Invalid email or password")
+    valid, new_hash = await password_hasher.verify_and_update(request.password, user.password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid email or password")
+    if new_hash:
+        # Stored with an older BCRYPT_ROUNDS; committed with the session below
+        user.password = new_hash
 
-    token = secrets.token_hex(32)
     expires_at = datetime.utcnow() + timedelta(hours=SESSION_EXPIRY_HOURS)
-
-    db_session = DBSession(user_id=user.id, token=token, expires_at=expires_at, active=True)
-    db.add(db_session)
-    db.commit()
+    if SESSION_MODE == "signed":
+        # Verified by signature; no sessions row
+        token = issue_token(user.id, expires_at)
+    else:
+        token = secrets.token_hex(32)
+        db.add(DBSession(user_id=user.id, token=token, expires_at=expires_at, active=True))
+    await db.commit()
 
     # ✅ cookie correctly configured for cross-origin localhost requests
     response.set_cookie(
@@ -109,19 +139,86 @@ def login(request: LoginRequest, response: Response, db: Session = Depends(get_d
     return {"msg": "Login successful", "username": user.username, "email": user.email}
 
 # --------- CURRENT USER ---------
-def get_current_user(request: Request, db: Session = Depends(get_db)):
+def session_lookup_query(token: str):
+    """Session, user and profile for a token in a single round trip."""
+    return (
+        select(DBSession.expires_at, User, UserProfile)
+        .join(User, User.id == DBSession.user_id)
+        .outerjoin(UserProfile, UserProfile.user_id == User.id)
+        .filter(DBSession.token == token, DBSession.active == True)
+    )
+
+def user_lookup_query(user_id: int):
+    """User and profile for a signed token's user id; the sessions table is not read."""
+    return (
+        select(User, UserProfile)
+        .outerjoin(UserProfile, UserProfile.user_id == User.id)
+        .filter(User.id == user_id)
+    )
+
+async def _signed_user(token: str, db: AsyncSession):
+    claims = read_token(token) if SESSION_MODE == "signed" else None
+    if claims is None or revocations.is_revoked(claims):
+        raise HTTPException(status_code=401, detail="Session expired or invalid")
+
+    cached = session_cache.get(token)
+    if cached:
+        return cached
+
+    row = (await db.execute(user_lookup_query(claims.user_id))).first()
+    if not row:
+        raise HTTPException(status_code=401, detail="Session expired or invalid")
+
+    snapshot = UserSnapshot(row.User, row.UserProfile, datetime.utcfromtimestamp(claims.expires_at))
+    session_cache.put(token, snapshot)
+    return snapshot
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_db)):
     token = request.cookies.get("session")
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    if is_signed_token(token):
+        return await _signed_user(token, db)
 
-    db_session = db.query(DBSession).filter_by(token=token, active=True).first()
-    if not db_session or db_session.expires_at < datetime.utcnow():
+    # A logout on another worker revokes the token's id; the lookup below then refuses it
+    cached = session_cache.get(token)
+    if cached and not revocations.is_revoked_id(database_token_id(token)):
+        return cached
+
+    row = (await db.execute(session_lookup_query(token))).first()
+    if not row or row.expires_at < datetime.utcnow():
         raise HTTPException(status_code=401, detail="Session expired or invalid")
 
-    user = db.query(User).filter(User.id == db_session.user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+    snapshot = UserSnapshot(row.User, row.UserProfile, row.expires_at)
+    session_cache.put(token, snapshot)
+    return snapshot
+
+async def get_optional_user(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Like get_current_user, but returns None for anonymous requests."""
+    if not request.cookies.get("session"):
+        return None
+    try:
+        return await get_current_user(request, db)
+    except HTTPException:
+        return None
+
+# --------- LOGOUT ---------
+@router.post("/logout")
+async def logout(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    token = request.cookies.get("session")
+    if token and is_signed_token(token):
+        claims = read_token(token)
+        if claims is not None:
+            await revocations.revoke(db, claims)
+        session_cache.invalidate(token)
+    elif token:
+        await db.execute(update(DBSession).filter(DBSession.token == token).values(active=False))
+        await db.commit()
+        # Other workers may hold the session in their session_cache for up to one TTL
+        await revocations.revoke_id(db, database_token_id(token), time.time() + SESSION_CACHE_TTL_SECONDS)
+        session_cache.invalidate(token)
+    response.delete_cookie("session")
+    return {"msg": "Logged out"}
 
 
 # --------- PROFILE ---------
@@ -131,7 +228,7 @@ class ProfileUpdate(BaseModel):
     gender: str
 
 @router.get("/profile")
-def get_profile(user: User = Depends(get_current_user)):
+async def get_profile(user: User = Depends(get_current_user)):
     return {
         "id": user.id,
         "username": user.username,
@@ -145,11 +242,12 @@ def get_profile(user: User = Depends(get_current_user)):
 
 @router.put("/profile")
 def update_profile(data: ProfileUpdate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    profile = user.profile
+    profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
     profile.full_name = data.full_name
     profile.dob = data.dob
     profile.gender = data.gender
     db.commit()
+    session_cache.invalidate_user(user.id)
     return {"msg": "Profile updated", "profile": data.dict()}
 
 # --------- FORGOT PASSWORD ---------
@@ -162,9 +260,13 @@ def forgot_password(req: ForgotPasswordRequest, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="Email not found")
 
-    otp = str(random.randint(100000, 999999))
-    otp_store[req.email] = otp
-    send_email(req.email, "Password Reset OTP", f"Your OTP is {otp}")
+    otp = str(secrets.randbelow(900000) + 100000)
+    # Shared across workers; a new request replaces any earlier OTP
+    ttl_store.set(f"otp:{req.email}", otp, OTP_TTL_SECONDS)
+    # Queued, not sent: the relay's latency never reaches this request
+    enqueue_email(db, req.email, "Password Reset OTP", f"Your OTP is {otp}", user_id=user.id)
+    db.commit()
+    email_sender.wake()
     return {"msg": "OTP sent to email"}
 
 class VerifyOtpRequest(BaseModel):
@@ -173,8 +275,10 @@ class VerifyOtpRequest(BaseModel):
 
 @router.post("/verify-otp")
 def verify_otp(req: VerifyOtpRequest):
-    if req.email not in otp_store or otp_store[req.email] != req.otp:
+    # One use only: the OTP is traded for a reset grant that /reset-password consumes
+    if ttl_store.consume(f"otp:{req.email}", req.otp) is None:
         raise HTTPException(status_code=400, detail="Invalid OTP")
+    ttl_store.set(f"reset:{req.email}", "verified", RESET_GRANT_TTL_SECONDS)
     return {"msg": "OTP verified"}
 
 class ResetPasswordRequest(BaseModel):
@@ -186,9 +290,10 @@ def reset_password(req: ResetPasswordRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == req.email).first()
     if not user:
         raise HTTPException(status_code=404, detail="Email not found")
+    if ttl_store.consume(f"reset:{req.email}") is None:
+        raise HTTPException(status_code=400, detail="OTP not verified or expired")
 
     user.password = hash_password(req.new_password)
     db.commit()
-    if req.email in otp_store:
-        del otp_store[req.email]
+    session_cache.invalidate_user(user.id)
     return {"msg": "Password reset successful"}
\ No newline at end of file
@@ -1,22 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app import models
 from datetime import datetime
-from pydantic import BaseModel
-from typing import Dict
-import pandas as pd
-from io import BytesIO
-from fpdf import FPDF
-from fastapi.responses import Response
-import matplotlib.pyplot as plt
-import numpy as np
-import tempfile
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from fastapi.responses import FileResponse, JSONResponse, Response
+import asyncio
+import base64
 import json
-from datetime import datetime
-import os, json
+import os
 from fastapi import Request
-from app.routers.auth import get_current_user
+from app.routers.auth import get_current_user, get_optional_user
+from app.autosave import autosave_buffer, row_state
+from app.question_bank import file_version, get_question_bank
+from app.delivery import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, get_delivery
+from app.artifacts import artifact_key, artifact_store, etag_matches
+from app.scoring import get_scoring_engine, marking_scheme_for
+from app.rank_index import performance_band, rank_indexes
+from app.metrics import add_to_trace, span
+from app.packed_answers import bank_changed, expand_details, is_packed, pack_details, stored_answers
+from app.section_results import load_section_stats_async, section_report_query, section_rows
+from app.reports import (
+    REPORT_RENDER_ON_SUBMIT, REPORT_WAIT_SECONDS, build_report_data, report_jobs, report_key, report_path,
+    section_stats_from_details,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,147 +35,33 @@ BASE_URL = os.getenv("BASE_URL", "http://localhost:8000").rstrip("/")
 
 
 router = APIRouter(prefix="/mocktests", tags=["mocktests"])
+PREVIEW_RENDERER_VERSION = 3  # bump when the preview body layout changes
+SUMMARY_PAGE_SIZE = int(os.getenv("SUMMARY_PAGE_SIZE", "50"))
+SUMMARY_MAX_PAGE_SIZE = 200
 
 # ---------------- Schemas ----------------
 class SubmitPayload(BaseModel):
-    answers: Dict[str, str]
+    answers: Optional[Dict[str, str]] = None  # omitted: grade the state built up through /sync
 
 class SavePayload(BaseModel):
     answers: Dict[str, str]
     time_left: int
     current_question: int
+    attempt: Optional[int] = None  # sync_attempt from resume
 
-# ---------------- Helpers ----------------
-def normalize_cols(df: pd.DataFrame):
-    df.columns = [str(c).strip().lower() for c in df.columns]
-    return df
-
-def get_val(row, names):
-    for n in names:
-        if n in row and pd.notna(row[n]) and str(row[n]).strip() != "":
-            return row[n]
-    return ""
-
-def read_excel(path: str):
-    """
-    Safely reads Excel with openpyxl backend.
-    Forces all cells (including numeric, % and ratios) to strings,
-    unmerges merged cells, and ensures all option columns exist.
-    """
-    import openpyxl
-    from openpyxl.utils import get_column_letter
-    import pandas as pd
-
-    if not os.path.exists(path):
-        raise HTTPException(status_code=404, detail=f"File not found: {path}")
-
-    wb = openpyxl.load_workbook(path, data_only=True)
-    ws = wb.active
-
-    # Unmerge cells so each cell has its own value
-    for merged in list(ws.merged_cells.ranges):
-        ws.unmerge_cells(str(merged))
-
-    # Convert to DataFrame treating everything as text
-    data = ws.values
-    cols = [str(c).strip().lower().replace(" ", "_") for c in next(data)]
-    df = pd.DataFrame(data, columns=cols, dtype=str)
-    df = df.fillna("")
-
-    # Guarantee presence of option_a–option_e
-    for col in ["option_a", "option_b", "option_c", "option_d", "option_e"]:
-        if col not in df.columns:
-            df[col] = ""
-
-    return df
-
-
-def make_full_url(path):
-    if not path:
-        return ""
-    path = path.replace("\\", "/")
-    if path.startswith("http"):
-        return path
-    if path.startswith("static/"):
-        return f"http://localhost:8000/{path}"
-    filename = os.path.basename(path)
-    return f"http://localhost:8000/static/mocktest_images/{filename}"
-
-
-
-
-
-def read_test_excel(file_path):
-    """
-    Read test excel and return list of rows as dicts.
-    Auto-normalizes option columns (A–E) and fills blanks safely.
-    """
-    df = pd.read_excel(file_path)
-    df.columns = [str(c).strip().lower() for c in df.columns]
-    rows = df.fillna("").to_dict(orient="records")
-    normalized = []
-
-    for i, r in enumerate(rows, start=1):
-        # --- Question ID ---
-        qid = ""
-        for key in ["question_id", "qid", "id"]:
-            if key in r and r[key] != "":
-                qid = str(int(r[key])) if isinstance(r[key], (int, float)) else str(r[key])
-                break
-        if not qid:
-            qid = str(i)
-
-        # --- Question text / passage ---
-        qtext = r.get("question") or r.get("question_text") or r.get("Question") or ""
-        passage_id = r.get("passage_id") or r.get("passageid") or ""
-        passage_text = r.get("passage_text") or r.get("passage") or ""
-
-        # --- Normalize and collect options ---
-        def get_opt(keys):
-            for k in keys:
-                if k in r and str(r[k]).strip():
-                    return str(r[k]).strip()
-            return ""
-
-        a = get_opt(["option_a", "a", "option 1", "opt_a", "optiona"])
-        b = get_opt(["option_b", "b", "option 2", "opt_b", "optionb", "option b"])
-        c = get_opt(["option_c", "c", "option 3", "opt_c", "optionc", "option c"])
-        d = get_opt(["option_d", "d", "option 4", "opt_d", "optiond", "option d"])
-        e = get_opt(["option_e", "e", "option 5", "opt_e", "optione", "option e"])
-
-        options = [x for x in [a, b, c, d, e] if x != ""]
-
-        correct = r.get("correct_option") or r.get("answer") or r.get("correct") or ""
-        section = r.get("section") or r.get("topic") or "General"
-        explanation = r.get("explanation", "")
-        # ✅ Ensure image paths are converted to full URLs
-        question_image = make_full_url(r.get("question_image", ""))
-        explanation_image = make_full_url(r.get("explanation_image", ""))
-        passage_image = make_full_url(r.get("passage_image", ""))
-
-
-        normalized.append({
-            "question_id": str(qid),
-            "question_text": str(qtext),
-            "options": options,
-            "correct": str(correct).upper(),
-            "section": str(section),
-            "passage_id": str(passage_id),
-            "passage_text": str(passage_text),
-            "explanation": str(explanation),
-            "explanation_image": explanation_image,
-            "question_image": question_image,
-            "passage_image": passage_image,
-        })
-
-
-    return normalized
-
+class SyncPayload(BaseModel):
+    seq: int = Field(gt=0)
+    changes: Dict[str, Optional[str]] = {}  # question_id -> answer; null/"" clears it
+    time_left: Optional[int] = None
+    current_question: Optional[int] = None
+    attempt: Optional[int] = None  # sync_attempt from resume
 
 # ---------------- Routes ----------------
 @router.get("/full")
-def get_full_tests(db: Session = Depends(get_db)):
-    tests = db.query(models.MockTestFile).filter(models.MockTestFile.test_type == "full").all()
+async def get_full_tests(db: AsyncSession = Depends(get_async_db)):
+    tests = (
+        await db.execute(select(models.MockTestFile).filter(models.MockTestFile.test_type == "full"))
+    ).scalars().all()
     return [
         {
             "id": t.id,
@@ -176,83 +73,120 @@ def get_full_tests(db: Session = Depends(get_db)):
         } for t in tests
     ]
 
-def safe_str(value):
-    """Ensures consistent text for all Excel cells."""
-    if value is None:
-        return ""
-    val = str(value).strip()
-    if val.lower() in ["nan", "none"]:
-        return ""
-    return val
-
-def get_options(row):
-    """
-    Always returns 5 text options (A–E) correctly.
-    Handles numeric, ratio, %, and merged-cell blanks safely.
-    """
-    opts = []
-    for col in ["option_a", "option_b", "option_c", "option_d", "option_e"]:
-        val = row.get(col, "")
-        val = str(val).strip() if val is not None else ""
-        # Handle Excel 'nan', 'None', or hidden blanks
-        if val.lower() in ["nan", "none"]:
-            val = ""
-        opts.append(val)
-    while len(opts) < 5:
-        opts.append("")
-    return opts
-
+def _cached_state_query(user_id: int, test_id: int):
+    return select(models.ExamCache).filter(
+        models.ExamCache.user_id == user_id, models.ExamCache.mocktest_id == test_id
+    )
 
+def load_saved_state(db: Session, user_id: int, test_id: int):
+    """Latest autosaved state: this worker's buffer merged with what every worker flushed to exam_cache."""
+    return autosave_buffer.merged_state(db, user_id, test_id)
 
 
 @router.get("/{test_id}/resume")
-def resume_test(test_id: int, db: Session = Depends(get_db)):
+def resume_test(
+    test_id: int,
+    delivery: str = Query("full", pattern="^(full|manifest)$"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_optional_user),
+):
+    """
+    delivery=full returns every question up front; delivery=manifest returns
+    only the section/question/passage ids and leaves the bodies to
+    /{test_id}/questions. Either way the answer key is withheld.
+    """
     test = db.query(models.MockTestFile).filter(models.MockTestFile.id == test_id).first()
     if not test:
         raise HTTPException(status_code=404, detail="Test not found")
 
-    df = read_excel(test.file_path)
-    rows = df.to_dict(orient="records")
-    questions = []
-
-    for r in rows:
-        qid = str(get_val(r, ["question_id"]))  # strictly from Excel
-        if not qid:
-            continue  # skip invalid rows
-
-        # ✅ Fetch passage directly from passage_text column
-        passage_text = str(get_val(r, ["passage_text", "passage"])) or ""
-        passage_image = str(get_val(r, ["passage_image"])) or ""
-        
-        #opts = [safe_str(get_val(r, [col])) for col in ["option_a", "option_b", "option_c", "option_d", "option_e"]]
-
-
-        qobj = {
-            "question_id": qid,
-            "question": str(get_val(r, ["question", "question_text"])) or "",
-            "options": get_options(r),
-            "correct": str(get_val(r, ["correct_option", "answer"])) or "",
-            "explanation": str(get_val(r, ["explanation"])) or "",
-            "passage_text": passage_text,
-            "section": str(get_val(r, ["section"])) or "General",
-            "question_image": make_full_url(get_val(r, ["question_image"])),
-            "explanation_image": make_full_url(get_val(r, ["explanation_image"])),
-            "passage_image": make_full_url(get_val(r, ["passage_image"])),
-
-        }
-
-        questions.append(qobj)
+    questions = get_delivery(get_question_bank(test))
+    saved = load_saved_state(db, current_user.id, test_id) if current_user else None
 
-
-    return {
+    attempt = {
         "attempt_id": f"attempt-{test_id}-{int(datetime.utcnow().timestamp())}",
         "test_name": test.name,
         "duration_minutes": test.duration_minutes,
-        "questions": questions,
-        "answers_snapshot": {},
-        "remaining_time": test.duration_minutes * 60,
-        "current_question": 0,
+        "answers_snapshot": saved["answers"] if saved else {},
+        "remaining_time": (
+            saved["time_left"] if saved and saved["time_left"] is not None
+            else test.duration_minutes * 60
+        ),
+        "current_question": saved["current_question"] if saved else 0,
+        "sync_seq": saved.get("seq", 0) if saved else 0,
+        "sync_attempt": saved.get("attempt", 0) if saved else 0,
     }
+    return Response(content=questions.attempt_body(attempt, delivery), media_type="application/json")
+
+@router.get("/{test_id}/questions")
+def get_questions(
+    request: Request,
+    test_id: int,
+    section: Optional[str] = None,
+    page: Optional[int] = Query(None, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Question bodies, without answers, for one section (?section=), one page
+    (?page=) or the whole test. Served from pre-encoded, precompressed bytes.
+    """
+    test = db.query(models.MockTestFile).filter(models.MockTestFile.id == test_id).first()
+    if not test:
+        raise HTTPException(status_code=404, detail="Test not found")
+
+    questions = get_delivery(get_question_bank(test))
+    if section is not None:
+        payload = questions.section_payload(section)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Section not found")
+    elif page is not None:
+        payload = questions.page_payload(page, page_size)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+    else:
+        payload = questions.test_payload()
+    return payload.response(request)
+
+async def _autosave_baseline(db: AsyncSession, user_id: int, test_id: int, attempt: Optional[int]):
+    """What was last flushed, for an attempt this worker has no entry for (first write since a restart/eviction)."""
+    if autosave_buffer.has(user_id, test_id, attempt):
+        return None
+    cache = (await db.execute(_cached_state_query(user_id, test_id))).scalars().first()
+    return row_state(cache) if cache else None
+
+@router.post("/{test_id}/save")
+async def save_progress(
+    test_id: int,
+    payload: SavePayload,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # Memory only; the autosave flusher writes exam_cache in batches
+    baseline = await _autosave_baseline(db, current_user.id, test_id, payload.attempt)
+    state = autosave_buffer.save(
+        current_user.id, test_id, payload.answers, payload.time_left, payload.current_question,
+        payload.attempt, baseline,
+    )
+    if state is None:
+        raise HTTPException(status_code=409, detail="Attempt already submitted")
+    return {"msg": "saved", "saved_at": state["saved_at"]}
+
+@router.post("/{test_id}/sync")
+async def sync_answers(
+    test_id: int,
+    payload: SyncPayload,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Applies a delta of changed answers; see app.autosave for the ordering rules."""
+    baseline = await _autosave_baseline(db, current_user.id, test_id, payload.attempt)
+    state, stale = autosave_buffer.apply_delta(
+        current_user.id, test_id, payload.seq, payload.changes,
+        payload.time_left, payload.current_question, baseline, payload.attempt,
+    )
+    if state is None:
+        raise HTTPException(status_code=409, detail="Attempt already submitted")
+    return {"seq": state["seq"], "stale": stale, "saved_at": state["saved_at"]}
 
 @router.post("/{test_id}/submit/{attempt_id}")
 def submit_test(
@@ -273,70 +207,26 @@ def submit_test(
     if not current_user or not current_user.id:
         raise HTTPException(status_code=401, detail="User authentication failed")
 
-    df = read_excel(test.file_path)
-    rows = df.to_dict(orient="records")
-
-    correct_map, section_map, exp_map, exp_img_map, qimg_map = {}, {}, {}, {}, {}
-    for idx, r in enumerate(rows, start=1):
-        qid = str(int(get_val(r, ["question_id"]) or idx))
-        correct_map[qid] = str(get_val(r, ["correct_option", "answer"]) or "").upper()
-        section_map[qid] = str(get_val(r, ["section"]) or "General")
-        exp_map[qid] = str(get_val(r, ["explanation"]) or "")
-        exp_img_map[qid] = str(get_val(r, ["explanation_image"]) or "")
-        qimg_map[qid] = make_full_url(str(get_val(r, ["question_image"]) or ""))
-
-    total = len(correct_map)
-    correct_count = 0
-    wrong_count = 0
-    answers = payload.answers or {}
-    details = []
-    section_stats = {}
-
-    # ✅ Evaluate questions with section-wise tracking
-    for qid, correct in correct_map.items():
-        sel = answers.get(qid, "")
-        section = section_map[qid]
-        is_correct = sel.upper() == correct if sel else False
-
-        # Initialize section stats
-        if section not in section_stats:
-            section_stats[section] = {
-                "attempted": 0,
-                "correct": 0,
-                "wrong": 0,
-                "unattempted": 0,
-                "marks": 0.0,
-            }
-
-        if not sel:
-            section_stats[section]["unattempted"] += 1
-        else:
-            section_stats[section]["attempted"] += 1
-            if is_correct:
-                correct_count += 1
-                section_stats[section]["correct"] += 1
-                section_stats[section]["marks"] += 1  # +1 mark for correct
-            else:
-                wrong_count += 1
-                section_stats[section]["wrong"] += 1
-                section_stats[section]["marks"] -= 0.25  # -0.25 mark for wrong
-
-        details.append({
-            "question_id": qid,
-            "selected": sel,
-            "correct": correct,
-            "is_correct": is_correct,
-            "explanation": exp_map[qid],
-            "explanation_image": exp_img_map[qid],
-            "question_image": qimg_map[qid],
-            "section": section,
-        })
-
-        print(f"🖼️  Question {qid} image: {get_val(r, ['question_image'])}")
-
-
-    # ✅ Apply global score calculation (based on total correct/wrong)
-    score = round(correct_count * 1 - (wrong_count * 0.25), 2)
+    bank = get_question_bank(test)
+    engine = get_scoring_engine(bank, marking_scheme_for(test))
+
+    # ✅ Evaluate all questions with section-wise tracking in one pass
+    answers = payload.answers
+    if answers is None:
+        saved = load_saved_state(db, current_user.id, test_id)
+        answers = saved["answers"] if saved else {}
+    with span("scoring"):
+        selected = engine.encode(answers)
+        graded = engine.grade(selected)
+        section_stats = graded.section_stats()
+    correct_count = int(graded.total_correct[0])
+    wrong_count = int(graded.total_wrong[0])
+    score = float(graded.score[0])
+
+    # Only the packed answers are stored; the rest is rehydrated from the bank
+    details = pack_details(bank.version, engine.qids, selected, engine.answer_codes)
+
+    total = len(engine)
     percentage = round((score / total) * 100, 2) if total > 0 else 0.0
 
     # ✅ Store result
@@ -347,20 +237,15 @@ def submit_test(
             score=score,
             total_questions=total,
             percentage=str(percentage),
-            details=json.dumps({
-                "questions": details,
-                "sections": section_stats
-            }),
+            details=details,
             status="completed",
             submitted_at=datetime.utcnow(),
+            sections=section_rows(section_stats),
         )
         db.add(result)
+        autosave_buffer.discard(db, current_user.id, test_id)
         db.commit()
         db.refresh(result)
-        print(f"✅ Inserted result successfully: {result.id}")
-        print(f"📊 Correct: {correct_count}, Wrong: {wrong_count}, Total: {total}, Score: {score}")
-        return {"msg": "submitted", "result_id": result.id}
-
     except Exception as e:
         db.rollback()
         import traceback
@@ -368,122 +253,200 @@ def submit_test(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Database insert failed: {str(e)}")
 
+    print(f"✅ Inserted result successfully: {result.id}")
+    print(f"📊 Correct: {correct_count}, Wrong: {wrong_count}, Total: {total}, Score: {score}")
+
+    # The result is committed: failures from here on are logged, never turned into a 500 that
+    # makes the client retry and submit twice. Rank catch-up and the report download recover them.
+    try:
+        rank_indexes.record(result, {name: stats["marks"] for name, stats in section_stats.items()})
+    except Exception as e:
+        print(f"⚠️ Rank index update failed for result {result.id}: {e}")
+    if REPORT_RENDER_ON_SUBMIT:
+        try:
+            report_jobs.enqueue(build_report_data(result, test.name, current_user, bank.version, section_stats))
+        except Exception as e:
+            print(f"⚠️ Report enqueue failed for result {result.id}: {e}")
+    return {"msg": "submitted", "result_id": result.id}
+
+def encode_summary_cursor(submitted_at, result_id):
+    raw = f"{submitted_at.isoformat()}|{result_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_summary_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        submitted_at, result_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(submitted_at), int(result_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def summary_query(user_id, limit, after=None, test_type=None, exam_type=None):
+    """One keyset page of a user's results (`limit` None: all of them); `after` is a decoded (submitted_at, id) cursor."""
+    r = models.UserResult
+    query = (
+        select(r.id, r.mocktest_id, r.score, r.total_questions, r.percentage, r.status, r.submitted_at)
+        .filter(r.user_id == user_id)
+        .order_by(r.submitted_at.desc(), r.id.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    if test_type or exam_type:
+        query = query.join(models.MockTestFile, models.MockTestFile.id == r.mocktest_id)
+        if test_type:
+            query = query.filter(models.MockTestFile.test_type == test_type)
+        if exam_type:
+            query = query.filter(models.MockTestFile.exam_type == exam_type)
+    if after:
+        query = query.filter(tuple_(r.submitted_at, r.id) < tuple_(*after))
+    return query
+
+
 # ✅ FIXED: Correct Summary Endpoint
 @router.get("/results/summary")
-def summary(
-    db: Session = Depends(get_db),
+async def summary(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=SUMMARY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    test_type: Optional[str] = None,
+    exam_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    results = (
-        db.query(models.UserResult)
-        .filter(models.UserResult.user_id == current_user.id)
-        .order_by(models.UserResult.submitted_at.desc())
-        .all()
-    )
-
-    summary_data = []
-    for r in results:
-        summary_data.append({
-            "id": r.id,
-            "mocktest_id": r.mocktest_id,
-            "score": r.score,
-            "total_questions": r.total_questions,
-            "percentage": r.percentage,
-            "status": r.status,
-            "submitted_at": r.submitted_at,
-        })
+    """
+    The user's results, newest first. Without `limit` or `cursor` the list is
+    complete, as the test list pages expect. With either, it is one keyset
+    page (SUMMARY_PAGE_SIZE rows unless `limit` says otherwise). The body
+    stays a plain list; the cursor for the next page, if any, is returned in
+    the X-Next-Cursor header.
+    """
+    if limit is None and cursor is None:
+        rows = (await db.execute(summary_query(current_user.id, None, None, test_type, exam_type))).all()
+    else:
+        limit = limit or SUMMARY_PAGE_SIZE
+        after = decode_summary_cursor(cursor) if cursor else None
+        rows = (await db.execute(summary_query(current_user.id, limit + 1, after, test_type, exam_type))).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = encode_summary_cursor(rows[-1].submitted_at, rows[-1].id)
 
-    return summary_data
+    return [
+        {
+            "id": row.id,
+            "mocktest_id": row.mocktest_id,
+            "score": row.score,
+            "total_questions": row.total_questions,
+            "percentage": row.percentage,
+            "status": row.status,
+            "submitted_at": row.submitted_at,
+        }
+        for row in rows
+    ]
 
-@router.get("/result/{test_id}")
-def result(
-    test_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    res = (
-        db.query(models.UserResult)
+def latest_result_query(user_id, test_id):
+    return (
+        select(models.UserResult)
         .filter(
             models.UserResult.mocktest_id == test_id,
-            models.UserResult.user_id == current_user.id
+            models.UserResult.user_id == user_id
         )
         .order_by(models.UserResult.id.desc())
-        .first()
+        .limit(1)
     )
+
+@router.get("/result/{test_id}")
+async def result(
+    test_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    res = (await db.execute(latest_result_query(current_user.id, test_id))).scalars().first()
     if not res:
         raise HTTPException(status_code=404, detail="No result found for this user")
+
+    details = res.details if isinstance(res.details, (dict, list)) else json.loads(res.details)
+    if is_packed(details):
+        mocktest = await db.get(models.MockTestFile, res.mocktest_id)
+        bank = await run_in_threadpool(get_question_bank, mocktest)
+        changed = bank_changed(details, bank)
+        if changed:
+            print(f"⚠️ Result {res.id} was graded against bank {details['bank_version']}, now {bank.version}")
+        details = {
+            # CPU-bound for large banks; keep it off the event loop
+            "questions": await run_in_threadpool(expand_details, details, bank),
+            "sections": await load_section_stats_async(db, res.id),
+            "bank_changed": changed,
+        }
     return {
         "mocktest_id": res.mocktest_id,
         "score": res.score,
         "total_questions": res.total_questions,
         "percentage": res.percentage,
         "submitted_at": res.submitted_at,
-        "details": (
-            res.details
-            if isinstance(res.details, (dict, list))
-            else json.loads(res.details)
-        ),
+        "details": details,
     }
 
-@router.get("/result/{result_id}/preview")
-def preview_result(
-    result_id: int,
-    db: Session = Depends(get_db),
+@router.get("/{test_id}/sections/report")
+async def section_report(
+    test_id: int,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    result = db.query(models.UserResult).filter(models.UserResult.id == result_id).first()
-    if not result:
-        raise HTTPException(status_code=404, detail="Result not found")
+    """Section-wise averages across every submission of a test, aggregated in SQL."""
+    rows = (await db.execute(section_report_query(test_id))).all()
+    report = []
+    for row in rows:
+        answered = (row.correct or 0) + (row.wrong or 0)
+        report.append({
+            "section_name": row.section_name,
+            "results": row.results,
+            "avg_marks": round(row.avg_marks or 0, 2),
+            "max_marks": row.max_marks,
+            "min_marks": row.min_marks,
+            "accuracy": round((row.correct or 0) / answered * 100, 2) if answered else 0,
+            "attempt_rate": (
+                round(answered / (answered + (row.unanswered or 0)) * 100, 2)
+                if answered + (row.unanswered or 0) else 0
+            ),
+        })
+    return {"mocktest_id": test_id, "sections": report}
 
+def build_preview_body(result, bank, sections=None):
+    """The immutable part of a result preview: merged questions and section summary."""
     # Parse JSON safely
     try:
         parsed = json.loads(result.details) if isinstance(result.details, str) else result.details
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to parse details: {e}")
 
-    if isinstance(parsed, dict):
+    if is_packed(parsed):
+        stored_questions = stored_answers(parsed)
+    elif isinstance(parsed, dict):
         stored_questions = parsed.get("questions", [])
     elif isinstance(parsed, list):
         stored_questions = parsed
     else:
         stored_questions = []
 
-    # Read master Excel
-    mocktest = db.query(models.MockTestFile).filter(models.MockTestFile.id == result.mocktest_id).first()
-    if not mocktest:
-        raise HTTPException(status_code=404, detail="Mocktest file not found")
-
-    if not os.path.exists(mocktest.file_path):
-        raise HTTPException(status_code=500, detail="Mocktest file missing")
-
-    excel_rows = read_test_excel(mocktest.file_path)
-    excel_map = {str(r.get("question_id")): r for r in excel_rows}
-
-    # Merge stored details with Excel and rebuild options if missing
+    # Merge stored details with the question bank, unless the bank has been
+    # edited since grading and its questions may no longer match the ids
+    changed = bank_changed(parsed, bank)
+    by_id = {} if changed else bank.by_id
     merged = []
     for q in stored_questions:
         qid = str(q.get("question_id", ""))
-        base = excel_map.get(qid, {})
-
-        # 🧩 Fallback: construct options if Excel has A/B/C/D/E columns
-        options = base.get("options")
-        if not options or not isinstance(options, list) or len(options) == 0:
-            options = [
-                base.get("option_a") or base.get("A") or base.get("Option A") or "",
-                base.get("option_b") or base.get("B") or base.get("Option B") or "",
-                base.get("option_c") or base.get("C") or base.get("Option C") or "",
-                base.get("option_d") or base.get("D") or base.get("Option D") or "",
-                base.get("option_e") or base.get("E") or base.get("Option E") or "",
-            ]
-            # remove empty options if Excel used fewer than 5
-            options = [opt for opt in options if opt.strip()]
+        base = by_id.get(qid, {})
 
         merged.append({
             "question_id": qid,
-            "question_text": base.get("question_text", ""),
-            "options": options,
+            "question_text": base.get("question", ""),
+            # remove empty options if Excel used fewer than 5
+            "options": [opt for opt in base.get("options", []) if opt],
             "selected": q.get("selected", ""),
-            "correct": base.get("correct") or base.get("correct_option") or q.get("correct", ""),
+            # The key the result was graded against, not the bank's current one
+            "correct": q.get("correct") or base.get("correct", ""),
             "is_correct": q.get("is_correct", False),
             "section": base.get("section", q.get("section", "General")),
             "passage_id": base.get("passage_id", ""),
@@ -493,297 +456,206 @@ def preview_result(
             "explanation_image": q.get("explanation_image") or base.get("explanation_image", "")
         })
 
-    # ✅ Compute section-wise summary dynamically
-    section_map = {}
-    for q in merged:
-        sec = q.get("section", "General")
-        sel = q.get("selected", "")
-        corr = q.get("correct", "")
-        is_corr = q.get("is_correct", False)
-        if sec not in section_map:
-            section_map[sec] = {"attempted": 0, "correct": 0, "wrong": 0, "unattempted": 0}
-        if not sel:
-            section_map[sec]["unattempted"] += 1
-        elif is_corr:
-            section_map[sec]["attempted"] += 1
-            section_map[sec]["correct"] += 1
-        else:
-            section_map[sec]["attempted"] += 1
-            section_map[sec]["wrong"] += 1
-
+    # ✅ Section summary from user_section_results; older results fall back to the blob
+    sections = sections or section_stats_from_details(parsed)
     sections_summary = []
-    for sec, data in section_map.items():
+    for sec, data in sections.items():
         total = data["attempted"] + data["unattempted"]
-        data["marks"] = round(data["correct"] * 1 - data["wrong"] * 0.25, 2)
-        data["percentage"] = round((data["correct"] / total) * 100, 2) if total else 0
         sections_summary.append({
             "section_name": sec,
-            **data
+            "attempted": data["attempted"],
+            "correct": data["correct"],
+            "wrong": data["wrong"],
+            "unattempted": data["unattempted"],
+            "marks": data["marks"],
+            "percentage": round((data["correct"] / total) * 100, 2) if total else 0,
         })
 
-    # ---------------- Topper vs You Stats ----------------
-    all_results = (
-        db.query(models.UserResult)
-        .filter(models.UserResult.mocktest_id == result.mocktest_id)
-        .order_by(models.UserResult.score.desc())
-        .all()
-    )
-
-    total_users = len(all_results)
-    topper_score = all_results[0].score if total_users > 0 else 0
-    your_score = result.score
-    rank = next((i + 1 for i, r in enumerate(all_results) if r.id == result.id), total_users)
-    percentile = round(((total_users - rank) / total_users) * 100, 2) if total_users > 0 else 0
-
-    performance_band = (
-        "Top 10%" if percentile >= 90
-        else "Top 25%" if percentile >= 75
-        else "Top 50%" if percentile >= 50
-        else "Needs Improvement"
-    )
-
-    # ✅ Final response
     return {
         "id": result.id,
         "mocktest_id": result.mocktest_id,
         "score": result.score,
         "total_questions": result.total_questions,
         "percentage": result.percentage,
-        "submitted_at": result.submitted_at,
+        "submitted_at": result.submitted_at.isoformat(),
         "questions": merged,
         "sections_summary": sections_summary,
-        "analytics": {
-            "rank": rank,
-            "total_users": total_users,
-            "percentile": percentile,
-            "topper_score": topper_score,
-            "performance_band": performance_band
-        }
+        "bank_changed": changed,
     }
 
 
-
-@router.get("/result/{result_id}/download")
-def download_result_pdf(
+@router.get("/result/{result_id}/preview")
+async def preview_result(
     result_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    import base64
+    row = (
+        await db.execute(
+            select(models.UserResult.mocktest_id, models.UserResult.score)
+            .filter(models.UserResult.id == result_id)
+        )
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Result not found")
 
-    result = db.query(models.UserResult).filter(models.UserResult.id == result_id).first()
-    if not result:
+    mocktest = await db.get(models.MockTestFile, row.mocktest_id)
+    if not mocktest:
+        raise HTTPException(status_code=404, detail="Mocktest file not found")
+
+    if not os.path.exists(mocktest.file_path):
+        raise HTTPException(status_code=500, detail="Mocktest file missing")
+
+    # Only the ranking varies once a result exists; the rank index is
+    # append-only, so its size pins down the analytics for the ETag. The tag
+    # is taken once: if results land while this request runs, the body is
+    # newer than the tag and the next revalidation just gets a 200.
+    key = artifact_key("preview", result_id, file_version(mocktest.file_path), PREVIEW_RENDERER_VERSION)
+    with span("ranking"):
+        index = await rank_indexes.get_async(db, row.mocktest_id)
+    etag = f'"{key}-{index.overall.count}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    cached = await run_in_threadpool(artifact_store.read, "previews", key)
+    if cached is not None:
+        with span("json_decode"):
+            body = json.loads(cached)
+    else:
+        result = await db.get(models.UserResult, result_id)
+        sections = await load_section_stats_async(db, result_id)
+        # A cache miss parses Excel; keep that off the event loop
+        bank = await run_in_threadpool(get_question_bank, mocktest)
+        with span("preview_build"):
+            body = await run_in_threadpool(build_preview_body, result, bank, sections)
+        await run_in_threadpool(artifact_store.write, "previews", key, json.dumps(body).encode("utf-8"))
+
+    # ---------------- Topper vs You Stats ----------------
+    with span("ranking"):
+        standing = index.standing(
+            row.score, {sec["section_name"]: sec["marks"] for sec in body["sections_summary"]}
+        )
+    for sec in body["sections_summary"]:
+        sec["percentile"] = standing["section_percentiles"].get(sec["section_name"], 0)
+    percentile = standing["percentile"]
+
+    response.headers["Cache-Control"] = cache_headers["Cache-Control"]
+    response.headers["ETag"] = etag
+
+    # ✅ Final response
+    return {
+        **body,
+        "analytics": {
+            "rank": standing["rank"],
+            "total_users": standing["total_users"],
+            "percentile": percentile,
+            "topper_score": standing["topper_score"],
+            "performance_band": performance_band(percentile)
+        }
+    }
+
+
+async def _report_key(db: AsyncSession, result_id: int):
+    row = (
+        await db.execute(
+            select(models.UserResult.mocktest_id, models.MockTestFile.file_path)
+            .join(models.MockTestFile, models.MockTestFile.id == models.UserResult.mocktest_id)
+            .filter(models.UserResult.id == result_id)
+        )
+    ).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Result not found")
+    version = file_version(row.file_path)
+    return report_key(result_id, version), version
 
-    mocktest = db.query(models.MockTestFile).filter(models.MockTestFile.id == result.mocktest_id).first()
-    mocktest_name = getattr(mocktest, "mocktest_name", None) or getattr(mocktest, "name", f"Mock Test {result.mocktest_id}")
 
-    # ✅ Safely parse result.details
+async def _enqueue_report(db: AsyncSession, result_id: int, bank_version: str):
+    result = await db.get(models.UserResult, result_id)
+    mocktest = await db.get(models.MockTestFile, result.mocktest_id)
+    mocktest_name = getattr(mocktest, "name", None) or f"Mock Test {result.mocktest_id}"
+    # The report is shared by everyone who downloads it, so it names the result's owner
+    candidate = await db.get(models.User, result.user_id)
+    sections = await load_section_stats_async(db, result_id)
     try:
-        parsed = json.loads(result.details) if isinstance(result.details, str) else result.details
-        if isinstance(parsed, list):
-            questions = parsed
-            sections = {"General": {"attempted": 0, "correct": 0, "wrong": 0, "unattempted": 0}}
-        elif isinstance(parsed, dict):
-            questions = parsed.get("questions", [])
-            sections = parsed.get("sections", {"General": {"attempted": 0, "correct": 0, "wrong": 0, "unattempted": 0}})
-        else:
-            questions, sections = [], {"General": {"attempted": 0, "correct": 0, "wrong": 0, "unattempted": 0}}
+        data = build_report_data(result, mocktest_name, candidate, bank_version, sections)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to parse result details: {e}")
+    return report_jobs.enqueue(data)
 
-    # ✅ Calculate section-wise statistics dynamically
-    for q in questions:
-        sec = q.get("section", "General")
-        if sec not in sections:
-            sections[sec] = {"attempted": 0, "correct": 0, "wrong": 0, "unattempted": 0}
-        sel = q.get("selected", "")
-        correct = q.get("correct", "")
-        if not sel:
-            sections[sec]["unattempted"] += 1
-        elif sel == correct:
-            sections[sec]["attempted"] += 1
-            sections[sec]["correct"] += 1
-        else:
-            sections[sec]["attempted"] += 1
-            sections[sec]["wrong"] += 1
-
-    # ✅ Calculate marks and totals
-    for sec, stats in sections.items():
-        stats["marks"] = round(stats["correct"] * 1 - stats["wrong"] * 0.25, 2)
-        stats["total_marks"] = stats["attempted"] + stats["unattempted"]
-
-    # ✅ Prepare chart data
-    section_names = list(sections.keys())
-    correct = [s["correct"] for s in sections.values()]
-    wrong = [s["wrong"] for s in sections.values()]
-    unattempted = [s["unattempted"] for s in sections.values()]
-    marks = [s["marks"] for s in sections.values()]
-
-    # --- Chart 1: Section Performance ---
-    plt.figure(figsize=(6, 4))
-    plt.bar(section_names, correct, label="Correct", color="#28a745")
-    plt.bar(section_names, wrong, bottom=correct, label="Wrong", color="#dc3545")
-    plt.bar(section_names, unattempted, bottom=[c + w for c, w in zip(correct, wrong)],
-            label="Unattempted", color="#ffc107")
-    plt.title("Section-wise Performance (Questions Distribution)")
-    plt.xlabel("Sections")
-    plt.ylabel("Number of Questions")
-    plt.legend()
-    plt.tight_layout()
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    bar_chart_b64 = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close()
-
-    # --- Chart 2: Pie Chart ---
-    total_correct = sum(correct)
-    total_wrong = sum(wrong)
-    total_unattempted = sum(unattempted)
-    plt.figure(figsize=(4, 4))
-    plt.pie(
-        [total_correct, total_wrong, total_unattempted],
-        labels=["Correct", "Wrong", "Unattempted"],
-        autopct="%1.1f%%",
-        colors=["#28a745", "#dc3545", "#ffc107"],
-        startangle=90,
-    )
-    plt.title("Overall Performance Distribution")
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    pie_chart_b64 = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close()
-
-    # --- Chart 3: Marks per Section (Horizontal) ---
-    plt.figure(figsize=(6, 3))
-    plt.barh(section_names, marks, color="#007bff")
-    plt.title("Marks Scored per Section")
-    plt.xlabel("Marks")
-    plt.ylabel("Sections")
-    plt.tight_layout()
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    marks_chart_b64 = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close()
-
-    # ✅ Performance Rating
-    percentage = float(result.percentage)
-    if percentage >= 80:
-        performance = "Excellent"
-    elif percentage >= 60:
-        performance = "Good"
-    else:
-        performance = "Needs Improvement"
 
-    # --- PDF Generation ---
-    pdf = FPDF()
-    pdf.add_page()
+def _report_status(result_id: int, key: str):
+    status = report_jobs.status(key)
+    body = {"result_id": result_id, "status": status}
+    if status == "done":
+        body["download_url"] = f"/mocktests/result/{result_id}/download"
+    return body
 
-    # Header banner + logo
-    pdf.set_fill_color(255, 140, 0)
-    pdf.rect(0, 0, 210, 25, "F")
 
-    logo_path = "app/static/LCS_logo.jpg"
-    if os.path.exists(logo_path):
-        try:
-            pdf.image(logo_path, x=10, y=3, w=25)
-        except Exception as e:
-            print(f"⚠️ Logo load issue: {e}")
-    else:
-        print("⚠️ Logo not found, skipping logo.")
-
-    pdf.set_xy(40, 5)
-    pdf.set_font("Arial", "B", 16)
-    pdf.set_text_color(255, 255, 255)
-    pdf.cell(0, 10, "LARE CLOUD SOLUTIONS", ln=True, align="L")
-
-    pdf.set_font("Arial", "I", 10)
-    pdf.cell(0, 10, "Elevating Ideas. Empowering Futures.", ln=True, align="L")
-
-    # Candidate Info
-    pdf.set_text_color(0, 0, 0)
-    pdf.ln(20)
-    pdf.set_font("Arial", "", 12)
-    candidate_name = getattr(current_user, "name", getattr(current_user, "username", "Unknown Candidate"))
-    pdf.cell(0, 10, f"Candidate: {candidate_name}", ln=True)
-    pdf.cell(0, 10, f"Email: {getattr(current_user, 'email', 'N/A')}", ln=True)
-    pdf.cell(0, 10, f"Mock Test Name: {mocktest_name}", ln=True)
-    pdf.cell(0, 10, f"Mock Test ID: {result.mocktest_id}", ln=True)
-    pdf.cell(0, 10, f"Date: {result.submitted_at.strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
-    pdf.ln(5)
-
-    # --- Section Table ---
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(40, 10, "Section", border=1, align="C")
-    pdf.cell(25, 10, "Attempted", border=1, align="C")
-    pdf.cell(25, 10, "Correct", border=1, align="C")
-    pdf.cell(25, 10, "Wrong", border=1, align="C")
-    pdf.cell(30, 10, "Unattempted", border=1, align="C")
-    pdf.cell(25, 10, "Marks", border=1, align="C")
-    pdf.cell(25, 10, "Total Qs", border=1, ln=True, align="C")
-
-    pdf.set_font("Arial", "", 12)
-    for section, stats in sections.items():
-        pdf.cell(40, 10, section, border=1)
-        pdf.cell(25, 10, str(stats["attempted"]), border=1, align="C")
-        pdf.cell(25, 10, str(stats["correct"]), border=1, align="C")
-        pdf.cell(25, 10, str(stats["wrong"]), border=1, align="C")
-        pdf.cell(30, 10, str(stats["unattempted"]), border=1, align="C")
-        pdf.cell(25, 10, str(stats["marks"]), border=1, align="C")
-        pdf.cell(25, 10, str(stats["total_marks"]), border=1, ln=True, align="C")
-
-    # ✅ Section-wise Total Marks Summary
-    pdf.ln(8)
-    pdf.set_font("Arial", "B", 13)
-    pdf.cell(0, 10, "Section-wise Total Marks Summary", ln=True)
-    pdf.set_font("Arial", "", 12)
-    for sec, stats in sections.items():
-        pdf.cell(0, 8, f"Section: {sec} - {stats['total_marks']} Questions | Marks Secured: {stats['marks']}", ln=True)
-
-    # ✅ Final Overall Summary
-    total_possible_marks = sum([s["total_marks"] for s in sections.values()])
-    pdf.ln(10)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 10, f"Total Score: {result.score} / {result.total_questions}", ln=True)
-    pdf.cell(0, 10, f"Percentage: {result.percentage}%", ln=True)
-    pdf.cell(0, 10, f"Performance: {performance}", ln=True)
-    pdf.cell(0, 10, f"Overall Marks Secured: {result.score} / {total_possible_marks}", ln=True)
-    pdf.ln(10)
-
-    # Charts
-    pdf.image(BytesIO(base64.b64decode(bar_chart_b64)), x=15, w=180)
-    pdf.ln(10)
-    pdf.image(BytesIO(base64.b64decode(marks_chart_b64)), x=15, w=180)
-    pdf.ln(10)
-    pdf.image(BytesIO(base64.b64decode(pie_chart_b64)), x=60, w=80)
-    pdf.ln(10)
-
-    # Footer
-    pdf.set_font("Arial", "I", 10)
-    pdf.set_text_color(100, 100, 100)
-    pdf.cell(0, 10, "Generated by Smart MockTest System © 2025 | Powered by Lare Cloud Solutions", ln=True, align="C")
-
-    # ✅ Flush and send PDF response
-    pdf_buffer = BytesIO()
-    pdf.output(pdf_buffer)
-    pdf_data = pdf_buffer.getvalue()
-    pdf_buffer.close()
-
-    headers = {"Content-Disposition": f"attachment; filename=Result_Report_{result.id}.pdf"}
-    return Response(content=pdf_data, media_type="application/pdf", headers=headers)
+@router.post("/result/{result_id}/report", status_code=202)
+async def request_result_report(
+    result_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    key, version = await _report_key(db, result_id)
+    await _enqueue_report(db, result_id, version)
+    return _report_status(result_id, key)
+
+
+@router.get("/result/{result_id}/report")
+async def result_report_status(
+    result_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    key, _ = await _report_key(db, result_id)
+    return _report_status(result_id, key)
+
+
+@router.get("/result/{result_id}/download")
+async def download_result_pdf(
+    result_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    key, version = await _report_key(db, result_id)
+    headers = {
+        "ETag": f'"{key}"',
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Content-Disposition": f"attachment; filename=Result_Report_{result_id}.pdf",
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    path = report_path(key)
+    if not os.path.exists(path):
+        future = await _enqueue_report(db, result_id, version)
+        if future is not None:
+            # Wait without holding a thread; rendering happens in the report pool
+            try:
+                spans = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), REPORT_WAIT_SECONDS)
+                add_to_trace(spans)
+            except asyncio.TimeoutError:
+                return JSONResponse(status_code=202, content=_report_status(result_id, key))
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Failed to render report: {e}")
+
+    return FileResponse(path, media_type="application/pdf", headers=headers)
 
 
 @router.get("/subject")
-def get_subject_tests(db: Session = Depends(get_db)):
+async def get_subject_tests(db: AsyncSession = Depends(get_async_db)):
     tests = (
-        db.query(models.MockTestFile)
-        .filter(models.MockTestFile.test_type == "subject", models.MockTestFile.is_active == True)
-        .order_by(models.MockTestFile.subject.asc())
-        .all()
-    )
+        await db.execute(
+            select(models.MockTestFile)
+            .filter(models.MockTestFile.test_type == "subject", models.MockTestFile.is_active == True)
+            .order_by(models.MockTestFile.subject.asc())
+        )
+    ).scalars().all()
     return [
         {
             "id": t.id,
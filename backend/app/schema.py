@@ -0,0 +1,29 @@
+"""
+Schema management.
+
+The schema is owned by the Alembic migrations in backend/migrations and is
+applied once per deploy with `alembic upgrade head` (or init_db.py), not by
+every API worker at boot. With the default DB_SCHEMA_ON_STARTUP=none a
+worker runs no DDL and never inspects the catalog; DB_SCHEMA_ON_STARTUP=migrate
+upgrades on startup and is meant for single-process local development.
+"""
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_SCHEMA_ON_STARTUP = os.getenv("DB_SCHEMA_ON_STARTUP", "none").lower()
+
+
+def alembic_config():
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    return config
+
+
+def upgrade_schema(revision="head", configure_logger=True):
+    from alembic import command
+
+    config = alembic_config()
+    config.attributes["configure_logger"] = configure_logger
+    command.upgrade(config, revision)
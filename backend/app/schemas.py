@@ -54,7 +54,7 @@ class UserSectionResultBase(BaseModel):
     correct: Optional[int] = 0
     wrong: Optional[int] = 0
     unanswered: Optional[int] = 0
-    marks_obtained: Optional[int] = 0
+    marks_obtained: Optional[float] = 0
 
 
 class UserSectionResultResponse(UserSectionResultBase):
@@ -0,0 +1,149 @@
+"""
+Vectorized grading for mock test submissions.
+
+A ScoringEngine holds a test's answer key and section codes as NumPy arrays.
+Submissions are encoded once into uint8 vectors (0 = unattempted,
+1..5 = A..E, 255 = anything else) and graded per section with a handful of
+array operations; a stack of submissions is graded as one 2D matrix.
+"""
+import json
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.bank_bundle import answer_code
+from app.question_bank import bank_derived
+
+INVALID_ANSWER = 255
+
+
+@dataclass(frozen=True)
+class MarkingScheme:
+    correct: float = 1.0
+    negative_ratio: float = 0.25
+    unattempted: float = 0.0
+
+    @property
+    def wrong(self):
+        return -self.correct * self.negative_ratio
+
+
+DEFAULT_SCHEME = MarkingScheme(negative_ratio=float(os.getenv("DEFAULT_NEGATIVE_MARK_RATIO", "0.25")))
+
+# e.g. MARKING_SCHEMES='{"SBI PO": {"negative_ratio": 0.25}, "12": {"negative_ratio": 0}}'
+# Keys are a MockTestFile id or exam_type; the id wins.
+_MARKING_SCHEMES = {
+    str(k): MarkingScheme(**v) for k, v in json.loads(os.getenv("MARKING_SCHEMES", "{}")).items()
+}
+
+
+def marking_scheme_for(test):
+    """Resolves the marking scheme for a MockTestFile row."""
+    return (
+        _MARKING_SCHEMES.get(str(test.id))
+        or _MARKING_SCHEMES.get(str(test.exam_type))
+        or DEFAULT_SCHEME
+    )
+
+
+def encode_answer(value):
+    if not value or not str(value).strip():
+        return 0
+    return answer_code(str(value)) or INVALID_ANSWER
+
+
+class BatchScore:
+    """Per-section counts for m submissions; every array has shape (m, n_sections)."""
+
+    def __init__(self, engine, selected):
+        scheme = engine.scheme
+        attempted = selected != 0
+        is_correct = attempted & (selected == engine.answer_codes)
+        is_wrong = attempted & ~is_correct
+
+        onehot = engine.section_onehot
+        self.section_names = engine.section_names
+        self.is_correct = is_correct
+        self.correct = is_correct.astype(np.int32) @ onehot
+        self.wrong = is_wrong.astype(np.int32) @ onehot
+        self.attempted = self.correct + self.wrong
+        self.unattempted = engine.section_sizes - self.attempted
+        self.marks = (
+            self.correct * scheme.correct
+            + self.wrong * scheme.wrong
+            + self.unattempted * scheme.unattempted
+        )
+        self.total_correct = self.correct.sum(axis=1)
+        self.total_wrong = self.wrong.sum(axis=1)
+        self.score = np.round(self.marks.sum(axis=1), 2)
+
+    def __len__(self):
+        return len(self.score)
+
+    def section_stats(self, row=0):
+        return {
+            name: {
+                "attempted": int(self.attempted[row, k]),
+                "correct": int(self.correct[row, k]),
+                "wrong": int(self.wrong[row, k]),
+                "unattempted": int(self.unattempted[row, k]),
+                "marks": round(float(self.marks[row, k]), 2),
+            }
+            for k, name in enumerate(self.section_names)
+        }
+
+
+class ScoringEngine:
+    def __init__(self, qids, answer_codes, section_codes, section_names, scheme=DEFAULT_SCHEME):
+        self.qids = list(qids)
+        self.index = {qid: i for i, qid in enumerate(self.qids)}
+        self.answer_codes = np.asarray(answer_codes, dtype=np.uint8)
+        self.section_names = list(section_names)
+        self.scheme = scheme
+
+        section_codes = np.asarray(section_codes, dtype=np.intp)
+        self.section_onehot = np.zeros((len(self.qids), len(self.section_names)), dtype=np.int32)
+        self.section_onehot[np.arange(len(self.qids)), section_codes] = 1
+        self.section_sizes = self.section_onehot.sum(axis=0)
+        # The qid strings are the bank's; the list, index and arrays are ours
+        self.nbytes = (
+            sys.getsizeof(self.qids) + sys.getsizeof(self.index)
+            + self.answer_codes.nbytes + self.section_onehot.nbytes + self.section_sizes.nbytes
+        )
+
+    @classmethod
+    def for_bank(cls, bank, scheme=DEFAULT_SCHEME):
+        return cls(bank.qids, bank.answer_codes, bank.section_codes, bank.section_names, scheme)
+
+    def __len__(self):
+        return len(self.qids)
+
+    def encode(self, answers):
+        """Encodes a {question_id: letter} dict; unknown question ids are ignored."""
+        selected = np.zeros(len(self.qids), dtype=np.uint8)
+        for qid, value in answers.items():
+            i = self.index.get(str(qid))
+            if i is not None:
+                selected[i] = encode_answer(value)
+        return selected
+
+    def encode_batch(self, submissions):
+        selected = np.zeros((len(submissions), len(self.qids)), dtype=np.uint8)
+        for row, answers in enumerate(submissions):
+            selected[row] = self.encode(answers)
+        return selected
+
+    def grade(self, selected):
+        """Grades one encoded submission (shape (n,)) as a one-row BatchScore."""
+        return self.grade_batch(np.asarray(selected, dtype=np.uint8).reshape(1, -1))
+
+    def grade_batch(self, selected):
+        """Grades an (m, n) matrix of encoded submissions in one pass."""
+        return BatchScore(self, np.asarray(selected, dtype=np.uint8))
+
+
+def get_scoring_engine(bank, scheme=DEFAULT_SCHEME):
+    """ScoringEngine for a question bank, built once per bank version and marking scheme, evicted with the bank."""
+    return bank_derived(bank, ("scoring", scheme), lambda bank: ScoringEngine.for_bank(bank, scheme))
@@ -0,0 +1,133 @@
+"""
+Section-level results as rows in user_section_results.
+
+submit_test writes one row per section in the same transaction as its
+UserResult, so previews, PDF reports, rank indexes and section reports read
+section numbers with indexed SQL instead of decoding the details blob.
+Results submitted before the table was populated are filled in by
+backfill_section_results.py.
+"""
+import json
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+from app.reports import section_stats_from_details
+from app.scoring import DEFAULT_SCHEME, marking_scheme_for
+
+
+def section_rows(section_stats):
+    """UserSectionResult rows for a {section: stats} dict from BatchScore.section_stats."""
+    return [
+        models.UserSectionResult(
+            section_name=name,
+            correct=stats["correct"],
+            wrong=stats["wrong"],
+            unanswered=stats["unattempted"],
+            marks_obtained=stats["marks"],
+        )
+        for name, stats in section_stats.items()
+    ]
+
+
+def _section_stats_query(result_id):
+    s = models.UserSectionResult
+    return (
+        select(s.section_name, s.correct, s.wrong, s.unanswered, s.marks_obtained)
+        .where(s.user_result_id == result_id)
+        .order_by(s.id)
+    )
+
+
+def _to_section_stats(rows):
+    return {
+        name: {
+            "attempted": (correct or 0) + (wrong or 0),
+            "correct": correct or 0,
+            "wrong": wrong or 0,
+            "unattempted": unanswered or 0,
+            "marks": round(marks or 0, 2),
+        }
+        for name, correct, wrong, unanswered, marks in rows
+    }
+
+
+def load_section_stats(db: Session, result_id):
+    """{section: stats} for a result; empty if it has no section rows yet."""
+    return _to_section_stats(db.execute(_section_stats_query(result_id)).all())
+
+
+async def load_section_stats_async(db: AsyncSession, result_id):
+    return _to_section_stats((await db.execute(_section_stats_query(result_id))).all())
+
+
+def section_report_query(mocktest_id):
+    """Per-section aggregates over every result of a mock test."""
+    s, r = models.UserSectionResult, models.UserResult
+    return (
+        select(
+            s.section_name,
+            func.count().label("results"),
+            func.avg(s.marks_obtained).label("avg_marks"),
+            func.max(s.marks_obtained).label("max_marks"),
+            func.min(s.marks_obtained).label("min_marks"),
+            func.sum(s.correct).label("correct"),
+            func.sum(s.wrong).label("wrong"),
+            func.sum(s.unanswered).label("unanswered"),
+        )
+        .join(r, r.id == s.user_result_id)
+        .where(r.mocktest_id == mocktest_id)
+        .group_by(s.section_name)
+        .order_by(s.section_name)
+    )
+
+
+# ---------------- Backfill ----------------
+def backfill(db: Session, batch_size=500):
+    """
+    Writes section rows for results that have none, and rewrites details
+    stored as a JSON-encoded string into plain JSON. Returns the number of
+    results filled in.
+    """
+    schemes = {}
+    last_id, filled = 0, 0
+    while True:
+        results = (
+            db.query(models.UserResult)
+            .filter(
+                models.UserResult.id > last_id,
+                ~exists().where(models.UserSectionResult.user_result_id == models.UserResult.id),
+            )
+            .order_by(models.UserResult.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not results:
+            return filled
+
+        for result in results:
+            details = result.details
+            if isinstance(details, str):
+                try:
+                    details = result.details = json.loads(details)
+                except ValueError:
+                    details = None
+
+            if result.mocktest_id not in schemes:
+                schemes[result.mocktest_id] = (
+                    marking_scheme_for(result.mocktest) if result.mocktest else DEFAULT_SCHEME
+                )
+            scheme = schemes[result.mocktest_id]
+
+            stats = section_stats_from_details(details)
+            for s in stats.values():
+                s["marks"] = round(
+                    s["correct"] * scheme.correct + s["wrong"] * scheme.wrong + s["unattempted"] * scheme.unattempted, 2
+                )
+            result.sections.extend(section_rows(stats))
+
+        db.commit()
+        last_id = results[-1].id
+        filled += len(results)
@@ -0,0 +1,91 @@
+"""
+In-process cache from session token to a detached user snapshot.
+
+get_current_user runs on nearly every request; on a warm cache it costs no
+database queries. Entries live for at most SESSION_CACHE_TTL_SECONDS and never
+past the session's own expires_at. Logout and profile/password changes
+invalidate entries explicitly on the worker that handled them. A logout
+reaches the other workers through session_revocations (see
+app/session_tokens.py) within about SESSION_REVOCATION_SYNC_SECONDS;
+profile and password changes reach them when the TTL runs out.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+
+
+class ProfileSnapshot:
+    def __init__(self, full_name=None, dob=None, gender=None):
+        self.full_name = full_name
+        self.dob = dob
+        self.gender = gender
+
+
+class UserSnapshot:
+    """Read-only view of an authenticated User, safe to share across requests."""
+
+    def __init__(self, user, profile, session_expires_at):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.profile = (
+            ProfileSnapshot(profile.full_name, profile.dob, profile.gender) if profile else None
+        )
+        self.session_expires_at = session_expires_at
+
+
+class SessionCache:
+    def __init__(self, ttl_seconds, max_entries):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # token -> (expires_monotonic, snapshot)
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                expires, snapshot = entry
+                if time.monotonic() < expires and snapshot.session_expires_at > datetime.utcnow():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return snapshot
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token, snapshot):
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for token in [t for t, (_, s) in self._entries.items() if s.id == user_id]:
+                del self._entries[token]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+session_cache = SessionCache(SESSION_CACHE_TTL_SECONDS, SESSION_CACHE_MAX_ENTRIES)
@@ -0,0 +1,211 @@
+"""
+Signed, stateless session tokens (SESSION_MODE=signed).
+
+In the default database mode every login inserts a sessions row, and every
+authenticated request that misses session_cache looks its token up there.
+In signed mode the token carries the user id, issue time and expiry itself,
+with an HMAC-SHA256 over them keyed by SESSION_SECRET. get_current_user
+checks it without a database round trip, and login writes no row.
+
+A signed token cannot be taken back, so logout records the token's id in
+session_revocations. Each worker holds the unexpired revocations in a set,
+adds its own logouts at once and pulls other workers' every
+SESSION_REVOCATION_SYNC_SECONDS: rows above the highest id seen, plus rows
+created in the last SESSION_REVOCATION_SETTLE_SECONDS. Ids are handed out
+before commit, so a revocation can become visible after one with a higher
+id; the look-back picks it up unless its transaction ran longer than the
+settle window, and the full reload every SESSION_REVOCATION_FULL_SYNC_EVERY
+syncs catches even that. Revocations are
+dropped once the token they revoke has expired, so the set never holds more
+than one SESSION_EXPIRY_HOURS window of logouts.
+
+The same table tells other workers about database-mode logouts. Those
+sessions are deactivated in the sessions table, but a worker that still has
+the token in session_cache would accept it until the cache entry expired.
+Logout therefore also revokes database_token_id(token) for one
+SESSION_CACHE_TTL_SECONDS, and a session_cache hit is only used if that id
+is not revoked, so a logout reaches every worker within about
+SESSION_REVOCATION_SYNC_SECONDS. The sync runs in both modes.
+
+    SESSION_MODE                      database (default) | signed
+    SESSION_SECRET                    HMAC key; the same on every worker (required in signed mode)
+    SESSION_REVOCATION_SYNC_SECONDS   how often revocations from other workers are pulled
+    SESSION_REVOCATION_SETTLE_SECONDS how far back each pull re-reads, for late commits
+
+Database-mode tokens issued before switching to signed mode stay valid
+until they expire.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.models import SessionRevocation
+
+SESSION_MODE = os.getenv("SESSION_MODE", "database").lower()
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SESSION_REVOCATION_SYNC_SECONDS = float(os.getenv("SESSION_REVOCATION_SYNC_SECONDS", "5"))
+SESSION_REVOCATION_SETTLE_SECONDS = float(os.getenv("SESSION_REVOCATION_SETTLE_SECONDS", "60"))
+SESSION_REVOCATION_FULL_SYNC_EVERY = 60  # syncs between full reloads, which also purge expired rows
+
+if SESSION_MODE not in ("database", "signed"):
+    raise ValueError(f"Unknown SESSION_MODE: {SESSION_MODE!r} (expected 'database' or 'signed')")
+if SESSION_MODE == "signed" and not SESSION_SECRET:
+    raise RuntimeError("SESSION_MODE=signed needs SESSION_SECRET (the same value on every worker)")
+
+TokenClaims = namedtuple("TokenClaims", "user_id issued_at expires_at token_id")
+
+
+# ---------------- Tokens ----------------
+def _signature(payload):
+    digest = hmac.new(SESSION_SECRET.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def database_token_id(token):
+    """Revocation id for a database-mode session token (which is too long to store as is)."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+
+def is_signed_token(token):
+    # Database-mode tokens are plain hex
+    return "." in token
+
+
+def issue_token(user_id, expires_at):
+    """`{user_id}.{issued}.{expires}.{token id}.{signature}`, times in unix seconds (UTC)."""
+    issued = int(time.time())
+    expires = int((expires_at - datetime(1970, 1, 1)).total_seconds())
+    payload = f"{user_id}.{issued}.{expires}.{secrets.token_hex(8)}"
+    return f"{payload}.{_signature(payload)}"
+
+
+def read_token(token):
+    """The token's claims, or None if it is malformed, forged or expired. Revocation is not checked here."""
+    payload, _, signature = token.rpartition(".")
+    if not payload or not SESSION_SECRET or not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    try:
+        user_id, issued, expires, token_id = payload.split(".")
+        claims = TokenClaims(int(user_id), int(issued), int(expires), token_id)
+    except ValueError:
+        return None
+    if claims.expires_at <= time.time():
+        return None
+    return claims
+
+
+# ---------------- Revocations ----------------
+class RevocationSet:
+    def __init__(self, sync_seconds, session_factory=SessionLocal):
+        self.sync_seconds = sync_seconds
+        self.session_factory = session_factory
+        self.syncs = 0
+        self.rejected = 0
+        self._revoked = {}  # token id -> expiry, unix seconds
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_revoked(self, claims):
+        return self.is_revoked_id(claims.token_id)
+
+    def is_revoked_id(self, token_id):
+        with self._lock:
+            if token_id in self._revoked:
+                self.rejected += 1
+                return True
+            return False
+
+    async def revoke(self, db, claims):
+        """Records the revocation in `db` (an AsyncSession) and applies it to this worker at once."""
+        await self.revoke_id(db, claims.token_id, claims.expires_at)
+
+    async def revoke_id(self, db, token_id, expires_at):
+        """Like revoke, for a token id that is kept until `expires_at` (unix seconds)."""
+        with self._lock:
+            if token_id in self._revoked:
+                return
+            self._revoked[token_id] = expires_at
+        db.add(SessionRevocation(
+            token_id=token_id,
+            expires_at=datetime.utcfromtimestamp(expires_at),
+            created_at=datetime.utcnow(),
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()  # revoked by another worker in the meantime
+
+    def sync(self, full=False):
+        """Pulls revocations added since the last sync, or committed late; `full` reloads them all and purges expired rows."""
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            if full:
+                db.execute(delete(SessionRevocation).where(SessionRevocation.expires_at <= now))
+                db.commit()
+            query = (
+                select(SessionRevocation.id, SessionRevocation.token_id, SessionRevocation.expires_at)
+                .where(SessionRevocation.expires_at > now)
+                .order_by(SessionRevocation.id)
+            )
+            if not full:
+                settled = now - timedelta(seconds=SESSION_REVOCATION_SETTLE_SECONDS)
+                query = query.where(
+                    or_(SessionRevocation.id > self._last_id, SessionRevocation.created_at >= settled)
+                )
+            rows = db.execute(query).all()
+        epoch = datetime(1970, 1, 1)
+        fetched = {row.token_id: (row.expires_at - epoch).total_seconds() for row in rows}
+        with self._lock:
+            if full:
+                # Keep local revocations whose rows other transactions may not have committed yet
+                cutoff = time.time()
+                fetched.update({t: e for t, e in self._revoked.items() if e > cutoff and t not in fetched})
+                self._revoked = fetched
+            else:
+                self._revoked.update(fetched)
+            if rows:
+                self._last_id = max(self._last_id, rows[-1].id)
+            self.syncs += 1
+        return len(rows)
+
+    def _run(self):
+        rounds = 0
+        while not self._stop.wait(self.sync_seconds):
+            rounds += 1
+            try:
+                self.sync(full=rounds % SESSION_REVOCATION_FULL_SYNC_EVERY == 0)
+            except Exception as e:
+                print(f"❌ Session revocation sync failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self.sync(full=True)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-revocations", daemon=True)
+            self._thread.start()
+            print(f"✅ Session revocations: {len(self._revoked)} revoked tokens loaded.")
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._revoked), "syncs": self.syncs, "rejected": self.rejected}
+
+
+revocations = RevocationSet(SESSION_REVOCATION_SYNC_SECONDS)
@@ -0,0 +1,170 @@
+"""
+Short-lived key-value entries with a TTL, shared by every API worker.
+
+Password-reset OTPs and the grants issued after verifying one live here, so
+/forgot-password, /verify-otp and /reset-password can land on different
+workers. consume() reads and removes an entry in one step: two requests
+racing for the same entry never both get it.
+
+    TTL_STORE_BACKEND         database (ttl_entries table; default) | memory
+    TTL_STORE_SWEEP_SECONDS   how often expired entries are deleted
+
+Expired entries are never returned, whether or not they have been swept
+yet; the sweeper only keeps the table (or dict) from growing. The memory
+backend is per process and only suits a single worker.
+"""
+import hmac
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.models import TTLEntry
+
+TTL_STORE_BACKEND = os.getenv("TTL_STORE_BACKEND", "database").lower()
+TTL_STORE_SWEEP_SECONDS = float(os.getenv("TTL_STORE_SWEEP_SECONDS", "300"))
+
+
+def _matches(value, expected):
+    return expected is None or hmac.compare_digest(str(value), str(expected))
+
+
+class _SweepingStore:
+    """Runs sweep() on a background thread every `sweep_seconds`."""
+
+    def __init__(self, sweep_seconds):
+        self.sweep_seconds = sweep_seconds
+        self.swept = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_seconds):
+            try:
+                removed = self.sweep()
+            except Exception as e:
+                print(f"❌ TTL store sweep failed: {e}")
+                continue
+            self.swept += removed
+            if removed:
+                print(f"🧹 Swept {removed} expired TTL entries")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ttl-store-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+class MemoryTTLStore(_SweepingStore):
+    def __init__(self, sweep_seconds=TTL_STORE_SWEEP_SECONDS):
+        super().__init__(sweep_seconds)
+        self._entries = {}  # key -> (value, monotonic expiry)
+        self._lock = threading.Lock()
+
+    def set(self, key, value, ttl_seconds):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def consume(self, key, expected=None):
+        """Removes and returns the entry's value, if live and equal to `expected` (when given)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic() or not _matches(entry[0], expected):
+                return None
+            del self._entries[key]
+            return entry[0]
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires) in self._entries.items() if expires <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+
+class DatabaseTTLStore(_SweepingStore):
+    def __init__(self, session_factory=SessionLocal, sweep_seconds=TTL_STORE_SWEEP_SECONDS):
+        super().__init__(sweep_seconds)
+        self.session_factory = session_factory
+
+    def set(self, key, value, ttl_seconds):
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+        with self.session_factory() as db:
+            updated = db.execute(
+                update(TTLEntry).where(TTLEntry.key == key).values(value=value, expires_at=expires_at)
+            ).rowcount
+            if not updated:
+                try:
+                    db.execute(insert(TTLEntry).values(key=key, value=value, expires_at=expires_at))
+                except IntegrityError:
+                    # Another worker inserted the key in between; last write wins
+                    db.rollback()
+                    db.execute(
+                        update(TTLEntry).where(TTLEntry.key == key).values(value=value, expires_at=expires_at)
+                    )
+            db.commit()
+
+    def get(self, key):
+        with self.session_factory() as db:
+            return db.scalar(
+                select(TTLEntry.value).where(TTLEntry.key == key, TTLEntry.expires_at > datetime.utcnow())
+            )
+
+    def consume(self, key, expected=None):
+        """Removes and returns the entry's value, if live and equal to `expected` (when given)."""
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            value = db.scalar(select(TTLEntry.value).where(TTLEntry.key == key, TTLEntry.expires_at > now))
+            if value is None or not _matches(value, expected):
+                return None
+            # Only the request whose delete removes the row gets the value
+            deleted = db.execute(
+                delete(TTLEntry).where(TTLEntry.key == key, TTLEntry.value == value, TTLEntry.expires_at > now)
+            ).rowcount
+            db.commit()
+            return value if deleted == 1 else None
+
+    def delete(self, key):
+        with self.session_factory() as db:
+            db.execute(delete(TTLEntry).where(TTLEntry.key == key))
+            db.commit()
+
+    def sweep(self):
+        with self.session_factory() as db:
+            removed = db.execute(delete(TTLEntry).where(TTLEntry.expires_at <= datetime.utcnow())).rowcount
+            db.commit()
+            return removed
+
+
+def create_ttl_store(backend=TTL_STORE_BACKEND):
+    if backend == "database":
+        return DatabaseTTLStore()
+    if backend == "memory":
+        return MemoryTTLStore()
+    raise ValueError(f"Unknown TTL_STORE_BACKEND: {backend!r} (expected 'database' or 'memory')")
+
+
+ttl_store = create_ttl_store()
@@ -0,0 +1,262 @@
+"""
+Bulk user import for institutes onboarding thousands of students at once.
+
+signup costs two uniqueness SELECTs, a bcrypt hash and two commits per user.
+import_users takes a whole CSV or NDJSON file instead and, per batch of
+IMPORT_BATCH_SIZE rows:
+
+  - checks usernames and emails against auth_users in one set-based query
+    (duplicates inside the file are caught in memory),
+  - hashes the passwords on a process pool of IMPORT_HASH_PROCESSES, apart
+    from the PasswordHasher threads that serve logins,
+  - inserts auth_users and user_profiles rows in multi-row batches, using
+    COPY on PostgreSQL, and commits once.
+
+Every row that is not created gets an entry in the report (source row
+number, email, reason), with the same messages signup returns. A batch that
+loses a race with a concurrent signup is re-checked and retried once.
+
+Columns (CSV header or NDJSON keys): username, email, password, and
+optionally full_name, dob (YYYY-MM-DD) and gender; other columns are ignored.
+
+    IMPORT_BATCH_SIZE          rows per uniqueness check, hashing round and commit
+    IMPORT_HASH_PROCESSES      bcrypt processes (default: all cores)
+    USER_IMPORT_TOKEN          X-Import-Token for POST /auth/import-users (unset: endpoint disabled)
+    IMPORT_API_MAX_ROWS        largest file POST /auth/import-users accepts
+    IMPORT_API_HASH_PROCESSES  bcrypt processes for an import through the API
+
+import_users.py runs an import from the command line; that is the way for
+large files. The API endpoint answers within its request, so it takes at
+most IMPORT_API_MAX_ROWS rows, hashes on a few processes and runs one import
+at a time per worker, leaving the cores to request traffic.
+"""
+import csv
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import User, UserProfile
+from app.passwords import pwd_context
+from app.schemas import UserCreate
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_HASH_PROCESSES = int(os.getenv("IMPORT_HASH_PROCESSES", str(os.cpu_count() or 1)))
+USER_IMPORT_TOKEN = os.getenv("USER_IMPORT_TOKEN", "")
+IMPORT_API_MAX_ROWS = int(os.getenv("IMPORT_API_MAX_ROWS", "200"))
+IMPORT_API_HASH_PROCESSES = int(os.getenv("IMPORT_API_HASH_PROCESSES", "2"))
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# Held by the API import running in this worker
+api_import_lock = threading.Lock()
+
+
+# ---------------- Parsing ----------------
+def detect_format(filename, fmt=None):
+    fmt = (fmt or os.path.splitext(filename or "")[1].lstrip(".")).lower()
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format {fmt!r} (expected .csv or .ndjson)")
+    return fmt
+
+
+def parse_rows(text, fmt):
+    """Yields (row number, fields, None), or (row number, None, error) for unreadable records."""
+    if fmt == "csv":
+        # Row numbers count the header, so they match the line in a spreadsheet
+        for number, record in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+            yield number, {k.strip(): v for k, v in record.items() if k}, None
+        return
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, record, None
+
+
+def _validate(record):
+    fields = {k: v.strip() if isinstance(v, str) else v for k, v in record.items()}
+    fields = {k: v for k, v in fields.items() if v not in ("", None)}
+    try:
+        return UserCreate(**fields), None
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+
+# ---------------- Writing ----------------
+def _hash_password(password):
+    # Runs in the import's worker processes
+    return pwd_context.hash(password)
+
+
+def _copy(db, table, rows):
+    """COPY ... FROM STDIN on PostgreSQL (psycopg2): one statement for the whole batch."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in columns])  # unquoted empty = NULL
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    try:
+        cursor.copy_expert(statement, buffer)
+    except Exception as e:
+        if getattr(e, "pgcode", None) == "23505":  # unique_violation
+            raise IntegrityError(statement, None, e)
+        raise
+    finally:
+        cursor.close()
+
+
+def _insert_rows(db, model, rows):
+    if db.get_bind().dialect.name == "postgresql":
+        _copy(db, model.__table__, rows)
+    else:
+        db.execute(insert(model), rows)
+
+
+def _insert_batch(db, batch):
+    """Inserts [(row number, UserCreate, hash), ...] and their profiles, then commits."""
+    now = datetime.utcnow()
+    _insert_rows(db, User, [
+        {"username": user.username, "email": user.email, "password": hashed, "created_at": now}
+        for _, user, hashed in batch
+    ])
+    ids = dict(db.execute(
+        select(User.email, User.id).where(User.email.in_([user.email for _, user, _ in batch]))
+    ).all())
+    _insert_rows(db, UserProfile, [
+        {"user_id": ids[user.email], "full_name": user.full_name, "dob": user.dob, "gender": user.gender}
+        for _, user, _ in batch
+    ])
+    db.commit()
+
+
+# ---------------- Import ----------------
+class UserImport:
+    def __init__(self, db, pool, processes, batch_size, progress=None):
+        self.db = db
+        self.pool = pool
+        self.processes = processes
+        self.batch_size = batch_size
+        self.progress = progress
+        self.total = 0
+        self.created = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def fail(self, number, email, error):
+        self.errors.append({"row": number, "email": email, "error": error})
+
+    def _drop_taken(self, batch):
+        """Removes rows whose username or email exists already; one query for the whole batch."""
+        usernames = [row[1].username for row in batch]
+        emails = [row[1].email for row in batch]
+        taken = self.db.execute(
+            select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails)))
+        ).all()
+        taken_usernames = {username for username, _ in taken}
+        taken_emails = {email for _, email in taken}
+        kept = []
+        for row in batch:
+            number, user = row[0], row[1]
+            if user.username in taken_usernames:
+                self.fail(number, user.email, "Username already taken")
+            elif user.email in taken_emails:
+                self.fail(number, user.email, "Email already registered")
+            else:
+                kept.append(row)
+        return kept
+
+    def _import_batch(self, batch):
+        batch = self._drop_taken(batch)
+        self.db.rollback()  # no transaction stays open while the batch hashes
+        if not batch:
+            return
+        chunksize = max(1, len(batch) // (self.processes * 4))
+        hashes = self.pool.map(_hash_password, [user.password for _, user in batch], chunksize=chunksize)
+        batch = [(number, user, hashed) for (number, user), hashed in zip(batch, hashes)]
+        try:
+            _insert_batch(self.db, batch)
+        except IntegrityError:
+            # A signup took one of these usernames or emails since the check
+            self.db.rollback()
+            batch = self._drop_taken(batch)
+            try:
+                if batch:
+                    _insert_batch(self.db, batch)
+            except IntegrityError as e:
+                self.db.rollback()
+                for number, user, _ in batch:
+                    self.fail(number, user.email, f"Could not insert: {e.orig}")
+                return
+        self.created += len(batch)
+
+    def run(self, records):
+        seen_usernames, seen_emails = set(), set()
+        batch = []
+        for number, record, error in records:
+            self.total += 1
+            if error is None:
+                user, error = _validate(record)
+            if error is not None:
+                self.fail(number, record.get("email") if record else None, error)
+                continue
+            if user.username in seen_usernames:
+                self.fail(number, user.email, "Username appears earlier in the file")
+                continue
+            if user.email in seen_emails:
+                self.fail(number, user.email, "Email appears earlier in the file")
+                continue
+            seen_usernames.add(user.username)
+            seen_emails.add(user.email)
+            batch.append((number, user))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+                if self.progress:
+                    self.progress(self.report(with_errors=False))
+        if batch:
+            self._import_batch(batch)
+        return self.report()
+
+    def report(self, with_errors=True):
+        seconds = time.perf_counter() - self.started
+        report = {
+            "total": self.total,
+            "created": self.created,
+            "failed": len(self.errors),
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.total / seconds, 1) if seconds else 0.0,
+        }
+        if with_errors:
+            report["errors"] = sorted(self.errors, key=lambda e: e["row"])
+        return report
+
+
+def import_users(db, records, batch_size=IMPORT_BATCH_SIZE, processes=IMPORT_HASH_PROCESSES, progress=None):
+    """
+    Creates users and profiles from `records` (parse_rows output). Returns the
+    report: total, created, failed, seconds, rows_per_second and per-row errors.
+    `progress`, if given, gets the report (without errors) after every batch.
+    """
+    # spawn, not fork: API workers run background threads that a fork would copy mid-flight
+    with ProcessPoolExecutor(max_workers=processes, mp_context=get_context("spawn")) as pool:
+        return UserImport(db, pool, processes, batch_size, progress).run(records)
@@ -0,0 +1,25 @@
+# backfill_section_results.py
+"""
+Populates user_section_results for results submitted before submit_test
+wrote section rows, and re-stores details that were saved as a JSON-encoded
+string as plain JSON. Run after `alembic upgrade head`. Safe to re-run:
+results that already have section rows are skipped.
+
+Usage: python backfill_section_results.py [batch_size]
+"""
+import sys
+import time
+from app.database import SessionLocal
+from app.section_results import backfill
+
+batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+db = SessionLocal()
+try:
+    start = time.perf_counter()
+    filled = backfill(db, batch_size)
+    print(f"✅ Backfilled section rows for {filled} results in {time.perf_counter() - start:.1f} s")
+except Exception as e:
+    db.rollback()
+    print(f"❌ Backfill failed: {e}")
+finally:
+    db.close()
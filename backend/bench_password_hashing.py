@@ -0,0 +1,67 @@
+# bench_password_hashing.py
+"""
+Measures what the bcrypt work factor costs: password verifications (one
+per login) per second on one core, and through a PasswordHasher pool of
+PASSWORD_HASH_WORKERS threads, reported per core. Use it to pick
+BCRYPT_ROUNDS for the login rate an exam morning needs.
+
+Usage: python bench_password_hashing.py [rounds ...] [--seconds N] [--workers N]
+       e.g. python bench_password_hashing.py 10 11 12 13
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.passwords import PASSWORD_HASH_WORKERS, PasswordHasher, make_context
+
+
+def single_core(context, hashed, seconds):
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        context.verify("load-test-password", hashed)
+        done += 1
+    return done / (time.perf_counter() - start)
+
+
+async def pooled(context, hashed, seconds, workers):
+    hasher = PasswordHasher(context, workers, max_queue=workers * 4)
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await hasher.verify_and_update("load-test-password", hashed)
+            done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(workers * 2)))
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python bench_password_hashing.py")
+    parser.add_argument("rounds", type=int, nargs="*", default=[10, 11, 12])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = args.workers
+    print(f"🖥️ {cores} cores, {workers} hashing workers, {args.seconds:.0f}s per measurement")
+    print(f"{'rounds':>6} {'ms/login':>9} {'logins/s/core':>14} {'pool logins/s':>14} {'pool /s/core':>13}")
+    for rounds in args.rounds:
+        context = make_context(rounds)
+        hashed = context.hash("load-test-password")
+        per_core = single_core(context, hashed, args.seconds)
+        pool = asyncio.run(pooled(context, hashed, args.seconds, workers))
+        print(
+            f"{rounds:>6} {1000 / per_core:>9.1f} {per_core:>14.1f} {pool:>14.1f} "
+            f"{pool / min(workers, cores):>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
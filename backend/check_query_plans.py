@@ -0,0 +1,120 @@
+# check_query_plans.py
+"""
+EXPLAINs every hot query the routers run against the DATABASE_URL database
+and fails if any of them reads a hot table without an index, or sorts rows
+for an ORDER BY that no index serves. The queries come from the same
+builders the routes use, so a change to a route's query is checked as
+written. Run it after `alembic upgrade head`, e.g. in CI:
+
+    DATABASE_URL=sqlite:////tmp/plan.db alembic upgrade head
+    DATABASE_URL=sqlite:////tmp/plan.db python check_query_plans.py
+
+tests/test_query_plans.py runs the same check in the pytest suite.
+
+On PostgreSQL sequential scans are disabled for the check, so small test
+tables still show the plan the planner would choose at production size.
+Exits with status 1 if a query scans a hot table or needs a sort.
+"""
+import json
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.rank_index import RankIndex
+from app.routers.auth import session_lookup_query, user_lookup_query
+from app.routers.mocktests_router import _cached_state_query, latest_result_query, summary_query
+from app.section_results import _section_stats_query, section_report_query
+
+HOT_TABLES = {"sessions", "auth_users", "user_profiles", "user_results", "user_section_results", "exam_cache"}
+
+HOT_QUERIES = {
+    "get_current_user": session_lookup_query("token"),
+    "get_current_user (signed token)": user_lookup_query(1),
+    "resume / sync baseline": _cached_state_query(1, 1),
+    "rank index catch-up": RankIndex(1)._pending(),
+    "rank index rescan": RankIndex(1)._gap_query(),
+    "/result/{test_id}": latest_result_query(1, 1),
+    "/results/summary": summary_query(1, None),
+    "/results/summary (first page)": summary_query(1, 51),
+    "/results/summary (next page)": summary_query(1, 51, (datetime(2030, 1, 1), 10)),
+    "preview section stats": _section_stats_query(1),
+    "/{test_id}/sections/report": section_report_query(1),
+}
+
+
+def _explain(conn, query):
+    compiled = query.compile(dialect=engine.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if engine.dialect.name == "postgresql":
+        row = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+        return row if isinstance(row, list) else json.loads(row)
+    return conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+
+
+def _sqlite_scans(plan):
+    """Plan lines that read a hot table without an index, or sort for an ORDER BY."""
+    bad = []
+    for row in plan:
+        detail = row[-1]
+        words = detail.split()
+        if words[:1] == ["SCAN"] and len(words) > 1 and words[1] in HOT_TABLES and "INDEX" not in detail:
+            bad.append(detail)
+        elif "TEMP B-TREE FOR" in detail and "ORDER BY" in detail:
+            bad.append(detail)
+    return bad
+
+
+def _postgresql_scans(plan):
+    bad = []
+
+    def walk(node, parent=None):
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in HOT_TABLES:
+            bad.append(f"Seq Scan on {node['Relation Name']}")
+        # Sorting to feed a GROUP BY is fine; sorting for an ORDER BY is not
+        if node.get("Node Type") == "Sort" and (parent or {}).get("Node Type") != "Aggregate":
+            bad.append(f"Sort on {', '.join(node.get('Sort Key', []))}")
+        for child in node.get("Plans", []):
+            walk(child, node)
+
+    for entry in plan:
+        walk(entry["Plan"])
+    return bad
+
+
+def plan_problems(conn, query):
+    """What is wrong with a query's plan; empty when it is served by indexes."""
+    plan = _explain(conn, query)
+    return _postgresql_scans(plan) if engine.dialect.name == "postgresql" else _sqlite_scans(plan)
+
+
+@contextmanager
+def plan_connection():
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SET enable_seqscan = off"))
+        yield conn
+
+
+def main():
+    failures = 0
+    with plan_connection() as conn:
+        for name, query in HOT_QUERIES.items():
+            bad = plan_problems(conn, query)
+            if bad:
+                failures += 1
+                print(f"❌ {name}: {'; '.join(bad)}")
+            else:
+                print(f"✅ {name}")
+    if failures:
+        print(f"❌ {failures} hot queries read a table without an index or sort their rows")
+        sys.exit(1)
+    print("🏁 Every hot query uses an index.")
+
+
+if __name__ == "__main__":
+    main()
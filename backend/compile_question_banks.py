@@ -0,0 +1,34 @@
+# compile_question_banks.py
+"""
+Compiles every MockTestFile's Excel bank into an mmap-able bundle under
+QUESTION_BANK_BUNDLE_DIR. Re-run after editing or adding question files;
+bundles whose source file changed are ignored by the API until recompiled.
+
+Usage: python compile_question_banks.py [test_id ...]
+"""
+import sys
+import time
+from app.database import SessionLocal
+from app import models
+from app.bank_bundle import bundle_path, write_bundle
+from app.question_bank import QuestionBank, file_version
+
+db = SessionLocal()
+
+query = db.query(models.MockTestFile)
+if len(sys.argv) > 1:
+    query = query.filter(models.MockTestFile.id.in_([int(a) for a in sys.argv[1:]]))
+
+for test in query.order_by(models.MockTestFile.id).all():
+    try:
+        start = time.perf_counter()
+        version = file_version(test.file_path)
+        bank = QuestionBank.from_excel(test.id, test.file_path, version)
+        path = write_bundle(bank, bundle_path(test.id))
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"✅ Compiled: {test.name} (ID: {test.id}) -> {path} [{len(bank)} questions, {elapsed:.0f} ms]")
+    except Exception as e:
+        print(f"❌ Failed: {test.name} (ID: {test.id}): {e}")
+
+db.close()
+print("🏁 Compilation completed.")
@@ -0,0 +1,56 @@
+# import_users.py
+"""
+Bulk-creates users from a CSV or NDJSON file (see app/user_import.py):
+set-based uniqueness checks, passwords hashed on a process pool and
+multi-row inserts (COPY on PostgreSQL). Prints throughput after every batch
+and writes the per-row error report as JSON.
+
+Usage: python import_users.py students.csv [--format csv|ndjson] [--batch-size N]
+                              [--processes N] [--errors import_errors.json]
+"""
+import argparse
+import json
+
+from app.database import SessionLocal
+from app.user_import import IMPORT_BATCH_SIZE, IMPORT_HASH_PROCESSES, detect_format, import_users, parse_rows
+
+
+def print_progress(report):
+    print(
+        f"📥 {report['total']} rows read, {report['created']} created, {report['failed']} failed "
+        f"({report['rows_per_second']:.0f} rows/s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python import_users.py")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--processes", type=int, default=IMPORT_HASH_PROCESSES)
+    parser.add_argument("--errors", default="import_errors.json")
+    args = parser.parse_args()
+
+    fmt = detect_format(args.path, args.format)
+    with open(args.path, encoding="utf-8-sig") as f:
+        text = f.read()
+    db = SessionLocal()
+    try:
+        report = import_users(db, parse_rows(text, fmt), args.batch_size, args.processes, print_progress)
+    finally:
+        db.close()
+
+    print(
+        f"✅ Imported {report['created']} of {report['total']} users in {report['seconds']:.1f} s "
+        f"({report['rows_per_second']:.0f} rows/s, {args.processes} hashing processes)"
+    )
+    if report["errors"]:
+        with open(args.errors, "w") as f:
+            json.dump(report["errors"], f, indent=2)
+        for error in report["errors"][:10]:
+            print(f"❌ Row {error['row']} ({error['email']}): {error['error']}")
+        print(f"❌ {report['failed']} rows not imported; full report in {args.errors}")
+
+
+if __name__ == "__main__":
+    main()
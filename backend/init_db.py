@@ -1,6 +1,5 @@
-from app.database import engine, Base
-from app.models import User
+from app.schema import upgrade_schema
 
-print("Creating tables...")
-Base.metadata.create_all(bind=engine)
+print("Migrating database schema...")
+upgrade_schema()
 print("Done.")
@@ -0,0 +1,11 @@
+"""
+End-to-end load-test harness.
+
+    synthetic_bank  writes question-bank Excel files in the read_excel layout
+    seed            creates users and MockTestFile rows for those banks
+    scenarios       the exam-day traffic: login storm, resume, autosave,
+                    submit spike, preview and PDF download
+    stats           per-endpoint latency percentiles and throughput
+    run             the CLI tying them together (python -m loadtest.run)
+    compare         diffs two result files (python -m loadtest.compare)
+"""
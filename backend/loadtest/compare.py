@@ -0,0 +1,76 @@
+"""
+Compares two load-test result files endpoint by endpoint.
+
+Usage: python -m loadtest.compare baseline.json candidate.json [--fail-over PCT]
+
+Prints p50/p95/p99 and throughput for both runs with the relative change.
+With --fail-over, exits 1 if any endpoint's p95 got more than PCT percent
+slower, so a CI job can gate on it.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def _change(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(baseline, candidate):
+    """{endpoint: {metric: (old, new, percent change)}} for endpoints present in both runs."""
+    rows = {}
+    for label, new in candidate["endpoints"].items():
+        old = baseline["endpoints"].get(label)
+        if old is None:
+            continue
+        rows[label] = {m: (old.get(m), new.get(m), _change(old.get(m), new.get(m))) for m in METRICS}
+    return rows
+
+
+def _describe(results):
+    git = results.get("git") or {}
+    commit = (git.get("commit") or "?")[:10] + ("+dirty" if git.get("dirty") else "")
+    p = results["params"]
+    return f"{commit} {p['questions']}q {p['users']} users x{p['concurrency']} {p['database'].split(':')[0]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest.compare")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--fail-over", type=float, default=None, help="max p95 regression, percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline:  {_describe(baseline)}")
+    print(f"candidate: {_describe(candidate)}")
+    if baseline["params"] != candidate["params"]:
+        print("⚠️ Runs used different parameters; differences are not only the code.")
+
+    regressions = []
+    for label, metrics in compare(baseline, candidate).items():
+        print(label)
+        for metric, (old, new, change) in metrics.items():
+            pct = f"{change:+.1f}%" if change is not None else "-"
+            print(f"    {metric:<15} {old if old is not None else '-':>10} -> {new if new is not None else '-':>10}  {pct}")
+        change = metrics["p95_ms"][2]
+        if args.fail_over is not None and change is not None and change > args.fail_over:
+            regressions.append(f"{label}: p95 {change:+.1f}%")
+
+    if regressions:
+        print(f"❌ p95 regressed more than {args.fail_over}%:")
+        for line in regressions:
+            print(f"    {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Runs one load test end to end: writes a synthetic bank, seeds the database,
+starts the backend (unless --base-url points at one already running),
+drives the exam-day scenarios and writes the results as JSON.
+
+Usage (from backend/):
+    python -m loadtest.run --questions 1000 --users 200 --concurrency 100
+    python -m loadtest.run --database-url postgresql+psycopg2://user:pw@127.0.0.1/loadtest --workers 4
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --database-url <the server's DATABASE_URL>
+
+The results file records the git commit, the parameters and, per phase
+and per endpoint, p50/p95/p99 latency and throughput; compare two runs with
+`python -m loadtest.compare old.json new.json`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), "mocktest-loadtest")
+RESULT_FORMAT_VERSION = 1
+SERVER_START_SECONDS = 60
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest.run", description="Exam-day load test.")
+    parser.add_argument("--questions", type=int, default=1000, help="bank size, 50-10000 (default 1000)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=None, help="users in flight at once (default: all)")
+    parser.add_argument("--delivery", choices=["full", "manifest"], default="full")
+    parser.add_argument("--autosave-rounds", type=int, default=5)
+    parser.add_argument("--think-ms", type=int, default=250, help="max think time between autosaves")
+    parser.add_argument("--phases", default=None, help="comma-separated subset of the phases, in run order")
+    parser.add_argument("--password", default="loadtest-pw")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic bank seed")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="banks, artifacts, server log")
+    parser.add_argument("--database-url", default=None, help="default: a SQLite file in --work-dir")
+    parser.add_argument("--base-url", default=None, help="use a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started server")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout, seconds")
+    parser.add_argument("--out", default=None, help="results JSON (default: in --work-dir)")
+    return parser.parse_args(argv)
+
+
+# ---------------- Environment ----------------
+def git_revision():
+    def git(*args):
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def server_env(args):
+    """Environment shared by the seeding process and the started server."""
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=args.database_url,
+        ARTIFACT_DIR=os.path.join(args.work_dir, "artifacts"),
+        QUESTION_BANK_BUNDLE_DIR=os.path.join(args.work_dir, "bundles"),
+    )
+    return env
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, env):
+    port = args.port or free_port()
+    log = open(os.path.join(args.work_dir, "server.log"), "ab")
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--no-access-log",
+        ],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    import httpx
+
+    deadline = time.monotonic() + SERVER_START_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}; see {log.name}")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                print(f"✅ Server up at {base_url} ({args.workers} workers)")
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"Server did not start within {SERVER_START_SECONDS}s; see {log.name}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def pool_snapshot(base_url):
+    import httpx
+
+    try:
+        return httpx.get(f"{base_url}/internal/db-pool", timeout=5).json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+# ---------------- Output ----------------
+def print_table(endpoints):
+    print(f"{'endpoint':<58} {'n':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>8}")
+    for label, s in endpoints.items():
+        cells = [f"{s[k]:.1f}" if s[k] is not None else "-" for k in ("p50_ms", "p95_ms", "p99_ms")]
+        rps = f"{s['throughput_rps']:.1f}" if s["throughput_rps"] is not None else "-"
+        print(f"{label:<58} {s['count']:>6} {s['errors']:>5} {cells[0]:>9} {cells[1]:>9} {cells[2]:>9} {rps:>8}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(args.work_dir, exist_ok=True)
+    args.database_url = args.database_url or f"sqlite:///{os.path.join(args.work_dir, 'loadtest.db')}"
+
+    # app.database reads DATABASE_URL at import time, so set it before seeding imports it
+    env = server_env(args)
+    os.environ.update({k: env[k] for k in ("DATABASE_URL", "ARTIFACT_DIR", "QUESTION_BANK_BUNDLE_DIR")})
+    os.chdir(BACKEND_DIR)
+
+    from sqlalchemy.engine import make_url
+
+    from loadtest.scenarios import PHASES, run_scenario
+    from loadtest.seed import seed
+    from loadtest.stats import Recorder
+    from loadtest.synthetic_bank import write_bank
+
+    phases = tuple(p.strip() for p in args.phases.split(",")) if args.phases else PHASES
+    unknown = set(phases) - set(PHASES)
+    if unknown:
+        sys.exit(f"Unknown phases: {', '.join(sorted(unknown))} (choose from {', '.join(PHASES)})")
+
+    start = time.perf_counter()
+    bank_path = write_bank(
+        os.path.join(args.work_dir, "banks", f"bank_{args.questions}q_seed{args.seed}.xlsx"),
+        args.questions, args.seed,
+    )
+    print(f"✅ Bank ready: {bank_path} [{time.perf_counter() - start:.1f}s]")
+    credentials, tests = seed({args.questions: bank_path}, args.users, args.password)
+
+    process = None
+    base_url = args.base_url
+    if base_url is None:
+        process, base_url = start_server(args, env)
+    recorder = Recorder()
+    started_at = datetime.utcnow()
+    try:
+        asyncio.run(run_scenario(
+            recorder, base_url, credentials, tests[args.questions],
+            concurrency=args.concurrency or args.users,
+            timeout=args.timeout,
+            phases=phases,
+            delivery=args.delivery,
+            autosave_rounds=args.autosave_rounds,
+            think_seconds=args.think_ms / 1000,
+        ))
+        pool = pool_snapshot(base_url)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    results = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "started_at": started_at.isoformat() + "Z",
+        "git": git_revision(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "params": {
+            "questions": args.questions,
+            "users": args.users,
+            "concurrency": args.concurrency or args.users,
+            "delivery": args.delivery,
+            "autosave_rounds": args.autosave_rounds,
+            "think_ms": args.think_ms,
+            "phases": list(phases),
+            "seed": args.seed,
+            "workers": args.workers if args.base_url is None else None,
+            "database": make_url(args.database_url).render_as_string(hide_password=True),
+        },
+        **recorder.report(),
+        "db_pool": pool,
+    }
+    out = args.out or os.path.join(
+        args.work_dir, f"results-{(results['git']['commit'] or 'nogit')[:10]}-{started_at:%Y%m%dT%H%M%S}.json"
+    )
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print_table(results["endpoints"])
+    print(f"🏁 Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Exam-day traffic against a running backend.
+
+Each virtual user has its own httpx client (and so its own session
+cookie). The phases run in order, every user taking part in each, with at
+most `concurrency` users in flight at once:
+
+    login_storm    everyone logs in at the start of the exam window
+    resume         GET /{test_id}/resume (and, for manifest delivery, the
+                   section bodies from /{test_id}/questions)
+    autosave       rounds of /{test_id}/sync deltas with think time between
+    submit_spike   everyone submits at once, grading the synced answers
+    preview        the result preview, then an If-None-Match revalidation
+    pdf_download   the PDF report, polling /report while it renders
+
+Requests are recorded under their route template, so numbers line up
+across runs whatever ids the database handed out.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+PHASES = ("login_storm", "resume", "autosave", "submit_spike", "preview", "pdf_download")
+PDF_POLL_SECONDS = 0.5
+
+
+class VirtualUser:
+    def __init__(self, base_url, credentials, test_id, timeout):
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+        self.email = credentials["email"]
+        self.password = credentials["password"]
+        self.test_id = test_id
+        self.rng = random.Random(self.email)
+        self.logged_in = False
+        self.attempt_id = None
+        self.question_ids = []
+        self.seq = 0
+        self.result_id = None
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class Scenario:
+    def __init__(self, recorder, users, concurrency, delivery="full", autosave_rounds=5,
+                 think_seconds=0.25, pdf_timeout=120.0):
+        self.recorder = recorder
+        self.users = users
+        self.concurrency = concurrency
+        self.delivery = delivery
+        self.autosave_rounds = autosave_rounds
+        self.think_seconds = think_seconds
+        self.pdf_timeout = pdf_timeout
+
+    # ---------------- Runner ----------------
+    async def run(self, phases=PHASES):
+        for name in phases:
+            step = getattr(self, name)
+            print(f"▶️ {name} ({len(self.users)} users, concurrency {self.concurrency})")
+            self.recorder.start_phase(name)
+            await self._each_user(step)
+            self.recorder.end_phase()
+
+    async def _each_user(self, step):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(user):
+            async with semaphore:
+                await step(user)
+
+        await asyncio.gather(*(limited(user) for user in self.users))
+
+    async def _request(self, user, label, method, url, **kwargs):
+        return await self.recorder.request(user.client, label, method, url, **kwargs)
+
+    # ---------------- Phases ----------------
+    async def login_storm(self, user):
+        r = await self._request(
+            user, "POST /auth/login", "POST", "/auth/login",
+            json={"email": user.email, "password": user.password},
+        )
+        user.logged_in = r is not None and r.status_code == 200
+
+    async def resume(self, user):
+        r = await self._request(
+            user, f"GET /mocktests/{{test_id}}/resume?delivery={self.delivery}", "GET",
+            f"/mocktests/{user.test_id}/resume", params={"delivery": self.delivery},
+        )
+        if r is None or r.status_code != 200:
+            return
+        body = r.json()
+        user.attempt_id = body["attempt_id"]
+        user.seq = body.get("sync_seq", 0)
+        if self.delivery == "full":
+            user.question_ids = [q["question_id"] for q in body["questions"]]
+            return
+        for section in body["manifest"]["sections"]:
+            user.question_ids.extend(section["question_ids"])
+            await self._request(
+                user, "GET /mocktests/{test_id}/questions?section", "GET",
+                f"/mocktests/{user.test_id}/questions", params={"section": section["name"]},
+            )
+
+    async def autosave(self, user):
+        if not user.logged_in or not user.question_ids:
+            return
+        # Answer roughly 80% of the paper over the rounds, a slice per round
+        answered = [qid for qid in user.question_ids if user.rng.random() < 0.8]
+        rounds = max(self.autosave_rounds, 1)
+        per_round = -(-len(answered) // rounds) or 1
+        for start in range(0, max(len(answered), 1), per_round):
+            await asyncio.sleep(user.rng.uniform(0, self.think_seconds))
+            chunk = answered[start:start + per_round]
+            user.seq += 1
+            await self._request(
+                user, "POST /mocktests/{test_id}/sync", "POST", f"/mocktests/{user.test_id}/sync",
+                json={
+                    "seq": user.seq,
+                    "changes": {qid: user.rng.choice("ABCDE") for qid in chunk},
+                    "time_left": 3600 - user.seq * 60,
+                    "current_question": user.question_ids.index(chunk[-1]) if chunk else 0,
+                },
+            )
+
+    async def submit_spike(self, user):
+        if not user.logged_in or not user.attempt_id:
+            return
+        r = await self._request(
+            user, "POST /mocktests/{test_id}/submit/{attempt_id}", "POST",
+            f"/mocktests/{user.test_id}/submit/{user.attempt_id}", json={},
+        )
+        if r is not None and r.status_code == 200:
+            user.result_id = r.json()["result_id"]
+
+    async def preview(self, user):
+        if user.result_id is None:
+            return
+        label = "GET /mocktests/result/{result_id}/preview"
+        url = f"/mocktests/result/{user.result_id}/preview"
+        r = await self._request(user, label, "GET", url)
+        etag = r.headers.get("etag") if r is not None else None
+        if etag:
+            await self._request(user, f"{label} (revalidate)", "GET", url, headers={"If-None-Match": etag})
+
+    async def pdf_download(self, user):
+        if user.result_id is None:
+            return
+        label = "GET /mocktests/result/{result_id}/download"
+        url = f"/mocktests/result/{user.result_id}/download"
+        start = time.perf_counter()
+        r = await self._request(user, label, "GET", url)
+        deadline = start + self.pdf_timeout
+        # 202: still rendering after REPORT_WAIT_SECONDS; poll like the frontend does
+        while r is not None and r.status_code == 202 and time.perf_counter() < deadline:
+            await asyncio.sleep(PDF_POLL_SECONDS)
+            status = await self._request(
+                user, "GET /mocktests/result/{result_id}/report", "GET",
+                f"/mocktests/result/{user.result_id}/report",
+            )
+            state = status.json().get("status") if status is not None and status.status_code == 200 else None
+            if state == "failed":
+                break
+            if state == "done":
+                r = await self._request(user, label, "GET", url)
+        # End to end, including any polling
+        self.recorder.record("PDF ready (client)", time.perf_counter() - start, r.status_code if r else None)
+
+
+async def run_scenario(recorder, base_url, credentials, test_id, concurrency, timeout=120.0,
+                       phases=PHASES, **options):
+    users = [VirtualUser(base_url, c, test_id, timeout) for c in credentials]
+    try:
+        await Scenario(recorder, users, concurrency, **options).run(phases)
+    finally:
+        await asyncio.gather(*(user.close() for user in users))
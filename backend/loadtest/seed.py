@@ -0,0 +1,91 @@
+"""
+Seeds the DATABASE_URL database (SQLite or PostgreSQL) for a load run:
+migrates it to head, then creates the load-test users and one MockTestFile
+per synthetic bank. Seeding is idempotent - existing users and tests are
+reused - so repeated runs against the same database only add results.
+
+Every user shares one password, hashed once: hashing thousands of bcrypt
+passwords would make seeding slower than the run itself.
+"""
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+USER_EMAIL_DOMAIN = "loadtest.example.com"
+TEST_NAME_PREFIX = "Load test"
+
+
+def user_credentials(count, password):
+    return [
+        {"username": f"lt_user{i}", "email": f"lt_user{i}@{USER_EMAIL_DOMAIN}", "password": password}
+        for i in range(1, count + 1)
+    ]
+
+
+def seed_users(db, credentials):
+    from app.models import User, UserProfile
+    from app.routers.auth import hash_password
+
+    existing = set(
+        db.execute(select(User.email).where(User.email.in_([c["email"] for c in credentials]))).scalars()
+    )
+    missing = [c for c in credentials if c["email"] not in existing]
+    if not missing:
+        return 0
+
+    hashed = hash_password(missing[0]["password"])
+    now = datetime.utcnow()
+    db.execute(insert(User), [
+        {"username": c["username"], "email": c["email"], "password": hashed, "created_at": now}
+        for c in missing
+    ])
+    ids = db.execute(
+        select(User.id, User.username).where(User.email.in_([c["email"] for c in missing]))
+    ).all()
+    db.execute(insert(UserProfile), [
+        {"user_id": user_id, "full_name": username.replace("_", " ").title()} for user_id, username in ids
+    ])
+    db.commit()
+    return len(missing)
+
+
+def seed_test(db, path, questions, duration_minutes=60):
+    """The MockTestFile for a synthetic bank, created on first use."""
+    from app.models import MockTestFile
+
+    name = f"{TEST_NAME_PREFIX} {questions}q"
+    test = db.execute(select(MockTestFile).where(MockTestFile.name == name)).scalars().first()
+    if test is None:
+        test = MockTestFile(
+            name=name,
+            exam_type="Load test",
+            test_type="full",
+            file_path=path,
+            total_questions=questions,
+            duration_minutes=duration_minutes,
+        )
+        db.add(test)
+    else:
+        test.file_path = path
+    db.commit()
+    return test.id
+
+
+def seed(banks, users, password):
+    """
+    Migrates the schema and seeds `users` users plus one test per bank.
+    `banks` maps question count -> Excel path. Returns (credentials, {questions: test_id}).
+    """
+    from app.database import SessionLocal
+    from app.schema import upgrade_schema
+
+    upgrade_schema(configure_logger=False)
+    credentials = user_credentials(users, password)
+    db = SessionLocal()
+    try:
+        created = seed_users(db, credentials)
+        tests = {questions: seed_test(db, path, questions) for questions, path in banks.items()}
+    finally:
+        db.close()
+    print(f"✅ Seeded {created} new users ({users} total) and {len(tests)} tests.")
+    return credentials, tests
@@ -0,0 +1,94 @@
+"""
+Latency and throughput bookkeeping for a load run.
+
+Every request is recorded under an endpoint label (the route template, not
+the concrete URL) and the phase it ran in. A summary reports count, errors,
+status codes, p50/p95/p99/max latency in milliseconds and throughput over
+the phase's wall-clock time.
+"""
+import time
+from collections import Counter, defaultdict
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(samples, wall_seconds):
+    """`samples` is a list of (seconds, status); status is None for transport errors."""
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    statuses = Counter("error" if status is None else str(status) for _, status in samples)
+    errors = sum(n for status, n in statuses.items() if status == "error" or status.startswith("5"))
+    summary = {
+        "count": len(samples),
+        "errors": errors,
+        "status": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+    }
+    for pct in PERCENTILES:
+        value = percentile(latencies, pct)
+        summary[f"p{pct}_ms"] = round(value, 2) if value is not None else None
+    return summary
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(lambda: defaultdict(list))  # phase -> label -> [(seconds, status)]
+        self.walls = {}
+        self.phase = None
+        self._phase_started = None
+
+    def start_phase(self, name):
+        self.phase = name
+        self._phase_started = time.perf_counter()
+        self.samples[name]  # keep phases in run order even if one records nothing
+
+    def end_phase(self):
+        self.walls[self.phase] = time.perf_counter() - self._phase_started
+        self.phase = None
+
+    def record(self, label, seconds, status):
+        self.samples[self.phase][label].append((seconds, status))
+
+    async def request(self, client, label, method, url, **kwargs):
+        """Sends one request and records it; returns the response, or None on a transport error."""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.record(label, time.perf_counter() - start, None)
+            return None
+        self.record(label, time.perf_counter() - start, response.status_code)
+        return response
+
+    def report(self):
+        phases = []
+        overall = defaultdict(list)
+        overall_wall = defaultdict(float)  # label -> wall time of the phases it ran in
+        for phase, labels in self.samples.items():
+            wall = self.walls.get(phase, 0.0)
+            count = sum(len(samples) for samples in labels.values())
+            phases.append({
+                "name": phase,
+                "wall_seconds": round(wall, 3),
+                "requests": count,
+                "throughput_rps": round(count / wall, 2) if wall else None,
+                "endpoints": {label: summarize(samples, wall) for label, samples in labels.items()},
+            })
+            for label, samples in labels.items():
+                overall[label].extend(samples)
+                overall_wall[label] += wall
+        return {
+            "phases": phases,
+            "endpoints": {label: summarize(samples, overall_wall[label]) for label, samples in overall.items()},
+        }
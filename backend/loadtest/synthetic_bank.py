@@ -0,0 +1,108 @@
+"""
+Synthetic question banks in the column layout read_question_rows() expects.
+
+Banks are deterministic for a given size and seed, so two runs against
+different commits load identical files. English questions come in passage
+groups that share passage_id/passage_text; a share of questions, passages
+and explanations reference the images shipped in app/static/mocktest_images
+so image URLs resolve the same way real banks do.
+"""
+import os
+import random
+
+from app.question_bank import OPTION_COLUMNS
+
+MIN_QUESTIONS = 50
+MAX_QUESTIONS = 10_000
+
+HEADERS = [
+    "question_id", "question", *OPTION_COLUMNS, "correct_option", "explanation", "section",
+    "passage_id", "passage_text", "question_image", "explanation_image", "passage_image",
+]
+SECTIONS = ["English Language", "Quantitative Aptitude", "Reasoning Ability"]
+PASSAGE_SECTION = "English Language"
+PASSAGE_GROUP_SIZE = 5
+QUESTION_IMAGE_EVERY = 10
+EXPLANATION_IMAGE_EVERY = 7
+PASSAGE_IMAGE_EVERY = 4  # every 4th passage
+IMAGE_DIR = os.path.join("app", "static", "mocktest_images")
+
+WORDS = (
+    "market bank policy growth rate interest inflation credit deposit loan economy "
+    "reform digital payment rural branch customer capital asset liability profit "
+    "analysis report committee survey quarter annual budget fiscal monetary index"
+).split()
+
+
+def _sentence(rng, words):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng, sentences):
+    return " ".join(_sentence(rng, rng.randint(8, 16)) for _ in range(sentences))
+
+
+def _images():
+    try:
+        names = sorted(n for n in os.listdir(IMAGE_DIR) if not n.startswith("."))
+    except FileNotFoundError:
+        names = []
+    return [f"static/mocktest_images/{n}" for n in names] or ["static/mocktest_images/loadtest.png"]
+
+
+def bank_rows(questions, seed=0):
+    """Yields one row per question, in HEADERS order."""
+    rng = random.Random(f"{seed}:{questions}")
+    images = _images()
+    per_section = -(-questions // len(SECTIONS))
+    passage = None
+    for idx in range(1, questions + 1):
+        section = SECTIONS[min((idx - 1) // per_section, len(SECTIONS) - 1)]
+        options = [_sentence(rng, rng.randint(2, 6)) for _ in OPTION_COLUMNS]
+        correct = rng.choice("ABCDE")
+
+        if section == PASSAGE_SECTION:
+            group = (idx - 1) // PASSAGE_GROUP_SIZE
+            if passage is None or passage[0] != group:
+                image = images[group % len(images)] if group % PASSAGE_IMAGE_EVERY == 0 else ""
+                passage = (group, f"P{group + 1}", _paragraph(rng, rng.randint(6, 12)), image)
+            _, passage_id, passage_text, passage_image = passage
+        else:
+            passage_id = passage_text = passage_image = ""
+
+        yield [
+            idx,
+            f"Q{idx}. {_sentence(rng, rng.randint(12, 30))}",
+            *options,
+            correct,
+            _paragraph(rng, rng.randint(1, 4)),
+            section,
+            passage_id,
+            passage_text,
+            images[idx % len(images)] if idx % QUESTION_IMAGE_EVERY == 0 else "",
+            images[idx % len(images)] if idx % EXPLANATION_IMAGE_EVERY == 0 else "",
+            passage_image,
+        ]
+
+
+def write_bank(path, questions, seed=0):
+    """Writes a `questions`-question bank to `path` (skipped if it already exists)."""
+    import openpyxl
+
+    if not MIN_QUESTIONS <= questions <= MAX_QUESTIONS:
+        raise ValueError(f"questions must be between {MIN_QUESTIONS} and {MAX_QUESTIONS}")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADERS)
+    for row in bank_rows(questions, seed):
+        ws.append(row)
+    # Write then rename, so a half-written file is never picked up as a bank
+    tmp = f"{path}.tmp"
+    wb.save(tmp)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,56 @@
+# migrate_packed_details.py
+"""
+Converts UserResult.details from the old per-question JSON form to the
+packed form written by submit_test (see app/packed_answers.py).
+
+Section rows are backfilled first, because the packed form no longer carries
+sections. Rows already packed are skipped, so the script is safe to re-run.
+
+Usage: python migrate_packed_details.py [batch_size]
+"""
+import json
+import sys
+import time
+from app.database import SessionLocal
+from app import models
+from app.packed_answers import is_packed, pack_legacy
+from app.section_results import backfill
+
+batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+db = SessionLocal()
+try:
+    start = time.perf_counter()
+    print(f"✅ Backfilled section rows for {backfill(db, batch_size)} results")
+
+    last_id, migrated, before, after = 0, 0, 0, 0
+    while True:
+        rows = (
+            db.query(models.UserResult.id, models.UserResult.details)
+            .filter(models.UserResult.id > last_id)
+            .order_by(models.UserResult.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        for result_id, details in rows:
+            parsed = json.loads(details) if isinstance(details, str) else details
+            if parsed is None or is_packed(parsed):
+                continue
+            packed = pack_legacy(parsed)
+            db.query(models.UserResult).filter(models.UserResult.id == result_id).update(
+                {models.UserResult.details: packed}, synchronize_session=False
+            )
+            before += len(details) if isinstance(details, str) else len(json.dumps(details))
+            after += len(json.dumps(packed))
+            migrated += 1
+        db.commit()
+        last_id = rows[-1].id
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Packed details for {migrated} results in {elapsed:.1f} s ({before} -> {after} bytes of JSON)")
+except Exception as e:
+    db.rollback()
+    print(f"❌ Migration failed: {e}")
+finally:
+    db.close()
@@ -0,0 +1,134 @@
+"""baseline schema
+
+The schema as create_all used to build it at startup. Databases created that
+way already have these tables, so each table is only created if missing;
+`alembic upgrade head` then works on both fresh and existing databases.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *columns, unique_indexes=(), indexes=()):
+    if name in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(name, *columns)
+    op.create_index(f"ix_{name}_id", name, ["id"])
+    for column in unique_indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column], unique=True)
+    for column in indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column])
+
+
+def upgrade():
+    _create_table(
+        "auth_users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(50), nullable=False),
+        sa.Column("email", sa.String(100), nullable=False),
+        sa.Column("password", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        unique_indexes=("username", "email"),
+    )
+    _create_table(
+        "user_profiles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("auth_users.id"), nullable=False),
+        sa.Column("full_name", sa.String(100)),
+        sa.Column("dob", sa.Date()),
+        sa.Column("gender", sa.String(10)),
+    )
+    _create_table(
+        "sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("auth_users.id", ondelete="CASCADE")),
+        sa.Column("token", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("expires_at", sa.DateTime()),
+        sa.Column("active", sa.Boolean()),
+        unique_indexes=("token",),
+    )
+    _create_table(
+        "mock_test_files",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("exam_type", sa.String(100)),
+        sa.Column("test_type", sa.String(20)),
+        sa.Column("subject", sa.String(100)),
+        sa.Column("file_path", sa.String(1024), nullable=False),
+        sa.Column("total_questions", sa.Integer()),
+        sa.Column("duration_minutes", sa.Integer()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    _create_table(
+        "user_results",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("auth_users.id"), nullable=False),
+        sa.Column("mocktest_id", sa.Integer(), sa.ForeignKey("mock_test_files.id"), nullable=False),
+        sa.Column("score", sa.Integer()),
+        sa.Column("total_questions", sa.Integer()),
+        sa.Column("percentage", sa.String(20)),
+        sa.Column("status", sa.String(50)),
+        sa.Column("time_taken_seconds", sa.Integer()),
+        sa.Column("details", sa.JSON()),
+        sa.Column("submitted_at", sa.DateTime()),
+    )
+    _create_table(
+        "user_section_results",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_result_id", sa.Integer(), sa.ForeignKey("user_results.id"), nullable=False),
+        sa.Column("section_name", sa.String(200)),
+        sa.Column("correct", sa.Integer()),
+        sa.Column("wrong", sa.Integer()),
+        sa.Column("unanswered", sa.Integer()),
+        sa.Column("marks_obtained", sa.Integer()),
+    )
+    _create_table(
+        "attempt_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("auth_users.id")),
+        sa.Column("mocktest_id", sa.Integer(), sa.ForeignKey("mock_test_files.id")),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime()),
+        sa.Column("status", sa.String()),
+        sa.Column("answers_snapshot", sa.JSON()),
+        sa.Column("time_spent_seconds", sa.Integer()),
+    )
+    _create_table(
+        "exam_cache",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("auth_users.id"), nullable=False),
+        sa.Column("mocktest_id", sa.Integer(), sa.ForeignKey("mock_test_files.id"), nullable=False),
+        sa.Column("current_question", sa.Integer()),
+        sa.Column("answers_json", sa.JSON()),
+        sa.Column("time_left", sa.Integer()),
+        sa.Column("last_saved_at", sa.DateTime()),
+    )
+    _create_table(
+        "email_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("auth_users.id")),
+        sa.Column("mocktest_id", sa.Integer(), sa.ForeignKey("mock_test_files.id")),
+        sa.Column("email", sa.String(255)),
+        sa.Column("subject", sa.String(255)),
+        sa.Column("status", sa.String(50)),
+        sa.Column("created_at", sa.DateTime()),
+    )
+
+
+def downgrade():
+    for name in (
+        "email_logs", "exam_cache", "attempt_logs", "user_section_results", "user_results",
+        "mock_test_files", "sessions", "user_profiles", "auth_users",
+    ):
+        op.drop_table(name)
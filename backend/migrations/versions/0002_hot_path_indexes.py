@@ -0,0 +1,61 @@
+"""hot-path indexes; fractional scores and section marks
+
+Indexes for the queries that run on every exam request (see
+check_query_plans.py). On PostgreSQL they are built CONCURRENTLY so a live
+user_results table is not locked for writes. Index creation is idempotent
+because some databases got a few of these from create_all before migrations
+existed. Negative marking gives fractional totals, so user_results.score
+and user_section_results.marks_obtained become floats.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # get_current_user outer-joins the profile by user_id
+    ("ix_user_profiles_user_id", "user_profiles", ["user_id"], {}),
+    # rank index catch-up: mocktest_id = ? AND id > watermark ORDER BY id
+    ("ix_user_results_mocktest_id_id", "user_results", ["mocktest_id", "id"], {}),
+    # /result/{test_id}: latest result of one user for one test
+    ("ix_user_results_user_mocktest_id", "user_results", ["user_id", "mocktest_id", sa.text("id DESC")], {}),
+    # /results/summary keyset pages
+    (
+        "ix_user_results_user_submitted",
+        "user_results",
+        ["user_id", sa.text("submitted_at DESC"), sa.text("id DESC")],
+        {"postgresql_include": ["mocktest_id", "score", "total_questions", "percentage", "status"]},
+    ),
+    ("ix_user_section_results_user_result_id", "user_section_results", ["user_result_id"], {}),
+    ("ix_exam_cache_user_mocktest", "exam_cache", ["user_id", "mocktest_id"], {}),
+]
+
+
+def upgrade():
+    with op.batch_alter_table("user_results") as batch:
+        batch.alter_column("score", existing_type=sa.Integer(), type_=sa.Float())
+    with op.batch_alter_table("user_section_results") as batch:
+        batch.alter_column("marks_obtained", existing_type=sa.Integer(), type_=sa.Float())
+
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, columns, kw in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=postgresql, **kw)
+        # Superseded by ix_user_results_mocktest_id_id
+        op.drop_index("ix_user_results_mocktest_id", table_name="user_results", if_exists=True)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    with op.batch_alter_table("user_section_results") as batch:
+        batch.alter_column("marks_obtained", existing_type=sa.Float(), type_=sa.Integer())
+    with op.batch_alter_table("user_results") as batch:
+        batch.alter_column("score", existing_type=sa.Float(), type_=sa.Integer())
@@ -0,0 +1,28 @@
+"""ttl_entries: shared short-lived entries (OTPs, reset grants)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ttl_entries",
+        sa.Column("key", sa.String(255), primary_key=True),
+        sa.Column("value", sa.Text(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_ttl_entries_expires_at", "ttl_entries", ["expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_ttl_entries_expires_at", table_name="ttl_entries")
+    op.drop_table("ttl_entries")
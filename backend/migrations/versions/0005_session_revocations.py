@@ -0,0 +1,29 @@
+"""session_revocations: logged-out signed session tokens
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "session_revocations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("token_id", sa.String(32), nullable=False, unique=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_session_revocations_expires_at", "session_revocations", ["expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_session_revocations_expires_at", table_name="session_revocations")
+    op.drop_table("session_revocations")
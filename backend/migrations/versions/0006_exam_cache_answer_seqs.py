@@ -0,0 +1,45 @@
+"""exam_cache: per-answer sync sequences; one row per (user, test)
+
+Autosave flushes from different workers merge into the same row by sequence
+number instead of overwriting it, so the row keeps the sequences and must be
+unique per attempt. Duplicate rows, which concurrent first flushes could
+create, are reduced to the most recently saved one first.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("exam_cache", sa.Column("answer_seqs", sa.JSON()))
+    op.add_column("exam_cache", sa.Column("seq", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        """
+        DELETE FROM exam_cache WHERE EXISTS (
+            SELECT 1 FROM exam_cache newer
+            WHERE newer.user_id = exam_cache.user_id
+              AND newer.mocktest_id = exam_cache.mocktest_id
+              AND (COALESCE(newer.last_saved_at, '1970-01-01') > COALESCE(exam_cache.last_saved_at, '1970-01-01')
+                   OR (COALESCE(newer.last_saved_at, '1970-01-01') = COALESCE(exam_cache.last_saved_at, '1970-01-01')
+                       AND newer.id > exam_cache.id))
+        )
+        """
+    )
+    op.drop_index("ix_exam_cache_user_mocktest", table_name="exam_cache")
+    op.create_index("ix_exam_cache_user_mocktest", "exam_cache", ["user_id", "mocktest_id"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_exam_cache_user_mocktest", table_name="exam_cache")
+    op.create_index("ix_exam_cache_user_mocktest", "exam_cache", ["user_id", "mocktest_id"])
+    with op.batch_alter_table("exam_cache") as batch:
+        batch.drop_column("seq")
+        batch.drop_column("answer_seqs")
@@ -0,0 +1,22 @@
+"""exam_cache: attempt number, moved on at submit instead of deleting the row
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("exam_cache", sa.Column("attempt", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    with op.batch_alter_table("exam_cache") as batch:
+        batch.drop_column("attempt")
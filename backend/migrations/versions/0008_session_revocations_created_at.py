@@ -0,0 +1,20 @@
+"""session_revocations: index created_at for the late-commit look-back
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_session_revocations_created_at", "session_revocations", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_session_revocations_created_at", table_name="session_revocations")
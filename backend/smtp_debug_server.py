@@ -0,0 +1,143 @@
+# smtp_debug_server.py
+"""
+A local SMTP stand-in for development and tests: accepts mail on
+127.0.0.1 and prints (or, in-process, collects) every message instead of
+delivering it. It speaks plain SMTP only, so point the backend at it with
+STARTTLS off and no credentials:
+
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_STARTTLS=false SMTP_FROM=noreply@localhost \
+        uvicorn app.main:app
+
+In-process use, e.g. from a test:
+
+    server = DebugSMTPServer(port=0).start()   # port 0 picks a free port
+    ...
+    server.messages   # [(mail_from, [rcpt_to, ...], raw message), ...]
+    server.stop()
+
+`reject` makes the server refuse some recipients with a 550, and
+`temp_failures` answers the next N messages with a 451, for exercising the
+outbox's permanent-failure and retry paths.
+
+Usage: python smtp_debug_server.py [port]
+"""
+import socketserver
+import sys
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("utf-8"))
+
+    def handle(self):
+        server = self.server.debug_server
+        self.reply("220 smtp-debug ready")
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, arg = line.decode("utf-8", "replace").strip().partition(" ")
+            command = command.upper()
+            if command == "EHLO":
+                self.reply("250-smtp-debug")
+                self.reply("250 8BITMIME")
+            elif command == "HELO":
+                self.reply("250 smtp-debug")
+            elif command == "MAIL":
+                mail_from, rcpt_to = arg.split(":", 1)[-1].strip().strip("<>"), []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                rcpt = arg.split(":", 1)[-1].strip().strip("<>")
+                if rcpt in server.reject:
+                    self.reply("550 No such user")
+                else:
+                    rcpt_to.append(rcpt)
+                    self.reply("250 OK")
+            elif command == "DATA":
+                if not rcpt_to:
+                    self.reply("503 Need RCPT")
+                    continue
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                server.deliver(mail_from, rcpt_to, b"".join(lines).decode("utf-8", "replace"), self.reply)
+                mail_from, rcpt_to = None, []
+            elif command == "RSET":
+                mail_from, rcpt_to = None, []
+                self.reply("250 OK")
+            elif command == "NOOP":
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class DebugSMTPServer:
+    def __init__(self, host="127.0.0.1", port=1025, echo=False):
+        self.messages = []
+        self.connections = 0
+        self.reject = set()
+        self.temp_failures = 0
+        self.echo = echo
+        self._lock = threading.Lock()
+        self._server = _ThreadingServer((host, port), _SMTPHandler)
+        self._server.debug_server = self
+        self._thread = None
+        self._count_connections()
+
+    def _count_connections(self):
+        verify = self._server.verify_request
+
+        def counting(request, client_address):
+            with self._lock:
+                self.connections += 1
+            return verify(request, client_address)
+
+        self._server.verify_request = counting
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def deliver(self, mail_from, rcpt_to, message, reply):
+        with self._lock:
+            if self.temp_failures > 0:
+                self.temp_failures -= 1
+                reply("451 Try again later")
+                return
+            self.messages.append((mail_from, rcpt_to, message))
+        reply("250 OK: queued")
+        if self.echo:
+            print(f"📨 {mail_from} -> {', '.join(rcpt_to)}\n{message}\n{'-' * 60}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-debug", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 1025
+    server = DebugSMTPServer(port=port, echo=True)
+    print(f"✅ SMTP debug server listening on 127.0.0.1:{server.port}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -6,5 +6,8 @@ if [ -n "$PID" ]; then
   kill -9 $PID
 fi
 
+# Apply schema migrations once, before any worker starts
+alembic upgrade head || exit 1
+
 # Start backend
 uvicorn app.main:app --reload --host 127.0.0.1 --port 8000
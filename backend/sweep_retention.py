@@ -0,0 +1,18 @@
+# sweep_retention.py
+"""
+Runs one retention sweep (see app/retention.py): deletes expired sessions,
+abandoned attempt_logs, stale exam_cache rows and finished email_outbox rows
+in small batches, using the same *_RETENTION_* settings as the API workers.
+For cron, when the workers run with RETENTION_SWEEPER_ENABLED=false.
+
+Usage: python sweep_retention.py
+"""
+from app.retention import retention_sweeper
+
+report = retention_sweeper.run_once()
+for table, result in report.items():
+    print(
+        f"🧹 {table}: {result['deleted']} rows deleted in {result['batches']} batches, "
+        f"{result['seconds'] * 1000:.0f} ms"
+    )
+print(f"✅ Retention sweep finished ({sum(r['deleted'] for r in report.values())} rows)")
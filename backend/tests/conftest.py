@@ -0,0 +1,113 @@
+# tests/conftest.py
+"""
+Shared fixtures. The suite runs against a throwaway SQLite database migrated
+to head with the Alembic migrations, cheap bcrypt, and background threads
+that stay idle for the length of a test (autosave flushes, email sending and
+retention sweeps are driven by the tests themselves).
+
+Usage: cd backend && python -m pytest -q
+"""
+import os
+import shutil
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{TEST_DIR}/test.db",
+    "ARTIFACT_DIR": os.path.join(TEST_DIR, "artifacts"),
+    "QUESTION_BANK_BUNDLE_DIR": os.path.join(TEST_DIR, "bundles"),
+    "BCRYPT_ROUNDS": "4",
+    "AUTOSAVE_FLUSH_SECONDS": "3600",
+    "EMAIL_SENDER_ENABLED": "false",
+    "RETENTION_SWEEPER_ENABLED": "false",
+    "REPORT_RENDER_ON_SUBMIT": "false",
+})
+os.chdir(BACKEND_DIR)  # the app mounts app/static relative to the working directory
+
+import pytest  # noqa: E402
+
+from app.schema import upgrade_schema  # noqa: E402
+
+SAMPLE_BANK = "app/excel_files/sbi_po_prelims_test_1_full.xlsx"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    upgrade_schema(configure_logger=False)
+    yield
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Every test starts from empty tables and empty per-worker caches."""
+    yield
+    from app.autosave import autosave_buffer
+    from app.database import Base, engine
+    from app.rank_index import rank_indexes
+    from app.session_cache import session_cache
+    from app.session_tokens import revocations
+
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    autosave_buffer._entries.clear()
+    rank_indexes._indexes.clear()
+    session_cache._entries.clear()
+    revocations._revoked.clear()
+    revocations._last_id = 0
+
+
+@pytest.fixture
+def db():
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def mocktest(db):
+    from app import models
+
+    test = models.MockTestFile(
+        name="Sample full test", exam_type="SBI PO", test_type="full", file_path=SAMPLE_BANK, duration_minutes=60
+    )
+    db.add(test)
+    db.commit()
+    return test
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+def _sign_in(client, name):
+    email = f"{name}@example.com"
+    user = client.post("/auth/signup", json={"username": name, "email": email, "password": "secret"})
+    assert user.status_code == 201, user.text
+    login = client.post("/auth/login", json={"email": email, "password": "secret"})
+    assert login.status_code == 200, login.text
+    return user.json()["id"]
+
+
+@pytest.fixture
+def sign_in():
+    """sign_in(client, name): signs a new user up and in on `client`; returns the user id."""
+    return _sign_in
+
+
+@pytest.fixture
+def user_client(client):
+    client.user_id = _sign_in(client, "student")
+    return client
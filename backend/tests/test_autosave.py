@@ -0,0 +1,102 @@
+import pytest
+
+from app.autosave import AutosaveBuffer, autosave_buffer
+
+
+def resume(client, test_id):
+    response = client.get(f"/mocktests/{test_id}/resume", params={"delivery": "manifest"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_full_save_clears_answers_it_leaves_out(user_client, mocktest):
+    url = f"/mocktests/{mocktest.id}/save"
+    assert user_client.post(url, json={"answers": {"1": "A", "2": "B"}, "time_left": 100, "current_question": 1}).status_code == 200
+    autosave_buffer.flush()
+    assert user_client.post(url, json={"answers": {"1": "A"}, "time_left": 90, "current_question": 1}).status_code == 200
+
+    assert resume(user_client, mocktest.id)["answers_snapshot"] == {"1": "A"}
+    autosave_buffer.flush()
+    autosave_buffer._entries.clear()  # a worker that only has the flushed row
+    assert resume(user_client, mocktest.id)["answers_snapshot"] == {"1": "A"}
+
+
+def test_full_save_keeps_answers_saved_after_it(db, mocktest):
+    a, b = AutosaveBuffer(3600, 500), AutosaveBuffer(3600, 500)
+    a.save(7, mocktest.id, {"1": "A"}, 100, 1)
+    b.save(7, mocktest.id, {"1": "A", "2": "B"}, 90, 2)
+    b.flush()
+    # A's save is older than the stored one, so it does not clear question 2
+    a.flush()
+    assert AutosaveBuffer(3600, 500).merged_state(db, 7, mocktest.id)["answers"] == {"1": "A", "2": "B"}
+
+
+def test_writes_to_a_submitted_attempt_are_refused(user_client, mocktest):
+    attempt = resume(user_client, mocktest.id)
+    assert attempt["sync_attempt"] == 0
+    save = {"answers": {"1": "A"}, "time_left": 100, "current_question": 1, "attempt": 0}
+    assert user_client.post(f"/mocktests/{mocktest.id}/save", json=save).status_code == 200
+    submitted = user_client.post(f"/mocktests/{mocktest.id}/submit/{attempt['attempt_id']}", json={"answers": {"1": "A"}})
+    assert submitted.status_code == 200
+
+    # A tab still open on the submitted attempt
+    assert user_client.post(f"/mocktests/{mocktest.id}/save", json=save).status_code == 409
+    delta = {"seq": 1, "changes": {"2": "B"}, "attempt": 0}
+    assert user_client.post(f"/mocktests/{mocktest.id}/sync", json=delta).status_code == 409
+
+    retake = resume(user_client, mocktest.id)
+    assert retake["sync_attempt"] == 1
+    assert retake["answers_snapshot"] == {}
+    assert user_client.post(f"/mocktests/{mocktest.id}/save", json=save | {"attempt": 1}).status_code == 200
+
+
+def test_entry_left_on_another_worker_does_not_bring_back_submitted_answers(db, mocktest):
+    other = AutosaveBuffer(3600, 500)
+    other.save(7, mocktest.id, {"1": "A"}, 100, 1, attempt=0)
+    autosave_buffer.discard(db, 7, mocktest.id)
+    db.commit()
+
+    other.flush()
+    assert not other.has(7, mocktest.id)
+    state = AutosaveBuffer(3600, 500).merged_state(db, 7, mocktest.id)
+    assert state["answers"] == {}
+    assert state["attempt"] == 1
+
+
+
+def test_deltas_apply_in_sequence_order_whatever_order_they_arrive(mocktest):
+    buffer = AutosaveBuffer(3600, 500)
+    buffer.apply_delta(7, mocktest.id, 2, {"1": "B"}, time_left=80, current_question=2)
+    state, stale = buffer.apply_delta(7, mocktest.id, 1, {"1": "A", "2": "C"}, time_left=90, current_question=1)
+    assert stale == ["1"]
+    assert state["answers"] == {"1": "B", "2": "C"}
+    assert (state["seq"], state["time_left"], state["current_question"]) == (2, 80, 2)
+
+    # Delivered twice
+    state, stale = buffer.apply_delta(7, mocktest.id, 2, {"1": "B"})
+    assert stale == ["1"]
+
+    state, stale = buffer.apply_delta(7, mocktest.id, 3, {"2": None})
+    assert stale == []
+    assert state["answers"] == {"1": "B"}
+
+
+@pytest.mark.parametrize("first", ["newer", "older"])
+def test_deltas_on_different_workers_merge_by_sequence(db, mocktest, first):
+    newer, older = AutosaveBuffer(3600, 500), AutosaveBuffer(3600, 500)
+    newer.apply_delta(7, mocktest.id, 2, {"1": "B"})
+    older.apply_delta(7, mocktest.id, 1, {"1": "A", "2": "C"})
+    for buffer in (newer, older) if first == "newer" else (older, newer):
+        buffer.flush()
+
+    state = AutosaveBuffer(3600, 500).merged_state(db, 7, mocktest.id)
+    assert state["answers"] == {"1": "B", "2": "C"}
+    assert state["seq"] == 2
+
+
+def test_sync_endpoint_reports_stale_answers(user_client, mocktest):
+    url = f"/mocktests/{mocktest.id}/sync"
+    assert user_client.post(url, json={"seq": 2, "changes": {"1": "B"}}).json()["stale"] == []
+    response = user_client.post(url, json={"seq": 1, "changes": {"1": "A", "2": "C"}}).json()
+    assert (response["seq"], response["stale"]) == (2, ["1"])
+    assert resume(user_client, mocktest.id)["answers_snapshot"] == {"1": "B", "2": "C"}
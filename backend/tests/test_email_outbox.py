@@ -0,0 +1,85 @@
+import smtplib
+from datetime import datetime, timedelta
+
+from app import email_outbox
+from app.email_outbox import EmailSender, enqueue_email, retry_delay
+from app.models import EmailLog, EmailOutbox
+
+
+class FakeRelay:
+    """Stands in for SMTPPool; `replies` maps a recipient to the exception its send raises."""
+
+    def __init__(self, replies=None):
+        self.replies = replies or {}
+        self.delivered = []
+        self.released = []
+
+    def acquire(self):
+        return self
+
+    def release(self, conn, healthy=True):
+        self.released.append(healthy)
+
+    def sendmail(self, sender, recipients, message):
+        error = self.replies.get(recipients[0])
+        if error is not None:
+            raise error
+        self.delivered.append(recipients[0])
+
+
+def queue(db, *recipients):
+    emails = [enqueue_email(db, to, "Password Reset OTP", "Your OTP is 123456") for to in recipients]
+    db.commit()
+    return [email.id for email in emails]
+
+
+def test_a_claimed_batch_is_leased_to_one_sender(db):
+    queue(db, "a@example.com", "b@example.com")
+    first, second = EmailSender(5, 50, FakeRelay()), EmailSender(5, 50, FakeRelay())
+    assert len(first._claim(db)) == 2
+    assert second._claim(db) == []
+
+    # The first sender died mid-batch; once the lease runs out the rows are claimable again
+    db.query(EmailOutbox).update({"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert len(second._claim(db)) == 2
+
+
+def test_transient_failures_back_off_and_permanent_ones_fail_at_once(db):
+    temporary, permanent, ok = queue(db, "busy@example.com", "gone@example.com", "ok@example.com")
+    relay = FakeRelay({
+        "busy@example.com": smtplib.SMTPResponseException(451, b"try again later"),
+        "gone@example.com": smtplib.SMTPResponseException(550, b"no such user"),
+    })
+    before = datetime.utcnow()
+    assert EmailSender(5, 50, relay).send_due() == (1, 1, 1)
+    assert relay.delivered == ["ok@example.com"]
+    assert relay.released == [True]
+
+    db.expire_all()
+    busy = db.get(EmailOutbox, temporary)
+    assert (busy.status, busy.attempts, busy.claimed_by) == ("pending", 1, None)
+    wait = (busy.next_attempt_at - before).total_seconds()
+    assert 0.8 * email_outbox.EMAIL_RETRY_BASE_SECONDS <= wait <= 1.2 * email_outbox.EMAIL_RETRY_BASE_SECONDS + 5
+    assert db.get(EmailOutbox, permanent).status == "failed"
+    assert db.get(EmailOutbox, ok).status == "sent"
+    assert sorted(log.status for log in db.query(EmailLog)) == ["FAILED", "SENT"]
+
+    # Not due again until the backoff has passed
+    assert EmailSender(5, 50, relay).send_due() == (0, 0, 0)
+
+
+def test_an_email_fails_after_its_last_attempt(db):
+    (email_id,) = queue(db, "busy@example.com")
+    db.query(EmailOutbox).update({"attempts": email_outbox.EMAIL_MAX_ATTEMPTS - 1})
+    db.commit()
+    relay = FakeRelay({"busy@example.com": smtplib.SMTPResponseException(451, b"try again later")})
+    assert EmailSender(5, 50, relay).send_due() == (0, 0, 1)
+    db.expire_all()
+    assert db.get(EmailOutbox, email_id).status == "failed"
+
+
+def test_retry_delay_doubles_up_to_the_cap():
+    for attempts in range(1, 12):
+        base = min(email_outbox.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), email_outbox.EMAIL_RETRY_MAX_SECONDS)
+        assert 0.8 * base <= retry_delay(attempts) <= 1.2 * base
@@ -0,0 +1,10 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from app.database import Base, engine
+
+
+def test_migrations_build_the_schema_the_models_describe():
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"compare_type": True})
+        assert compare_metadata(context, Base.metadata) == []
@@ -0,0 +1,18 @@
+import pytest
+from sqlalchemy import select
+
+from app import models
+from check_query_plans import HOT_QUERIES, plan_connection, plan_problems
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_is_served_by_an_index(name):
+    with plan_connection() as conn:
+        assert plan_problems(conn, HOT_QUERIES[name]) == []
+
+
+def test_check_flags_a_query_that_sorts_results_by_score():
+    # (mocktest_id, score) was replaced by (mocktest_id, id); nothing may sort by score now
+    query = select(models.UserResult.id).where(models.UserResult.mocktest_id == 1).order_by(models.UserResult.score)
+    with plan_connection() as conn:
+        assert plan_problems(conn, query)
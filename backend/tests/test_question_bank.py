@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.bank_bundle import MappedQuestionBank, bundle_path, write_bundle
+from app.question_bank import QuestionBank, QuestionBankCache, file_version
+
+SAMPLE_BANK = "app/excel_files/sbi_po_prelims_test_1_full.xlsx"
+
+
+@pytest.fixture(scope="module")
+def parsed_bank():
+    return QuestionBank.from_excel(1, SAMPLE_BANK, file_version(SAMPLE_BANK))
+
+
+def compiled_test(parsed_bank, test_id):
+    write_bundle(parsed_bank, bundle_path(test_id))
+    return SimpleNamespace(id=test_id, file_path=SAMPLE_BANK)
+
+
+def test_mapped_banks_count_against_the_cache_and_are_evicted(parsed_bank):
+    first, second = compiled_test(parsed_bank, 101), compiled_test(parsed_bank, 102)
+    cache = QuestionBankCache(max_bytes=1)
+    bank = cache.get(first)
+    assert isinstance(bank, MappedQuestionBank)
+    assert bank.nbytes > 0
+    assert cache.stats()["bytes"] == bank.nbytes
+
+    cache.get(second)
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_derived_objects_count_against_the_budget(monkeypatch):
+    from app import delivery, question_bank
+    from app.scoring import get_scoring_engine
+
+    cache = QuestionBankCache(max_bytes=1 << 30)
+    monkeypatch.setattr(question_bank, "question_bank_cache", cache)
+    monkeypatch.setattr(delivery, "question_bank_cache", cache)
+    monkeypatch.setattr(delivery, "PAGE_PAYLOAD_CACHE_SIZE", 1)
+    bank = cache.get(SimpleNamespace(id=201, file_path=SAMPLE_BANK))
+    size = bank.nbytes
+    assert cache.stats()["bytes"] == size
+
+    engine = get_scoring_engine(bank)
+    size += engine.nbytes
+    assert cache.stats()["bytes"] == size
+
+    served = delivery.get_delivery(bank)
+    size += served.nbytes
+    assert cache.stats()["bytes"] == size
+
+    size += served.test_payload().nbytes
+    first_page = served.page_payload(1)
+    size += first_page.nbytes
+    assert cache.stats()["bytes"] == size
+
+    # Only one page is kept, so the first is credited back when the second is built
+    size += served.page_payload(2).nbytes - first_page.nbytes
+    assert cache.stats()["bytes"] == size == bank.nbytes + bank.derived_nbytes
+
+    cache.invalidate()
+    assert cache.stats()["bytes"] == 0
+
+
+def test_failed_parse_releases_its_build_lock(tmp_path):
+    cache = QuestionBankCache(max_bytes=1 << 30)
+    broken = tmp_path / "broken.xlsx"
+    broken.write_bytes(b"not a workbook")
+    with pytest.raises(Exception):
+        cache.get(SimpleNamespace(id=301, file_path=str(broken)))
+    assert cache._build_locks == {}
@@ -0,0 +1,60 @@
+import pytest
+
+from app import models, rank_index
+from app.rank_index import RankIndex
+
+
+@pytest.fixture
+def student(db):
+    user = models.User(username="ranked", email="ranked@example.com", password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def add_result(db, result_id, user, mocktest, score, marks):
+    db.add(models.UserResult(id=result_id, user_id=user.id, mocktest_id=mocktest.id, score=score))
+    db.add(models.UserSectionResult(user_result_id=result_id, section_name="English", marks_obtained=marks))
+    db.commit()
+
+
+def test_catch_up_indexes_a_lower_id_committed_after_a_higher_one(db, student, mocktest, monkeypatch):
+    monkeypatch.setattr(rank_index, "RANK_RESCAN_SECONDS", 0)
+    index = RankIndex(mocktest.id)
+    add_result(db, 5, student, mocktest, 40.5, 10.25)
+    index.catch_up(db)
+    assert index.overall.count == 1
+
+    # Id 3 was handed out first but committed after the catch-up above
+    add_result(db, 3, student, mocktest, 70, 20)
+    index.catch_up(db)
+    assert index.overall.count == 2
+    assert index.overall.max_score == 70
+    assert index.standing(40.5, {"English": 10.25})["rank"] == 2
+    assert index.sections["English"].count == 2
+
+    # Not settled yet, so the watermark stays below both and neither is indexed twice
+    assert index.watermark == 0
+    index.catch_up(db)
+    assert index.overall.count == 2
+
+
+def test_results_recorded_locally_are_not_indexed_again(db, student, mocktest):
+    index = RankIndex(mocktest.id)
+    add_result(db, 1, student, mocktest, 12.75, 12.75)
+    index.add_local(1, 12.75, {"English": 12.75})
+    index.catch_up(db)
+    assert index.overall.count == 1
+    assert index.sections["English"].count == 1
+
+
+def test_watermark_moves_past_settled_ids(db, student, mocktest, monkeypatch):
+    monkeypatch.setattr(rank_index, "RANK_RESCAN_SECONDS", 0)
+    monkeypatch.setattr(rank_index, "RANK_SETTLE_SECONDS", 0)
+    index = RankIndex(mocktest.id)
+    add_result(db, 1, student, mocktest, 1, 1)
+    add_result(db, 2, student, mocktest, 2, 2)
+    index.catch_up(db)
+    index.catch_up(db)
+    assert index.watermark == 2
+    assert index.overall.count == 2
@@ -0,0 +1,28 @@
+import os
+from concurrent.futures import Future
+
+from app.reports import ReportJobs, _error_path
+
+
+def test_a_job_cancelled_at_shutdown_is_dropped_without_an_error():
+    jobs = ReportJobs(1)
+    future = Future()
+    jobs._jobs["cancelled-key"] = future
+    assert future.cancel()
+
+    jobs._finished("cancelled-key", future, None)  # must not raise CancelledError
+    assert jobs.job("cancelled-key") is None
+    assert jobs.status("cancelled-key") == "missing"
+    assert not os.path.exists(_error_path("cancelled-key"))
+
+
+def test_a_failed_job_records_its_error():
+    jobs = ReportJobs(1)
+    future = Future()
+    jobs._jobs["failed-key"] = future
+    future.add_done_callback(lambda f: jobs._finished("failed-key", f, None))
+
+    future.set_exception(RuntimeError("renderer crashed"))
+    assert jobs.status("failed-key") == "failed"
+    with open(_error_path("failed-key")) as f:
+        assert f.read() == "renderer crashed"
@@ -0,0 +1,61 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.packed_answers import pack_details
+from app.routers.mocktests_router import build_preview_body
+
+
+def submit(client, test_id, answers):
+    attempt = client.get(f"/mocktests/{test_id}/resume", params={"delivery": "manifest"}).json()
+    response = client.post(f"/mocktests/{test_id}/submit/{attempt['attempt_id']}", json={"answers": answers})
+    assert response.status_code == 200, response.text
+    return response.json()["result_id"]
+
+
+def test_preview_etag_matches_the_ranking_it_was_sent_with(user_client, sign_in, mocktest):
+    result_id = submit(user_client, mocktest.id, {"1": "A"})
+    url = f"/mocktests/result/{result_id}/preview"
+    first = user_client.get(url)
+    assert first.status_code == 200
+    assert first.json()["analytics"]["total_users"] == 1
+    assert user_client.get(url, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+    sign_in(user_client, "rival")
+    submit(user_client, mocktest.id, {"1": "B"})
+    second = user_client.get(url, headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.json()["analytics"]["total_users"] == 2
+    assert second.headers["etag"] != first.headers["etag"]
+    assert user_client.get(url, headers={"If-None-Match": second.headers["etag"]}).status_code == 304
+
+
+def graded_result(bank_version):
+    # Question 1 answered A against a key of A; question 2 answered A against B
+    details = pack_details(bank_version, ["1", "2"], [1, 1], [1, 2])
+    return SimpleNamespace(
+        id=1, mocktest_id=1, score=0.75, total_questions=2, percentage="37.5",
+        submitted_at=datetime(2026, 1, 1), details=details,
+    )
+
+
+def edited_bank(version):
+    # The key for question 1 has since been changed to C
+    questions = {
+        "1": {"question": "One?", "options": ["a", "b", "c"], "correct": "C", "section": "English"},
+        "2": {"question": "Two?", "options": ["a", "b", "c"], "correct": "B", "section": "English"},
+    }
+    return SimpleNamespace(version=version, by_id=questions)
+
+
+def test_preview_shows_the_key_the_result_was_graded_against():
+    body = build_preview_body(graded_result("v1"), edited_bank("v1"), sections={})
+    assert [q["correct"] for q in body["questions"]] == ["A", "B"]
+    assert [q["question_text"] for q in body["questions"]] == ["One?", "Two?"]
+    assert body["bank_changed"] is False
+
+
+def test_preview_does_not_merge_questions_from_a_changed_bank():
+    body = build_preview_body(graded_result("v1"), edited_bank("v2"), sections={})
+    assert body["bank_changed"] is True
+    assert [q["correct"] for q in body["questions"]] == ["A", "B"]
+    assert [q["question_text"] for q in body["questions"]] == ["", ""]
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from app.database import AsyncSessionLocal, async_engine
+from app.models import Session as DBSession, SessionRevocation
+from app.session_tokens import RevocationSet, TokenClaims, database_token_id, revocations
+
+
+def claims(token_id):
+    now = int(time.time())
+    return TokenClaims(1, now, now + 3600, token_id)
+
+
+def add_revocation(db, row_id, token_id, created_at=None):
+    db.add(SessionRevocation(
+        id=row_id,
+        token_id=token_id,
+        expires_at=datetime.utcnow() + timedelta(hours=1),
+        created_at=created_at or datetime.utcnow(),
+    ))
+    db.commit()
+
+
+def test_sync_picks_up_a_revocation_committed_out_of_order(db):
+    revocations = RevocationSet(5)
+    add_revocation(db, 5, "later")
+    revocations.sync()
+    assert revocations.is_revoked(claims("later"))
+
+    # Id 3 was handed out first but its transaction committed after the sync above
+    add_revocation(db, 3, "earlier")
+    revocations.sync()
+    assert revocations.is_revoked(claims("earlier"))
+
+
+def test_full_sync_reloads_old_revocations_and_drops_expired_rows(db):
+    add_revocation(db, 1, "old", created_at=datetime.utcnow() - timedelta(days=1))
+    db.add(SessionRevocation(
+        id=2, token_id="expired", expires_at=datetime.utcnow() - timedelta(minutes=1), created_at=datetime.utcnow(),
+    ))
+    db.commit()
+    revocations = RevocationSet(5)
+    revocations.sync(full=True)
+    assert revocations.is_revoked(claims("old"))
+    assert not revocations.is_revoked(claims("expired"))
+    assert db.query(SessionRevocation).filter_by(token_id="expired").count() == 0
+
+
+
+async def revoke_on(worker, token_claims):
+    async with AsyncSessionLocal() as db:
+        await worker.revoke(db, token_claims)
+    await async_engine.dispose()  # pooled connections belong to this event loop
+
+
+def test_a_revocation_applies_at_once_here_and_after_a_sync_elsewhere(db):
+    here, elsewhere = RevocationSet(5), RevocationSet(5)
+    asyncio.run(revoke_on(here, claims("logged-out")))
+    assert here.is_revoked(claims("logged-out"))
+    assert not elsewhere.is_revoked(claims("logged-out"))
+
+    elsewhere.sync()
+    assert elsewhere.is_revoked(claims("logged-out"))
+    assert not elsewhere.is_revoked(claims("still-signed-in"))
+
+
+def test_the_same_token_revoked_on_two_workers_is_stored_once(db):
+    first, second = RevocationSet(5), RevocationSet(5)
+    asyncio.run(revoke_on(first, claims("twice")))
+    asyncio.run(revoke_on(second, claims("twice")))  # the unique token id makes this a no-op
+    assert second.is_revoked(claims("twice"))
+    assert db.query(SessionRevocation).count() == 1
+
+
+def test_logout_on_another_worker_reaches_this_workers_session_cache(user_client, db):
+    assert user_client.get("/auth/profile").status_code == 200  # now cached on this worker
+    token = user_client.cookies["session"]
+
+    # Another worker logs the session out: the row goes inactive and the token id is revoked
+    db.query(DBSession).filter_by(token=token).update({"active": False})
+    add_revocation(db, 1, database_token_id(token))
+    assert user_client.get("/auth/profile").status_code == 200  # until this worker syncs
+
+    revocations.sync()
+    assert user_client.get("/auth/profile").status_code == 401
+
+
+def test_logout_records_a_revocation_for_database_sessions(user_client, db):
+    token = user_client.cookies["session"]
+    assert user_client.post("/auth/logout").status_code == 200
+    row = db.query(SessionRevocation).one()
+    assert row.token_id == database_token_id(token)
+    assert row.expires_at < datetime.utcnow() + timedelta(hours=1)
@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+
+from app.ttl_store import DatabaseTTLStore, MemoryTTLStore, ttl_store
+
+
+@pytest.fixture(params=["database", "memory"])
+def store(request):
+    return DatabaseTTLStore() if request.param == "database" else MemoryTTLStore()
+
+
+def test_consume_returns_an_entry_once(store):
+    store.set("otp:a@example.com", "123456", 60)
+    assert store.consume("otp:a@example.com", "654321") is None  # a wrong guess leaves it in place
+    assert store.consume("otp:a@example.com", "123456") == "123456"
+    assert store.consume("otp:a@example.com", "123456") is None
+
+
+def test_expired_entries_are_never_returned(store):
+    store.set("otp:a@example.com", "123456", -1)
+    assert store.get("otp:a@example.com") is None
+    assert store.consume("otp:a@example.com") is None
+    assert store.sweep() == 1
+
+
+def test_racing_consumers_get_an_entry_once(store):
+    store.set("reset:a@example.com", "verified", 60)
+    start, got = threading.Barrier(8), []
+
+    def consume():
+        start.wait()
+        got.append(store.consume("reset:a@example.com"))
+
+    threads = [threading.Thread(target=consume) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(got) == 8
+    assert got.count("verified") == 1
+
+
+def test_otp_and_reset_grant_are_single_use(client, sign_in):
+    sign_in(client, "forgetful")
+    email = "forgetful@example.com"
+    assert client.post("/auth/forgot-password", json={"email": email}).status_code == 200
+    otp = ttl_store.get(f"otp:{email}")
+
+    assert client.post("/auth/verify-otp", json={"email": email, "otp": otp}).status_code == 200
+    assert client.post("/auth/verify-otp", json={"email": email, "otp": otp}).status_code == 400
+    reset = {"email": email, "new_password": "new-secret"}
+    assert client.post("/auth/reset-password", json=reset).status_code == 200
+    assert client.post("/auth/reset-password", json=reset).status_code == 400
+    assert client.post("/auth/login", json={"email": email, "password": "new-secret"}).status_code == 200